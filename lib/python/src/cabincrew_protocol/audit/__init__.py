@@ -0,0 +1,23 @@
+# CabinCrew Protocol - Audit log helpers
+# Hand-written runtime support built on the generated models in ..protocol
+
+from .log import MANIFEST_NAME, AuditChainError, AuditLog, AuditSegment, SegmentTier, audit_event_hash
+from .query import DECISION_ORDER, SEVERITY_ORDER, Query, QuerySyntaxError, tail
+from .redact import AUDIT_TEXT_FIELDS, RedactionReport, SecretRedactor
+
+__all__ = [
+    "AUDIT_TEXT_FIELDS",
+    "DECISION_ORDER",
+    "MANIFEST_NAME",
+    "SEVERITY_ORDER",
+    "AuditChainError",
+    "AuditLog",
+    "AuditSegment",
+    "Query",
+    "QuerySyntaxError",
+    "RedactionReport",
+    "SecretRedactor",
+    "SegmentTier",
+    "audit_event_hash",
+    "tail",
+]
@@ -0,0 +1,452 @@
+# CabinCrew Protocol - Segmented audit log
+#
+# Hand-written helper; not generated from the schema.
+#
+# An AuditLog is a directory of NDJSON segments plus `manifest.json`:
+#
+#   audit-000001.ndjson.gz   closed, compressed (gzip, or zstd with the extra)
+#   audit-000002.ndjson      active segment, appended to
+#   manifest.json            one AuditSegment per segment
+#
+# Every event's `chain_hash` is `audit_event_hash()` of the event before it, so
+# the chain runs across segment boundaries. The first line of each segment is
+# a header carrying the previous segment's final hash, and the manifest
+# records each segment's time range and first/last hashes. Checking one
+# segment, or finding the segments for a time range, never decompresses the
+# others.
+#
+# Segments rotate when the active one would exceed `max_bytes` or is older
+# than `max_age` seconds. The closed segment is compressed by the thread that
+# rotated it after the append lock is released, so other writers keep going;
+# until then the manifest lists it uncompressed with no `sha256`. Closed segments move to `archive_dir` after
+# `archive_after` seconds and are deleted after `delete_after` seconds; deleted
+# segments stay in the manifest so the chain remains checkable from the next
+# surviving header.
+#
+#   with AuditLog('/var/log/cabincrew/audit', max_bytes=64 << 20) as log:
+#       log.append(event)
+#       for event in log.events(start=incident_start, query='severity>=error'):
+#           ...
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import IO, Any, Callable, Optional, Union
+
+from pydantic import AwareDatetime, BaseModel, ConfigDict
+
+from ..integrity import canonical_hash
+from ..protocol import AuditEvent
+from .query import Query
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised only without the extra
+    zstandard = None
+
+MANIFEST_NAME = 'manifest.json'
+_MANIFEST_VERSION = 1
+_HEADER_KEY = 'audit_segment'
+_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+
+
+class AuditChainError(ValueError):
+    """An audit segment or event does not continue the hash chain."""
+
+
+class SegmentTier(Enum):
+    active = 'active'
+    closed = 'closed'
+    archived = 'archived'
+    deleted = 'deleted'
+
+
+class AuditSegment(BaseModel):
+    """Manifest entry for one segment."""
+
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    index: int
+    file: str
+    """File name inside the log directory, or inside `archive_dir` once archived."""
+    tier: SegmentTier = SegmentTier.active
+    compression: str = 'none'
+    created_at: AwareDatetime
+    closed_at: Optional[AwareDatetime] = None
+    events: int = 0
+    first_timestamp: Optional[AwareDatetime] = None
+    """Earliest event timestamp in the segment; events need not arrive in timestamp order."""
+    last_timestamp: Optional[AwareDatetime] = None
+    """Latest event timestamp in the segment."""
+    previous_chain_hash: Optional[str] = None
+    """Hash of the last event before this segment (also in the segment header)."""
+    last_chain_hash: Optional[str] = None
+    """Hash of this segment's last event; the next segment's `previous_chain_hash`."""
+    size: int = 0
+    sha256: Optional[str] = None
+    """SHA256 of the stored (compressed) file, set when the segment is closed."""
+
+
+def audit_event_hash(event: Union[AuditEvent, dict[str, Any]]) -> str:
+    """Hash that the next event's `chain_hash` must carry."""
+    return canonical_hash(event)
+
+
+def _require_codec(compression: str) -> None:
+    if compression not in _SUFFIXES:
+        raise ValueError(f"unknown compression {compression!r}; expected one of {', '.join(_SUFFIXES)}")
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError("zstd compression requires zstandard: pip install 'cabincrew-protocol[zstd]'")
+
+
+def _open_read(path: Path, compression: str) -> IO[bytes]:
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        _require_codec(compression)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return open(path, 'rb')
+
+
+def _compress(source: Path, target: Path, compression: str) -> None:
+    tmp = target.with_name(target.name + '.tmp')
+    with open(source, 'rb') as src, open(tmp, 'wb') as raw:
+        if compression == 'gzip':
+            with gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+        else:
+            with zstandard.ZstdCompressor().stream_writer(raw, closefd=False) as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, target)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class AuditLog:
+    """
+    Append-only, rotating, hash-chained AuditEvent log; safe to share between
+    threads. Reopening a directory resumes the chain from the active segment
+    (a torn final line from a crash is dropped). `genesis_hash` is the
+    `chain_hash` of the first event of a new log, when it continues an older one.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_bytes: Optional[int] = 64 << 20,
+        max_age: Optional[float] = None,
+        compression: str = 'gzip',
+        archive_dir: Optional[Union[str, Path]] = None,
+        archive_after: Optional[float] = None,
+        delete_after: Optional[float] = None,
+        fsync: bool = False,
+        genesis_hash: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        _require_codec(compression)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compression = compression
+        self.archive_dir = Path(archive_dir) if archive_dir is not None else None
+        self.archive_after = archive_after
+        self.delete_after = delete_after
+        self.fsync = fsync
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._segments: list[AuditSegment] = []
+        self._handle: Optional[IO[bytes]] = None
+        self._last_hash: Optional[str] = None
+
+        manifest = self.directory / MANIFEST_NAME
+        if manifest.exists():
+            data = json.loads(manifest.read_text())
+            self._segments = [AuditSegment.model_validate(s) for s in data['segments']]
+        for segment in self._segments:
+            if segment.tier is SegmentTier.closed and segment.sha256 is None:
+                self._finish_close(segment)  # crashed between closing and compressing
+        if self._segments and self._segments[-1].tier is SegmentTier.active:
+            self._resume(self._segments[-1])
+        else:
+            self._last_hash = self._segments[-1].last_chain_hash if self._segments else genesis_hash
+            self._open_segment()
+        self._save_manifest()
+
+    # Manifest and segment files
+
+    def _now(self) -> datetime:
+        return datetime.fromtimestamp(self.clock(), timezone.utc)
+
+    def _save_manifest(self) -> None:
+        data = {'version': _MANIFEST_VERSION, 'segments': [s.model_dump(mode='json') for s in self._segments]}
+        path = self.directory / MANIFEST_NAME
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(json.dumps(data, indent=1))
+        os.replace(tmp, path)
+
+    def _path(self, segment: AuditSegment) -> Path:
+        base = self.archive_dir if segment.tier is SegmentTier.archived else self.directory
+        return base / segment.file
+
+    def _open_segment(self) -> None:
+        index = self._segments[-1].index + 1 if self._segments else 1
+        segment = AuditSegment(
+            index=index,
+            file=f"audit-{index:06d}.ndjson",
+            created_at=self._now(),
+            previous_chain_hash=self._last_hash,
+        )
+        header = {_HEADER_KEY: index, 'previous_chain_hash': self._last_hash, 'created_at': segment.created_at.isoformat()}
+        self._handle = open(self.directory / segment.file, 'wb')
+        self._handle.write(json.dumps(header, separators=(',', ':')).encode() + b'\n')
+        self._handle.flush()
+        segment.size = self._handle.tell()
+        self._segments.append(segment)
+
+    def _resume(self, segment: AuditSegment) -> None:
+        path = self.directory / segment.file
+        with open(path, 'rb+') as fh:
+            data = fh.read()
+            end = data.rfind(b'\n') + 1
+            if end != len(data):
+                fh.truncate(end)
+        segment.events, segment.first_timestamp, segment.last_timestamp, segment.last_chain_hash = 0, None, None, None
+        self._last_hash = segment.previous_chain_hash
+        for event in self._read(segment):
+            self._track(segment, event)
+        self._handle = open(path, 'ab')
+        segment.size = self._handle.tell()
+
+    def _track(self, segment: AuditSegment, event: AuditEvent) -> None:
+        self._last_hash = audit_event_hash(event)
+        segment.events += 1
+        if segment.first_timestamp is None or event.timestamp < segment.first_timestamp:
+            segment.first_timestamp = event.timestamp
+        if segment.last_timestamp is None or event.timestamp > segment.last_timestamp:
+            segment.last_timestamp = event.timestamp
+        segment.last_chain_hash = self._last_hash
+
+    def _finish_close(self, segment: AuditSegment) -> None:
+        """Compress a closed segment and record its file and hash; call without the lock held."""
+        raw = self.directory / f"audit-{segment.index:06d}.ndjson"
+        # A manifest written before compression was moved off the lock already names the target.
+        compression = self.compression if segment.file == raw.name else segment.compression
+        target = raw.with_name(raw.name + _SUFFIXES[compression])
+        if compression != 'none' and raw.exists():
+            _compress(raw, target, compression)
+        size, sha256 = target.stat().st_size, _file_sha256(target)
+        with self._lock:
+            segment.file, segment.compression, segment.size, segment.sha256 = target.name, compression, size, sha256
+            self._save_manifest()
+        if target != raw:
+            raw.unlink(missing_ok=True)  # readers holding an older manifest entry fall back in _lines
+
+    # Writing
+
+    @property
+    def last_chain_hash(self) -> Optional[str]:
+        """Hash the next appended event will carry as its `chain_hash`."""
+        return self._last_hash
+
+    @property
+    def segments(self) -> list[AuditSegment]:
+        with self._lock:
+            return [s.model_copy() for s in self._segments]
+
+    def append(self, event: Union[AuditEvent, dict[str, Any]]) -> AuditEvent:
+        """
+        Append `event`, filling in `chain_hash` when it is unset; returns the
+        stored event. A preset `chain_hash` must continue the chain.
+        """
+        if not isinstance(event, AuditEvent):
+            event = AuditEvent.model_validate(event)
+        closed = None
+        with self._lock:
+            if event.chain_hash is None and self._last_hash is not None:
+                event = event.model_copy(update={'chain_hash': self._last_hash})
+            elif event.chain_hash != self._last_hash:
+                raise AuditChainError(f"event {event.event_id} does not continue the chain")
+            line = event.model_dump_json(exclude_none=True).encode() + b'\n'
+            segment = self._segments[-1]
+            if segment.events and self._should_rotate(segment, len(line)):
+                closed = self._rotate()
+                segment = self._segments[-1]
+            self._handle.write(line)
+            self._handle.flush()
+            if self.fsync:
+                os.fsync(self._handle.fileno())
+            segment.size += len(line)
+            self._track(segment, event)
+        if closed is not None:
+            self._finish_close(closed)
+        return event
+
+    def _should_rotate(self, segment: AuditSegment, incoming: int) -> bool:
+        if self.max_bytes is not None and segment.size + incoming > self.max_bytes:
+            return True
+        return self.max_age is not None and self.clock() - segment.created_at.timestamp() >= self.max_age
+
+    def rotate(self) -> None:
+        """Close and compress the active segment (if it holds events) and start a new one."""
+        with self._lock:
+            if not self._segments[-1].events:
+                return
+            closed = self._rotate()
+        self._finish_close(closed)
+
+    def _rotate(self) -> AuditSegment:
+        """Close the active segment and open the next; returns the closed one for `_finish_close`."""
+        segment = self._segments[-1]
+        if self.fsync:
+            os.fsync(self._handle.fileno())
+        self._handle.close()
+        segment.tier = SegmentTier.closed
+        segment.closed_at = self._now()
+        self._open_segment()
+        self._save_manifest()
+        return segment
+
+    def apply_retention(self) -> list[AuditSegment]:
+        """Archive and delete closed segments past their age limits; returns those changed."""
+        changed = []
+        with self._lock:
+            now = self.clock()
+            for segment in self._segments:
+                if segment.tier not in (SegmentTier.closed, SegmentTier.archived) or segment.sha256 is None:
+                    continue  # active, gone, or still being compressed
+                age = now - segment.closed_at.timestamp()
+                if self.delete_after is not None and age >= self.delete_after:
+                    self._path(segment).unlink(missing_ok=True)
+                    segment.tier = SegmentTier.deleted
+                    changed.append(segment)
+                elif (
+                    segment.tier is SegmentTier.closed and self.archive_dir is not None
+                    and self.archive_after is not None and age >= self.archive_after
+                ):
+                    self.archive_dir.mkdir(parents=True, exist_ok=True)
+                    shutil.move(str(self.directory / segment.file), str(self.archive_dir / segment.file))
+                    segment.tier = SegmentTier.archived
+                    changed.append(segment)
+            if changed:
+                self._save_manifest()
+        return [s.model_copy() for s in changed]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+                self._save_manifest()
+
+    def __enter__(self) -> AuditLog:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    # Reading and verification
+
+    def _lines(self, segment: AuditSegment) -> Iterator[bytes]:
+        """Raw event lines of one segment, after checking its header."""
+        if segment.tier is SegmentTier.deleted:
+            raise FileNotFoundError(f"audit segment {segment.index} was deleted by retention")
+        try:
+            fh = _open_read(self._path(segment), segment.compression)
+        except FileNotFoundError:
+            # Compressed or archived since `segment` was copied from the manifest.
+            with self._lock:
+                current = next(s for s in self._segments if s.index == segment.index).model_copy()
+            if (current.file, current.tier) == (segment.file, segment.tier):
+                raise
+            yield from self._lines(current)
+            return
+        with fh:
+            header = json.loads(fh.readline())
+            if header.get(_HEADER_KEY) != segment.index:
+                raise AuditChainError(f"{segment.file} is not audit segment {segment.index}")
+            if header.get('previous_chain_hash') != segment.previous_chain_hash:
+                raise AuditChainError(f"segment {segment.index} header does not match the manifest")
+            for line in fh:
+                if line.endswith(b'\n'):
+                    yield line
+
+    def _read(self, segment: AuditSegment) -> Iterator[AuditEvent]:
+        for line in self._lines(segment):
+            yield AuditEvent.model_validate_json(line)
+
+    def segments_for(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+    ) -> list[AuditSegment]:
+        """Readable segments whose events may fall in [start, end], from the manifest alone."""
+        with self._lock:
+            return [
+                s.model_copy() for s in self._segments
+                if s.tier is not SegmentTier.deleted and s.events
+                and (start is None or s.last_timestamp >= start)
+                and (end is None or s.first_timestamp <= end)
+            ]
+
+    def events(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        query: Optional[Union[Query, str]] = None,
+    ) -> Iterator[AuditEvent]:
+        """Events with start <= timestamp <= end matching `query`, in append order."""
+        if isinstance(query, str):
+            query = Query(query)
+        for segment in self.segments_for(start, end):
+            lines = self._lines(segment)
+            if query is not None:
+                lines = (line for line in lines if query.match_line(line) is not None)
+            for line in lines:
+                event = AuditEvent.model_validate_json(line)
+                if (start is None or event.timestamp >= start) and (end is None or event.timestamp <= end):
+                    yield event
+
+    def verify(self, index: Optional[int] = None) -> int:
+        """
+        Check the chain through one segment (`index`) or every readable one,
+        plus closed segments' file hashes and the manifest links between
+        segments. Returns the number of events checked; raises AuditChainError.
+        """
+        with self._lock:
+            segments = [s.model_copy() for s in self._segments]
+        checked = 0
+        for position, segment in enumerate(segments):
+            if position and segment.previous_chain_hash != segments[position - 1].last_chain_hash:
+                raise AuditChainError(f"segment {segment.index} does not continue segment {segments[position - 1].index}")
+            if segment.tier is SegmentTier.deleted or (index is not None and segment.index != index):
+                continue
+            if segment.sha256 is not None and _file_sha256(self._path(segment)) != segment.sha256:
+                raise AuditChainError(f"segment {segment.index} file hash does not match the manifest")
+            previous = segment.previous_chain_hash
+            for event in self._read(segment):
+                if event.chain_hash != previous:
+                    raise AuditChainError(f"event {event.event_id} in segment {segment.index} breaks the chain")
+                previous = audit_event_hash(event)
+                checked += 1
+            if segment.tier is not SegmentTier.active and previous != segment.last_chain_hash:
+                raise AuditChainError(f"segment {segment.index} ends at a different hash than the manifest")
+        return checked
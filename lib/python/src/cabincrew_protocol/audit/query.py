@@ -0,0 +1,388 @@
+# CabinCrew Protocol - AuditEvent query DSL
+#
+# Hand-written helper; not generated from the schema.
+#
+# Queries are comparisons over dotted AuditEvent field paths:
+#
+#   severity>=error
+#   gateway.policy_decision=deny and workflow.workflow_id=wf-00042
+#   (event_type=approval.requested or event_type=approval.received) and not approval.approved=true
+#   message~"disk (full|quota)"
+#
+# Operators: = != > >= < <= and ~ (regex search). Terms combine with
+# `and` (also implied by whitespace), `or`, `not` and parentheses. A path
+# through a list matches if any element matches. `severity` orders
+# debug < info < warning < error < critical; fields named `decision` /
+# `policy_decision` order allow < warn < require_approval < deny; other values
+# compare as numbers when both sides are numeric, otherwise as strings (so
+# RFC3339 UTC timestamps order correctly). A missing field satisfies only `!=`.
+#
+# Before parsing a line, `Query.prefilter` checks for byte strings that must
+# appear in any match (the quoted field name, the quoted value, or one of the
+# allowed enum values), so most non-matching lines are rejected without JSON
+# decoding.
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from ..orchestrator.policy import decision_severity
+from ..protocol import AuditEvent, Decision
+
+SEVERITY_ORDER = ('debug', 'info', 'warning', 'error', 'critical')
+DECISION_ORDER = tuple(sorted((d.value for d in Decision), key=lambda d: decision_severity(d).value))
+_ORDERED_FIELDS = {'severity': SEVERITY_ORDER, 'decision': DECISION_ORDER, 'policy_decision': DECISION_ORDER}
+
+_TOKEN = re.compile(
+    r'\s*(?:(?P<lparen>\()|(?P<rparen>\))'
+    r'|(?P<term>[A-Za-z_][\w.]*\s*(?:!=|>=|<=|=|>|<|~)\s*(?:"(?:[^"\\]|\\.)*"|[^\s()]+))'
+    r'|(?P<word>\S+))'
+)
+_TERM = re.compile(r'(?P<path>[A-Za-z_][\w.]*)\s*(?P<op>!=|>=|<=|=|>|<|~)\s*(?P<value>.+)', re.S)
+Predicate = Callable[[dict[str, Any]], bool]
+# Prefilter in conjunctive form: every clause needs at least one of its needles.
+Needles = list[tuple[bytes, ...]]
+
+
+class QuerySyntaxError(ValueError):
+    """The query string could not be parsed."""
+
+
+def _values(data: Any, parts: list[str]) -> list[Any]:
+    """All values at `parts` below `data`, fanning out over lists."""
+    current = [data]
+    for part in parts:
+        following = []
+        for item in current:
+            if isinstance(item, list):
+                following.extend(i[part] for i in item if isinstance(i, dict) and part in i)
+            elif isinstance(item, dict) and part in item:
+                following.append(item[part])
+        current = following
+        if not current:
+            return current
+    flat = []
+    for item in current:
+        flat.extend(item) if isinstance(item, list) else flat.append(item)
+    return flat
+
+
+def _scalar_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return 'null'
+    return str(value)
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _needle(text: str) -> Optional[bytes]:
+    """Quoted JSON string needle, if `text` is serialized verbatim by every JSON encoder."""
+    if text.isascii() and text.isprintable() and '"' not in text and '\\' not in text and '/' not in text:
+        return f'"{text}"'.encode()
+    return None
+
+
+class _Term:
+    def __init__(self, path: str, op: str, value: str) -> None:
+        self.path = path
+        self.parts = path.split('.')
+        self.op = op
+        self.value = value
+        self.number = _number(value)
+        # Enum-ordered unless the value is numeric (PolicyEvaluation.severity is a number).
+        self.order = _ORDERED_FIELDS.get(self.parts[-1]) if op != '~' and self.number is None else None
+        if self.order is not None and value not in self.order:
+            raise QuerySyntaxError(f"{path} must be one of {', '.join(self.order)}, not {value!r}")
+        try:
+            self.pattern = re.compile(value) if op == '~' else None
+        except re.error as exc:
+            raise QuerySyntaxError(f"bad pattern for {path}: {exc}") from exc
+
+    def _compare(self, actual: Any) -> bool:
+        op = self.op
+        if op == '~':
+            return self.pattern.search(_scalar_text(actual)) is not None
+        if self.order is not None:
+            if actual not in self.order:
+                return op == '!='
+            left, right = self.order.index(actual), self.order.index(self.value)
+        else:
+            number = _number(actual) if self.number is not None else None
+            if number is not None:
+                left, right = number, self.number
+            else:
+                left, right = _scalar_text(actual), self.value
+        if op == '=':
+            return left == right
+        if op == '!=':
+            return left != right
+        if op == '>':
+            return left > right
+        if op == '>=':
+            return left >= right
+        if op == '<':
+            return left < right
+        return left <= right
+
+    def __call__(self, event: dict[str, Any]) -> bool:
+        values = _values(event, self.parts)
+        if not values:
+            return self.op == '!='
+        if self.op == '!=':
+            return all(self._compare(v) for v in values)
+        return any(self._compare(v) for v in values)
+
+    def needles(self) -> Needles:
+        if self.op == '!=':
+            return []
+        key = _needle(self.parts[-1])
+        clauses: Needles = [(key,)] if key else []
+        if self.order is not None:
+            rank = self.order.index(self.value)
+            allowed = [
+                v for i, v in enumerate(self.order)
+                if {'=': i == rank, '>': i > rank, '>=': i >= rank, '<': i < rank, '<=': i <= rank}[self.op]
+            ]
+            clauses.append(tuple(_needle(v) for v in allowed))
+        elif self.op == '=' and self.number is None:
+            value = _needle(self.value) if self.value not in ('true', 'false', 'null') else self.value.encode()
+            if value:
+                clauses.append((value,))
+        return clauses
+
+
+class _Parser:
+    def __init__(self, text: str) -> None:
+        self.tokens: list[tuple[str, str]] = []
+        position = 0
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if match is None or match.end() == position:
+                if text[position:].strip():
+                    raise QuerySyntaxError(f"cannot parse query at {text[position:]!r}")
+                break
+            position = match.end()
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+        self.index = 0
+
+    def peek(self) -> Optional[tuple[str, str]]:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def take(self) -> tuple[str, str]:
+        token = self.peek()
+        if token is None:
+            raise QuerySyntaxError("unexpected end of query")
+        self.index += 1
+        return token
+
+    def parse(self) -> tuple[Predicate, Needles]:
+        if not self.tokens:
+            return (lambda event: True), []
+        result = self.disjunction()
+        if self.peek() is not None:
+            raise QuerySyntaxError(f"unexpected {self.peek()[1]!r}")
+        return result
+
+    def disjunction(self) -> tuple[Predicate, Needles]:
+        branches = [self.conjunction()]
+        while self.peek() == ('word', 'or'):
+            self.take()
+            branches.append(self.conjunction())
+        if len(branches) == 1:
+            return branches[0]
+        predicates = [p for p, _ in branches]
+        # Any branch may match, so a line needs a needle from one clause of some
+        # branch. The last clause is the value rather than the field name, which
+        # is the more selective. A branch without needles requires nothing.
+        needles: Needles = []
+        if all(n for _, n in branches):
+            needles = [tuple(dict.fromkeys(needle for _, n in branches for needle in n[-1]))]
+        return (lambda event: any(p(event) for p in predicates)), needles
+
+    def conjunction(self) -> tuple[Predicate, Needles]:
+        parts = [self.unary()]
+        while True:
+            token = self.peek()
+            if token is None or token == ('word', 'or') or token[0] == 'rparen':
+                break
+            if token == ('word', 'and'):
+                self.take()
+            parts.append(self.unary())
+        if len(parts) == 1:
+            return parts[0]
+        predicates = [p for p, _ in parts]
+        return (lambda event: all(p(event) for p in predicates)), [c for _, n in parts for c in n]
+
+    def unary(self) -> tuple[Predicate, Needles]:
+        kind, text = self.take()
+        if (kind, text) == ('word', 'not'):
+            inner, _ = self.unary()
+            return (lambda event: not inner(event)), []
+        if kind == 'lparen':
+            result = self.disjunction()
+            if self.take()[0] != 'rparen':
+                raise QuerySyntaxError("expected ')'")
+            return result
+        if kind == 'term':
+            match = _TERM.match(text)
+            value = match.group('value')
+            if value.startswith('"'):
+                try:
+                    value = json.loads(value)
+                except ValueError as exc:
+                    raise QuerySyntaxError(f"bad quoted value in {text!r}") from exc
+            term = _Term(match.group('path'), match.group('op'), value)
+            return term, term.needles()
+        raise QuerySyntaxError(f"expected a comparison, got {text!r}")
+
+
+class Query:
+    """A compiled audit query; see the module comment for syntax."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.predicate, self.needles = _Parser(text).parse()
+
+    def __repr__(self) -> str:
+        return f"Query({self.text!r})"
+
+    def prefilter(self, line: bytes) -> bool:
+        """Cheap necessary condition on a raw NDJSON line (no false negatives)."""
+        for clause in self.needles:
+            for needle in clause:
+                if needle in line:
+                    break
+            else:
+                return False
+        return True
+
+    def matches(self, event: Union[AuditEvent, dict[str, Any]]) -> bool:
+        if isinstance(event, AuditEvent):
+            event = event.model_dump(mode='json', exclude_none=True)
+        return self.predicate(event)
+
+    def match_line(self, line: bytes) -> Optional[dict[str, Any]]:
+        """Decoded event if `line` matches, else None."""
+        if not self.prefilter(line):
+            return None
+        event = json.loads(line)
+        return event if self.predicate(event) else None
+
+    def filter_lines(self, lines: Iterable[bytes]) -> Iterator[dict[str, Any]]:
+        for line in lines:
+            if not line.strip():
+                continue
+            event = self.match_line(line)
+            if event is not None:
+                yield event
+
+
+def _read_lines(path: Path, follow: bool, from_start: bool, poll_interval: float) -> Iterator[bytes]:
+    fh = open(path, 'rb')
+    try:
+        if not from_start:
+            fh.seek(0, os.SEEK_END)
+        inode = os.fstat(fh.fileno()).st_ino
+        partial = b''
+        while True:
+            chunk = fh.readline()
+            if chunk:
+                if chunk.endswith(b'\n'):
+                    yield partial + chunk
+                    partial = b''
+                else:
+                    partial += chunk  # writer is mid-line; wait for the rest
+                continue
+            if not follow:
+                if partial:
+                    yield partial
+                return
+            time.sleep(poll_interval)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if st.st_ino != inode:
+                # Rotated: finish the old file first, as `tail -F` does; the writer may have
+                # appended to it after our last read and before the rename.
+                for chunk in fh:
+                    partial += chunk
+                    if partial.endswith(b'\n'):
+                        yield partial
+                        partial = b''
+                if partial:
+                    yield partial
+            elif st.st_size >= fh.tell():
+                continue
+            # Rotated or truncated: reopen and read the new file from the start.
+            fh.close()
+            fh = open(path, 'rb')
+            inode = os.fstat(fh.fileno()).st_ino
+            partial = b''
+    finally:
+        fh.close()
+
+
+def tail(
+    path: Union[str, Path],
+    query: Union[Query, str],
+    follow: bool = True,
+    from_start: bool = False,
+    poll_interval: float = 0.2,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield matching events from an NDJSON audit log, following appended lines
+    (and rotation/truncation) like `tail -F` when `follow` is true.
+    """
+    if isinstance(query, str):
+        query = Query(query)
+    return query.filter_lines(_read_lines(Path(path), follow, from_start, poll_interval))
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Filter NDJSON AuditEvent logs with a query.")
+    parser.add_argument('query', help="e.g. 'severity>=error and gateway.policy_decision=deny'")
+    parser.add_argument('paths', nargs='*', help="log files (default: stdin)")
+    parser.add_argument('-f', '--follow', action='store_true', help="keep reading as the file grows")
+    args = parser.parse_args(argv)
+
+    query = Query(args.query)
+    out = sys.stdout
+    try:
+        if not args.paths:
+            sources = [query.filter_lines(sys.stdin.buffer)]
+        else:
+            sources = [tail(p, query, follow=args.follow, from_start=True) for p in args.paths]
+        for source in sources:
+            for event in source:
+                out.write(json.dumps(event, ensure_ascii=False) + '\n')
+                if args.follow:
+                    out.flush()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
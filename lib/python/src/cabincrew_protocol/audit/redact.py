@@ -0,0 +1,381 @@
+# CabinCrew Protocol - Secret redaction
+#
+# Hand-written helper; not generated from the schema.
+#
+# Scrubs the secret values handed to an engine out of what it reports back:
+#
+#   redactor = SecretRedactor.from_engine_input(engine_input, environ=os.environ)
+#   output = redactor.redact_engine_output(output)      # error, warnings, diagnostics
+#   event = redactor.redact_audit_event(event)          # AUDIT_TEXT_FIELDS
+#   for line in redactor.filter_lines(stream): ...      # NDJSON, line by line
+#   redactor.report()                                   # RedactionReport
+#
+#   python -m cabincrew_protocol.audit.redact --input engine-input.json --env GITHUB_TOKEN < out.ndjson
+#
+# Secrets come from `EngineInput.secrets` (nested values are flattened, e.g.
+# 'aws.secret_key'), `identity_token`, and - when `environ` is given - the
+# environment variables named in `allowed_secrets`. Values shorter than
+# `min_length` are not redacted (a 2-character secret would shred ordinary
+# text); they are listed in the report's `skipped`.
+#
+# Large sets of values (with their JSON-escaped forms) are compiled into one
+# matcher that finds every occurrence in a single pass: an Aho-Corasick
+# automaton when pyahocorasick is installed (`[redact]` extra), otherwise one
+# trie-shaped regular expression. Below _SUBSTRING_SEARCH_LIMIT values, C
+# substring search per value is faster than either (the regular expression
+# only overtakes it at about a thousand values), so small sets use that. Either
+# way overlapping occurrences are merged, so no fragment of a secret survives.
+# `python3 tests/benchmarks/bench_secret_redaction.py` shows the crossover.
+#
+# Audit events are redacted in their free-text fields only, so hashes,
+# signatures and ids stay verifiable; redact before `AuditLog.append`, which
+# chains the hash of what is written. `filter_lines` scrubs every string of
+# an NDJSON line and passes lines without a secret through byte for byte.
+# Counters are not locked: use one redactor per thread.
+
+from __future__ import annotations
+
+import json
+import re
+import sys
+from collections.abc import Iterable, Iterator, Mapping
+from typing import Any, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from ..protocol import AuditEvent, EngineInput, EngineOutput
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover - exercised only without the extra
+    ahocorasick = None
+
+AUDIT_TEXT_FIELDS = (
+    'message',
+    'engine.error',
+    'policy.violations',
+    'policy.warnings',
+    'policy.policy_evaluations',
+    'approval.reason',
+    'integrity.differences',
+)
+"""AuditEvent paths redact_audit_event scrubs (whole subtrees)."""
+
+_SUBSTRING_SEARCH_LIMIT = 128 if ahocorasick is not None else 1024
+
+
+class RedactionReport(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    secrets: int
+    """Distinct secret values being redacted."""
+    skipped: list[str] = Field(default_factory=list)
+    """Secrets shorter than min_length, left as they are."""
+    scanned: int = 0
+    """Strings scanned."""
+    redacted: int = 0
+    """Strings that contained a secret."""
+    redactions: int = 0
+    """Secret occurrences replaced."""
+    by_secret: dict[str, int] = Field(default_factory=dict)
+    lines: int = 0
+    """NDJSON lines passed through filter_lines."""
+    lines_redacted: int = 0
+
+
+def _flatten(name: str, value: Any, out: list[tuple[str, str]]) -> None:
+    if isinstance(value, bool) or value is None:
+        return
+    if isinstance(value, Mapping):
+        for key, item in value.items():
+            _flatten(f"{name}.{key}", item, out)
+    elif isinstance(value, (list, tuple)):
+        for index, item in enumerate(value):
+            _flatten(f"{name}[{index}]", item, out)
+    else:
+        out.append((name, str(value)))
+
+
+def _engine_input_secrets(engine_input: EngineInput, environ: Optional[Mapping[str, str]]) -> dict[str, Any]:
+    secrets: dict[str, Any] = dict(engine_input.secrets or {})
+    if engine_input.identity_token:
+        secrets.setdefault('identity_token', engine_input.identity_token)
+    if environ is not None:
+        for name in engine_input.allowed_secrets or ():
+            if name not in secrets and environ.get(name):
+                secrets[name] = environ[name]
+    return secrets
+
+
+def _trie_branches(node: dict[Optional[str], Any]) -> str:
+    """Alternation matching the longest word in `node`; single-child chains become literals."""
+    parts = []
+    for piece, child in node.items():
+        if piece is None:
+            continue
+        run = piece
+        while len(child) == 1 and None not in child:
+            ((piece, child),) = child.items()
+            run += piece
+        if len(child) == (None in child):
+            parts.append(re.escape(run))
+        else:
+            parts.append(re.escape(run) + '(?:' + _trie_branches(child) + (')?' if None in child else ')'))
+    return '|'.join(parts)
+
+
+def _trie_pattern(words: Iterable[str]) -> re.Pattern[str]:
+    """Zero-width pattern whose group 1 is the longest word starting at each match position."""
+    trie: dict[Optional[str], Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[None] = True
+    return re.compile('(?=(' + _trie_branches(trie) + '))', re.DOTALL)
+
+
+class SecretRedactor:
+    """Replaces secret values in text, engine outputs, audit events and NDJSON; see the module comment."""
+
+    def __init__(
+        self,
+        secrets: Mapping[str, Any],
+        replacement: str = '[REDACTED]',
+        min_length: int = 4,
+    ) -> None:
+        self.replacement = replacement
+        flat: list[tuple[str, str]] = []
+        for name, value in secrets.items():
+            _flatten(name, value, flat)
+        self._names: dict[str, list[str]] = {}
+        skipped = []
+        for name, value in flat:
+            if len(value) < min_length:
+                skipped.append(name)
+                continue
+            forms = {value, json.dumps(value)[1:-1], json.dumps(value, ensure_ascii=False)[1:-1]}
+            for form in forms:
+                names = self._names.setdefault(form, [])
+                if name not in names:
+                    names.append(name)
+        self._distinct = len({value for name, value in flat if len(value) >= min_length})
+        self._skipped = skipped
+        values = sorted(self._names, key=len)
+        self._few = values if len(values) <= _SUBSTRING_SEARCH_LIMIT else None
+        self._automaton = None
+        self._pattern = None
+        if self._few is None and ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for value in values:
+                self._automaton.add_word(value, value)
+            self._automaton.make_automaton()
+        elif self._few is None:
+            self._pattern = _trie_pattern(values)
+        self.scanned = 0
+        self.redacted = 0
+        self.redactions = 0
+        self.lines = 0
+        self.lines_redacted = 0
+        self._by_secret: dict[str, int] = {}
+
+    @classmethod
+    def from_engine_input(
+        cls,
+        engine_input: EngineInput,
+        environ: Optional[Mapping[str, str]] = None,
+        **kwargs: Any,
+    ) -> SecretRedactor:
+        """Redactor for everything `engine_input` hands the engine; `environ` resolves `allowed_secrets`."""
+        return cls(_engine_input_secrets(engine_input, environ), **kwargs)
+
+    # Matching
+
+    def _find(self, text: str) -> list[tuple[int, str]]:
+        """(start, longest secret form starting there) for every occurrence, by start."""
+        longest: dict[int, str] = {}
+        if self._few is not None:
+            find = text.find
+            for value in self._few:  # shortest first, so longer values win a shared start
+                start = find(value)
+                while start >= 0:
+                    longest[start] = value
+                    start = find(value, start + 1)
+        elif self._automaton is not None:
+            for last, value in self._automaton.iter(text):
+                start = last + 1 - len(value)
+                if len(value) > len(longest.get(start, '')):
+                    longest[start] = value
+        else:
+            return [(match.start(), match.group(1)) for match in self._pattern.finditer(text)]
+        return sorted(longest.items()) if longest else []
+
+    def _replace(self, text: str, hits: list[tuple[int, str]]) -> str:
+        """Replace the union of `hits` in `text`, counting every occurrence."""
+        by_secret = self._by_secret
+        self.redacted += 1
+        self.redactions += len(hits)
+        pieces = []
+        position = 0
+        start = end = -1
+        for hit_start, value in hits:
+            for name in self._names[value]:
+                by_secret[name] = by_secret.get(name, 0) + 1
+            if hit_start > end:
+                if end >= 0:
+                    pieces.append(text[position:start])
+                    pieces.append(self.replacement)
+                    position = end
+                start = hit_start
+            end = max(end, hit_start + len(value))
+        pieces.append(text[position:start])
+        pieces.append(self.replacement)
+        pieces.append(text[end:])
+        return ''.join(pieces)
+
+    def redact(self, text: str) -> str:
+        """`text` with every secret occurrence replaced; the same object if it has none."""
+        self.scanned += 1
+        hits = self._find(text)
+        return self._replace(text, hits) if hits else text
+
+    def redact_value(self, value: Any) -> Any:
+        """Redact strings (and dict keys) anywhere in a JSON-like value; numbers equal to a secret become the replacement."""
+        if isinstance(value, str):
+            return self.redact(value)
+        if isinstance(value, dict):
+            return {
+                (self.redact(key) if isinstance(key, str) else key): self.redact_value(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return [self.redact_value(item) for item in value]
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            names = self._names.get(str(value))
+            if names:
+                self.redacted += 1
+                self.redactions += 1
+                for name in names:
+                    self._by_secret[name] = self._by_secret.get(name, 0) + 1
+                return self.replacement
+        return value
+
+    # Protocol models
+
+    def redact_engine_output(self, output: EngineOutput) -> EngineOutput:
+        """Copy of `output` with `error`, `warnings` and `diagnostics` redacted; `output` itself if clean."""
+        before = self.redactions
+        update = {
+            field: self.redact_value(getattr(output, field))
+            for field in ('error', 'warnings', 'diagnostics')
+            if getattr(output, field) is not None
+        }
+        if self.redactions == before:
+            return output
+        return output.model_copy(update=update)
+
+    def redact_audit_event(self, event: AuditEvent) -> AuditEvent:
+        """Copy of `event` with AUDIT_TEXT_FIELDS redacted; `event` itself if clean."""
+        before = self.redactions
+        data = event.model_dump(mode='json', exclude_none=True)
+        for path in AUDIT_TEXT_FIELDS:
+            *parents, field = path.split('.')
+            container = data
+            for part in parents:
+                container = container.get(part)
+                if not isinstance(container, dict):
+                    break
+            else:
+                if field in container:
+                    container[field] = self.redact_value(container[field])
+        if self.redactions == before:
+            return event
+        return AuditEvent.model_validate(data)
+
+    # Streams
+
+    def filter_lines(self, lines: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Redact NDJSON lines. Lines holding a secret are re-encoded compactly
+        with every string scrubbed; other lines (and non-JSON lines, which are
+        redacted as plain text) keep their bytes.
+        """
+        for line in lines:
+            self.lines += 1
+            text = line.decode('utf-8', 'surrogateescape')
+            hits = self._find(text)
+            if not hits:
+                yield line
+                continue
+            self.lines_redacted += 1
+            before = self.redactions
+            try:
+                data = json.loads(text)
+            except ValueError:
+                data = None
+            else:
+                text_out = json.dumps(self.redact_value(data), ensure_ascii=False, separators=(',', ':'))
+                if line.endswith(b'\n'):
+                    text_out += '\n'
+            if data is None or self.redactions == before:
+                self.scanned += 1
+                text_out = self._replace(text, hits)
+            yield text_out.encode('utf-8', 'surrogateescape')
+
+    def report(self) -> RedactionReport:
+        return RedactionReport(
+            secrets=self._distinct,
+            skipped=self._skipped,
+            scanned=self.scanned,
+            redacted=self.redacted,
+            redactions=self.redactions,
+            by_secret=dict(self._by_secret),
+            lines=self.lines,
+            lines_redacted=self.lines_redacted,
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Redact engine secrets from NDJSON output or audit logs.")
+    parser.add_argument('paths', nargs='*', help="NDJSON files (default: stdin)")
+    parser.add_argument('--input', help="EngineInput JSON whose secrets, identity_token and allowed_secrets to redact")
+    parser.add_argument('--env', action='append', default=[], metavar='NAME',
+                        help="also redact the value of this environment variable (repeatable)")
+    parser.add_argument('--replacement', default='[REDACTED]')
+    parser.add_argument('--min-length', type=int, default=4)
+    parser.add_argument('--report', action='store_true', help="print a RedactionReport to stderr")
+    args = parser.parse_args(argv)
+    if not args.input and not args.env:
+        parser.error("nothing to redact: give --input and/or --env")
+
+    secrets: dict[str, Any] = {}
+    if args.input:
+        with open(args.input, 'rb') as f:
+            engine_input = EngineInput.model_validate_json(f.read())
+        secrets = _engine_input_secrets(engine_input, os.environ)
+    for name in args.env:
+        if os.environ.get(name):
+            secrets[name] = os.environ[name]
+    redactor = SecretRedactor(secrets, replacement=args.replacement, min_length=args.min_length)
+
+    out = sys.stdout.buffer
+    try:
+        if not args.paths:
+            out.writelines(redactor.filter_lines(sys.stdin.buffer))
+        for path in args.paths:
+            with open(path, 'rb') as f:
+                out.writelines(redactor.filter_lines(f))
+        out.flush()
+    except KeyboardInterrupt:
+        pass
+    if args.report:
+        sys.stderr.write(redactor.report().model_dump_json(indent=2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
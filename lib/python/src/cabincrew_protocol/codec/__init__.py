@@ -0,0 +1,12 @@
+# CabinCrew Protocol - Wire codecs
+# Optional binary (MessagePack) encoding for the protocol models.
+
+from .binary import FORMAT_VERSION, decode, decode_stream, encode, encode_stream
+
+__all__ = [
+    "FORMAT_VERSION",
+    "decode",
+    "decode_stream",
+    "encode",
+    "encode_stream",
+]
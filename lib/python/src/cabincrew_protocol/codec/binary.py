@@ -0,0 +1,260 @@
+# CabinCrew Protocol - Binary (MessagePack) wire format
+#
+# Hand-written helper; not generated from the schema.
+#
+# Optional dependency: pip install 'cabincrew-protocol[msgpack]'
+#
+# Encoding is schema-driven and compiled once per model:
+#   - objects are positional arrays in field declaration order (no key strings)
+#   - enums are their index in declaration order (one byte)
+#   - AwareDatetime is int microseconds since the Unix epoch, or
+#     [microseconds, utc_offset_minutes] when the offset is not UTC
+#   - unions of models are [variant_index, value]
+#   - RecordStringAny, dict and Any fields are plain maps / values; anything
+#     inside them that JSON would stringify (datetime, enum, ...) is sent as
+#     its JSON value, so every model_dump_json-able instance encodes
+# A message is a msgpack array [FORMAT_VERSION, value]. Decoding a message
+# written by an older schema with fewer fields fills the missing ones with
+# their defaults. Round-tripping preserves canonical hashes exactly.
+
+from __future__ import annotations
+
+import typing
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Callable, TypeVar, Union
+
+from pydantic import AwareDatetime, BaseModel
+from pydantic_core import PydanticUndefined, to_jsonable_python
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - exercised only without the extra
+    msgpack = None
+
+M = TypeVar('M', bound=BaseModel)
+
+FORMAT_VERSION = 1
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+Encoder = Callable[[Any], Any]
+Decoder = Callable[[Any, bool], Any]
+
+
+def _require_msgpack() -> None:
+    if msgpack is None:
+        raise ImportError(
+            "the binary wire format requires msgpack: pip install 'cabincrew-protocol[msgpack]'"
+        )
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _identity_decode(value: Any, construct: bool) -> Any:
+    return value
+
+
+def _encode_datetime(value: datetime) -> Any:
+    micros = (value - _EPOCH) // _MICROSECOND
+    offset = value.utcoffset()
+    if not offset:
+        return micros
+    return [micros, int(offset.total_seconds()) // 60]
+
+
+def _decode_datetime(value: Any, construct: bool) -> datetime:
+    if isinstance(value, list):
+        micros, offset = value
+        tz = timezone(timedelta(minutes=offset))
+        return (_EPOCH + timedelta(microseconds=micros)).astimezone(tz)
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def _nullable(encode: Encoder, decode: Decoder) -> tuple[Encoder, Decoder]:
+    return (
+        lambda v: None if v is None else encode(v),
+        lambda v, c: None if v is None else decode(v, c),
+    )
+
+
+def _enum(cls: type[Enum]) -> tuple[Encoder, Decoder]:
+    members = list(cls)
+    index = {member: i for i, member in enumerate(members)}
+    return index.__getitem__, lambda v, c: members[v]
+
+
+def _list(item: tuple[Encoder, Decoder]) -> tuple[Encoder, Decoder]:
+    encode, decode = item
+    if encode is _identity:
+        return list, lambda v, c: v
+    return (
+        lambda v: [encode(x) for x in v],
+        lambda v, c: [decode(x, c) for x in v],
+    )
+
+
+def _record(cls: type[BaseModel]) -> tuple[Encoder, Decoder]:
+    """Models with no declared fields (RecordStringAny): a plain map of extras."""
+    return (
+        lambda v: v.model_dump(mode='json'),
+        lambda v, c: _construct_record(cls, v) if c else v,
+    )
+
+
+def _construct_record(cls: type[BaseModel], extra: dict[str, Any]) -> BaseModel:
+    instance = cls.__new__(cls)
+    _set(instance, '__dict__', {})
+    _set(instance, '__pydantic_fields_set__', set(extra))
+    _set(instance, '__pydantic_extra__', extra)
+    _set(instance, '__pydantic_private__', None)
+    return instance
+
+
+def _union(variants: list[Any]) -> tuple[Encoder, Decoder]:
+    models = [v for v in variants if isinstance(v, type) and issubclass(v, BaseModel) and v.model_fields]
+    if len(models) != len(variants):
+        # Unions of JSON types (e.g. Artifact.body) travel as-is.
+        return _identity, _identity_decode
+    codecs = [_model_codec(m) for m in models]
+    positions = {m: i for i, m in enumerate(models)}
+
+    def encode(value: Any) -> Any:
+        i = positions[type(value)]
+        return [i, codecs[i][0](value)]
+
+    def decode(value: Any, construct: bool) -> Any:
+        i, body = value
+        return codecs[i][1](body, construct)
+
+    return encode, decode
+
+
+def _compile(annotation: Any) -> tuple[Encoder, Decoder]:
+    origin = typing.get_origin(annotation)
+    if origin is Union:
+        args = typing.get_args(annotation)
+        variants = [a for a in args if a is not type(None)]
+        inner = _compile(variants[0]) if len(variants) == 1 else _union(variants)
+        return _nullable(*inner) if len(variants) != len(args) else inner
+    if origin is list:
+        (item,) = typing.get_args(annotation)
+        return _list(_compile(item))
+    if annotation is AwareDatetime or annotation is datetime:
+        return _encode_datetime, _decode_datetime
+    if isinstance(annotation, type):
+        if issubclass(annotation, Enum):
+            return _enum(annotation)
+        if issubclass(annotation, BaseModel):
+            return _codec(annotation)
+    return _identity, _identity_decode
+
+
+def _codec(model: type[BaseModel]) -> tuple[Encoder, Decoder]:
+    return _record(model) if not model.model_fields else _model_codec(model)
+
+
+_CODECS: dict[type[BaseModel], tuple[Encoder, Decoder]] = {}
+_set = object.__setattr__
+
+
+def _construct(cls: type[BaseModel], fields: dict[str, Any]) -> BaseModel:
+    """Trusted construction: like `model_construct` without default handling."""
+    instance = cls.__new__(cls)
+    _set(instance, '__dict__', fields)
+    _set(instance, '__pydantic_fields_set__', set(fields))
+    _set(instance, '__pydantic_extra__', None)
+    _set(instance, '__pydantic_private__', None)
+    return instance
+
+
+def _model_codec(model: type[BaseModel]) -> tuple[Encoder, Decoder]:
+    """
+    Generate straight-line encode/decode functions for `model`.
+    Fields that need no conversion (str, int, float, bool, maps) are inlined.
+    """
+    codec = _CODECS.get(model)
+    if codec is not None:
+        return codec
+
+    # Register trampolines first so self-referencing models terminate.
+    compiled: list[tuple[Encoder, Decoder]] = []
+    _CODECS[model] = (lambda v: compiled[0](v), lambda v, c: compiled[1](v, c))
+
+    namespace: dict[str, Any] = {'model': model, 'construct': _construct}
+    encode_items = []
+    decode_items = []
+    padding = []
+    for i, (name, field) in enumerate(model.model_fields.items()):
+        enc, dec = _compile(field.annotation)
+        default = None if field.default is PydanticUndefined else field.default
+        padding.append(None if default is None else enc(default))
+        if enc is _identity:
+            encode_items.append(f"d[{name!r}]")
+            decode_items.append(f"{name!r}: v[{i}]")
+        else:
+            namespace[f"e{i}"] = enc
+            namespace[f"d{i}"] = dec
+            encode_items.append(f"e{i}(d[{name!r}])")
+            decode_items.append(f"{name!r}: d{i}(v[{i}], c)")
+    namespace['padding'] = padding
+    source = (
+        "def encode(value):\n"
+        "    d = value.__dict__\n"
+        f"    return [{', '.join(encode_items)}]\n"
+        "def decode(v, c):\n"
+        f"    if len(v) < {len(padding)}:\n"
+        "        v = v + padding[len(v):]\n"
+        f"    out = {{{', '.join(decode_items)}}}\n"
+        "    return construct(model, out) if c else out\n"
+    )
+    exec(compile(source, f"<binary codec for {model.__name__}>", 'exec'), namespace)
+    compiled.extend((namespace['encode'], namespace['decode']))
+    _CODECS[model] = (namespace['encode'], namespace['decode'])
+    return _CODECS[model]
+
+
+def encode(instance: BaseModel) -> bytes:
+    """Serialize a protocol model instance to the binary wire format."""
+    _require_msgpack()
+    body = _codec(type(instance))[0](instance)
+    return msgpack.packb([FORMAT_VERSION, body], use_bin_type=True, default=to_jsonable_python)
+
+
+def decode(model: type[M], data: Union[bytes, bytearray, memoryview], validate: bool = True) -> M:
+    """
+    Deserialize `data` as `model`.
+
+    With `validate=False` instances are assembled directly from the unpacked
+    values, skipping pydantic validation entirely; use it only for data this
+    process or a trusted peer encoded.
+    """
+    _require_msgpack()
+    version, body = msgpack.unpackb(data, raw=False, use_list=True, strict_map_key=False)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported binary format version {version}")
+    decoded = _codec(model)[1](body, not validate)
+    return decoded if not validate else model.model_validate(decoded)
+
+
+def encode_stream(instances: Iterable[BaseModel]) -> Iterator[bytes]:
+    """Encode instances as concatenated messages (msgpack is self-delimiting)."""
+    for instance in instances:
+        yield encode(instance)
+
+
+def decode_stream(model: type[M], data: Union[bytes, memoryview], validate: bool = True) -> Iterator[M]:
+    """Decode concatenated messages produced by `encode_stream`."""
+    _require_msgpack()
+    codec = _codec(model)[1]
+    unpacker = msgpack.Unpacker(raw=False, use_list=True, strict_map_key=False)
+    unpacker.feed(data)
+    for version, body in unpacker:
+        if version != FORMAT_VERSION:
+            raise ValueError(f"unsupported binary format version {version}")
+        decoded = codec(body, not validate)
+        yield decoded if not validate else model.model_validate(decoded)
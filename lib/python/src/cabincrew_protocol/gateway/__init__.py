@@ -0,0 +1,52 @@
+# CabinCrew Protocol - Gateway helpers
+# Hand-written runtime support for LLM and MCP gateways built on the generated models in ..protocol
+
+from .cache import SharedDecisionCache, decision_cache_key
+from .payloads import (
+    BLOB_REF_KEY,
+    DEFAULT_THRESHOLD,
+    PAYLOAD_FIELDS,
+    BlobNotFoundError,
+    BlobRef,
+    BlobStore,
+    LazyPayload,
+    PayloadRef,
+    blob_ref,
+    inline_payloads,
+    offload_payloads,
+    resolve_payload,
+)
+from .prefork import GatewayWorkerError, PreforkGateway
+from .ratelimit import RateLimit, RateLimiter, RateLimitLevel
+from .routing import ModelRouter, ModelStats, RoutingConfigError, RoutingGatewayHandler, RoutingStrategy
+from .rules import RuleGatewayHandler, evaluate_rules, rule_matches
+
+__all__ = [
+    "BLOB_REF_KEY",
+    "DEFAULT_THRESHOLD",
+    "PAYLOAD_FIELDS",
+    "BlobNotFoundError",
+    "BlobRef",
+    "BlobStore",
+    "GatewayWorkerError",
+    "LazyPayload",
+    "ModelRouter",
+    "ModelStats",
+    "PayloadRef",
+    "PreforkGateway",
+    "RateLimit",
+    "RateLimitLevel",
+    "RateLimiter",
+    "RoutingConfigError",
+    "RoutingGatewayHandler",
+    "RoutingStrategy",
+    "RuleGatewayHandler",
+    "SharedDecisionCache",
+    "blob_ref",
+    "decision_cache_key",
+    "evaluate_rules",
+    "inline_payloads",
+    "offload_payloads",
+    "resolve_payload",
+    "rule_matches",
+]
@@ -0,0 +1,164 @@
+# CabinCrew Protocol - Shared-memory gateway decision cache
+#
+# Hand-written helper; not generated from the schema.
+#
+# A fixed-size, 4-way set-associative hash table in one
+# multiprocessing.shared_memory block, shared by every gateway worker process.
+# There are no cross-process locks: each slot carries a CRC over its contents,
+# so a reader that races a writer sees a checksum mismatch and treats the slot
+# as a miss. Entries are tagged with the policy generation that produced them;
+# bumping the generation on policy reload invalidates everything at once.
+#
+# Block layout:
+#   header  magic(8) version(u32) generation(u32) slots(u32) value_size(u32), padded to 64
+#   slot    key(16) generation(u32) expires(f64) length(u16) crc(u32) value(value_size)
+
+from __future__ import annotations
+
+import hashlib
+import struct
+import time
+import zlib
+from multiprocessing import shared_memory
+from typing import Optional
+
+from ..integrity import canonical_json
+from .rules import GatewayRequest
+
+_MAGIC = b'CCDCACHE'
+_VERSION = 1
+_HEADER = struct.Struct('<8sIIII')
+_HEADER_SIZE = 64
+_GENERATION_OFFSET = 12
+_GENERATION = struct.Struct('<I')
+_SLOT = struct.Struct('<16sIdHI')
+_WAYS = 4
+
+
+def decision_cache_key(request: GatewayRequest) -> bytes:
+    """
+    Cache key for a gateway request: everything except `request_id` and
+    `timestamp`, so identical requests from different calls share a decision.
+    Decisions that depend on either field must not be cached.
+    """
+    body = request.model_dump(mode='json', exclude_none=True, exclude={'request_id', 'timestamp'})
+    body['type'] = type(request).__name__
+    return canonical_json(body)
+
+
+class SharedDecisionCache:
+    """
+    Cross-process cache of serialized gateway decisions.
+
+    Create it once in the supervising process (`SharedDecisionCache(slots=...)`)
+    and open it in workers with `SharedDecisionCache.attach(name)`. Values
+    longer than `value_size` bytes are not cached.
+    """
+
+    def __init__(
+        self,
+        slots: int = 65536,
+        value_size: int = 470,
+        ttl: float = 60.0,
+        name: Optional[str] = None,
+    ) -> None:
+        slots = max(_WAYS, slots - slots % _WAYS)
+        self.ttl = ttl
+        self.value_size = value_size
+        self.slot_size = -(-(_SLOT.size + value_size) // 8) * 8
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=_HEADER_SIZE + slots * self.slot_size)
+        self._owner = True
+        self._buf = self._shm.buf
+        self._buf[:_HEADER_SIZE] = bytes(_HEADER_SIZE)
+        _HEADER.pack_into(self._buf, 0, _MAGIC, _VERSION, 1, slots, value_size)
+        self.slots = slots
+
+    @classmethod
+    def attach(cls, name: str, ttl: float = 60.0) -> SharedDecisionCache:
+        """Open an existing cache created by another process."""
+        cache = cls.__new__(cls)
+        cache._shm = shared_memory.SharedMemory(name=name)
+        cache._owner = False
+        cache._buf = cache._shm.buf
+        magic, version, _, slots, value_size = _HEADER.unpack_from(cache._buf, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"shared memory block {name!r} is not a decision cache")
+        cache.ttl = ttl
+        cache.slots = slots
+        cache.value_size = value_size
+        cache.slot_size = -(-(_SLOT.size + value_size) // 8) * 8
+        return cache
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def generation(self) -> int:
+        return _GENERATION.unpack_from(self._buf, _GENERATION_OFFSET)[0]
+
+    def invalidate(self) -> int:
+        """Start a new generation (e.g. after a policy reload); returns it."""
+        generation = (self.generation + 1) & 0xFFFFFFFF
+        _GENERATION.pack_into(self._buf, _GENERATION_OFFSET, generation)
+        return generation
+
+    def _set_offsets(self, key: bytes) -> tuple[bytes, range]:
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little') % (self.slots // _WAYS) * _WAYS
+        start = _HEADER_SIZE + first * self.slot_size
+        return digest, range(start, start + _WAYS * self.slot_size, self.slot_size)
+
+    def _read(self, offset: int) -> Optional[tuple[bytes, int, float, bytes]]:
+        raw = bytes(self._buf[offset:offset + self.slot_size])
+        key, generation, expires, length, crc = _SLOT.unpack_from(raw)
+        if length > self.value_size:
+            return None
+        value = raw[_SLOT.size:_SLOT.size + length]
+        if zlib.crc32(value, zlib.crc32(raw[:_SLOT.size - 4])) != crc:
+            return None
+        return key, generation, expires, value
+
+    def get(self, key: bytes, generation: Optional[int] = None) -> Optional[bytes]:
+        """Cached value for `key` from `generation` (default: current), or None."""
+        generation = self.generation if generation is None else generation
+        digest, offsets = self._set_offsets(key)
+        now = time.time()
+        for offset in offsets:
+            entry = self._read(offset)
+            if entry is not None and entry[0] == digest and entry[1] == generation and entry[2] > now:
+                return entry[3]
+        return None
+
+    def put(self, key: bytes, value: bytes, generation: Optional[int] = None, ttl: Optional[float] = None) -> bool:
+        """Store `value`; False if it is larger than `value_size`."""
+        if len(value) > self.value_size:
+            return False
+        generation = self.generation if generation is None else generation
+        digest, offsets = self._set_offsets(key)
+        now = time.time()
+        victim, victim_expires = offsets[0], float('inf')
+        for offset in offsets:
+            entry = self._read(offset)
+            if entry is None or entry[0] == digest or entry[1] != generation or entry[2] <= now:
+                victim = offset
+                break
+            if entry[2] < victim_expires:
+                victim, victim_expires = offset, entry[2]
+        header = _SLOT.pack(digest, generation, now + (self.ttl if ttl is None else ttl), len(value), 0)
+        crc = zlib.crc32(value, zlib.crc32(header[:-4]))
+        self._buf[victim:victim + _SLOT.size + len(value)] = header[:-4] + crc.to_bytes(4, 'little') + value
+        return True
+
+    def close(self) -> None:
+        """Detach; the creating process also unlinks the block."""
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> SharedDecisionCache:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
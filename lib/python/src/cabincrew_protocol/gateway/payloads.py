@@ -0,0 +1,223 @@
+# CabinCrew Protocol - Content-addressed gateway payloads
+#
+# Hand-written helper; not generated from the schema.
+#
+# Large `LLMGatewayRequest.input` / `LLMGatewayResponse.rewritten_input`
+# records are stored once in a local BlobStore and replaced in the message by
+# a PayloadRef, a RecordStringAny subclass that serializes as
+#
+#   {"$blob": {"sha256": "<canonical_hash of the payload>", "size": <bytes>}}
+#
+# so offloaded messages stay small in cache keys, pickles and logs. Handlers
+# that need the content call `resolve_payload()`, which returns a mapping that
+# reads the blob on first access.
+#
+# Only PayloadRef instances made by `offload_payloads` are references. The
+# `$blob` key itself means nothing: a client input of that shape, or a
+# reference that went through JSON (e.g. into a PreforkGateway worker), is
+# ordinary data, so a client cannot name another request's stored payload.
+#
+#   store = BlobStore('/var/lib/cabincrew/blobs')
+#   request = offload_payloads(request, store)        # at the gateway edge
+#   prompt = resolve_payload(request.input, store)    # in the handler
+#   prompt['messages']                                # blob is read here
+
+from __future__ import annotations
+
+import json
+import os
+import uuid
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+from typing import Any, Optional, TypeVar, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from ..integrity import canonical_json, sha256_hex
+from ..protocol import LLMGatewayRequest, LLMGatewayResponse, RecordStringAny
+
+BLOB_REF_KEY = '$blob'
+DEFAULT_THRESHOLD = 64 * 1024
+
+PAYLOAD_FIELDS: dict[type[BaseModel], tuple[str, ...]] = {
+    LLMGatewayRequest: ('input',),
+    LLMGatewayResponse: ('rewritten_input',),
+}
+"""Fields that `offload_payloads` / `inline_payloads` handle per message type."""
+
+M = TypeVar('M', bound=BaseModel)
+
+
+class BlobRef(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    sha256: str = Field(..., pattern='^[0-9a-f]{64}$')
+    size: int = Field(..., ge=0)
+
+
+class BlobNotFoundError(KeyError):
+    """The referenced blob is not in the store."""
+
+
+class BlobStore:
+    """
+    Directory of immutable blobs named by the SHA256 of their content
+    (`<root>/<first two hex digits>/<rest>`). Writes are atomic and
+    deduplicated, so several processes may share one store. With
+    `verify=True` reads re-hash the content.
+    """
+
+    def __init__(self, root: Union[str, Path], fsync: bool = False, verify: bool = False) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.verify = verify
+
+    def path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:]
+
+    def __contains__(self, sha256: str) -> bool:
+        return self.path(sha256).exists()
+
+    def put(self, data: bytes) -> BlobRef:
+        ref = BlobRef(sha256=sha256_hex(data), size=len(data))
+        path = self.path(ref.sha256)
+        if path.exists():
+            return ref
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+            if self.fsync:
+                fh.flush()
+                os.fsync(fh.fileno())
+        os.replace(tmp, path)
+        return ref
+
+    def put_json(self, value: Any) -> BlobRef:
+        """Store the canonical JSON of `value`; the ref's sha256 equals `canonical_hash(value)`."""
+        return self.put(canonical_json(value))
+
+    def get(self, ref: Union[BlobRef, str]) -> bytes:
+        sha256 = ref.sha256 if isinstance(ref, BlobRef) else ref
+        try:
+            data = self.path(sha256).read_bytes()
+        except FileNotFoundError:
+            raise BlobNotFoundError(sha256) from None
+        if self.verify and sha256_hex(data) != sha256:
+            raise ValueError(f"blob {sha256} is corrupt")
+        return data
+
+    def get_json(self, ref: Union[BlobRef, str]) -> Any:
+        return json.loads(self.get(ref))
+
+    def __iter__(self) -> Iterator[str]:
+        for directory in self.root.iterdir():
+            if directory.is_dir() and len(directory.name) == 2:
+                for path in directory.iterdir():
+                    if not path.name.startswith('.'):
+                        yield directory.name + path.name
+
+    def delete(self, ref: Union[BlobRef, str]) -> bool:
+        sha256 = ref.sha256 if isinstance(ref, BlobRef) else ref
+        try:
+            self.path(sha256).unlink()
+        except FileNotFoundError:
+            return False
+        return True
+
+    def collect_garbage(self, keep: Iterable[str]) -> int:
+        """Delete every blob whose hash is not in `keep`; returns the number removed."""
+        keep = set(keep)
+        return sum(self.delete(sha256) for sha256 in list(self) if sha256 not in keep)
+
+
+class PayloadRef(RecordStringAny):
+    """Payload field value put in place of offloaded content by `offload_payloads`."""
+
+    @property
+    def ref(self) -> BlobRef:
+        return BlobRef.model_validate(self.__pydantic_extra__[BLOB_REF_KEY])
+
+
+def blob_ref(value: Any) -> Optional[BlobRef]:
+    """The BlobRef if `value` is a PayloadRef, else None (whatever keys it has)."""
+    return value.ref if isinstance(value, PayloadRef) else None
+
+
+def payload_ref_record(ref: BlobRef) -> PayloadRef:
+    return PayloadRef.model_validate({BLOB_REF_KEY: ref.model_dump()})
+
+
+class LazyPayload(Mapping):
+    """Read-only mapping over a stored payload; the blob is read and parsed on first access."""
+
+    __slots__ = ('ref', '_store', '_value')
+
+    def __init__(self, ref: BlobRef, store: BlobStore) -> None:
+        self.ref = ref
+        self._store = store
+        self._value: Optional[dict[str, Any]] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def _load(self) -> dict[str, Any]:
+        if self._value is None:
+            self._value = self._store.get_json(self.ref)
+        return self._value
+
+    def __getitem__(self, key: str) -> Any:
+        return self._load()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __repr__(self) -> str:
+        return f"LazyPayload(sha256={self.ref.sha256[:12]}..., size={self.ref.size}, loaded={self.loaded})"
+
+
+def resolve_payload(value: Optional[Union[RecordStringAny, dict[str, Any]]], store: BlobStore) -> Optional[Mapping]:
+    """
+    Mapping view of a payload field: a LazyPayload for a PayloadRef, otherwise
+    the record's own fields.
+    """
+    if value is None:
+        return None
+    ref = blob_ref(value)
+    if ref is not None:
+        return LazyPayload(ref, store)
+    return value.model_dump(mode='json') if isinstance(value, RecordStringAny) else value
+
+
+def offload_payloads(message: M, store: BlobStore, threshold: int = DEFAULT_THRESHOLD) -> M:
+    """
+    Copy of `message` with each payload field whose canonical JSON is at least
+    `threshold` bytes stored in `store` and replaced by its reference.
+    Messages without payload fields, or with nothing that large, are returned
+    unchanged.
+    """
+    update = {}
+    for field in PAYLOAD_FIELDS.get(type(message), ()):
+        value = getattr(message, field)
+        if value is None or blob_ref(value) is not None:
+            continue
+        data = canonical_json(value.model_dump(mode='json'))
+        if len(data) >= threshold:
+            update[field] = payload_ref_record(store.put(data))
+    return message.model_copy(update=update) if update else message
+
+
+def inline_payloads(message: M, store: BlobStore) -> M:
+    """Inverse of `offload_payloads`: copy of `message` with references replaced by their content."""
+    update = {}
+    for field in PAYLOAD_FIELDS.get(type(message), ()):
+        ref = blob_ref(getattr(message, field))
+        if ref is not None:
+            update[field] = RecordStringAny.model_validate(store.get_json(ref))
+    return message.model_copy(update=update) if update else message
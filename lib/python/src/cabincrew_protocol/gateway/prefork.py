@@ -0,0 +1,409 @@
+# CabinCrew Protocol - Prefork gateway worker harness
+#
+# Hand-written helper; not generated from the schema.
+#
+# Runs an LLM or MCP gateway handler in N worker processes so request
+# validation and rule evaluation are not serialized on one GIL:
+#
+#   gateway = PreforkGateway(RuleGatewayHandler, config, workers=8)
+#   with gateway:
+#       response = gateway.handle(request)                 # one request
+#       responses = gateway.handle_many(requests)          # batched per worker
+#       gateway.reload(new_config)                         # graceful
+#
+# Requests are routed by crc32(session or request_id) % workers, so a session
+# always lands on the same worker. Workers share a SharedDecisionCache: a
+# cacheable response computed by one worker is served by all of them until
+# the policy generation changes. The cache key leaves out `request_id` and
+# `timestamp`, so rules matching on those fields need `cache_slots=0`.
+# `handler_factory(config)` must be picklable
+# (a top-level function or class) and return `handler(request) -> response`.
+# Reload is graceful: each worker finishes the batches already queued to it
+# with the old handler (and old cached decisions), then switches.
+
+from __future__ import annotations
+
+import itertools
+import json
+import multiprocessing
+import os
+import threading
+import zlib
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from multiprocessing.connection import Connection, wait
+from typing import Any, Callable, Optional, Union
+
+from ..integrity import canonical_hash, format_timestamp
+from ..protocol import (
+    Decision,
+    LLMGatewayPolicyConfig,
+    LLMGatewayRequest,
+    LLMGatewayResponse,
+    MCPGatewayPolicyConfig,
+    MCPGatewayRequest,
+    MCPGatewayResponse,
+)
+from .cache import SharedDecisionCache, decision_cache_key
+from .rules import GatewayPolicyConfig, GatewayRequest, GatewayResponse
+
+HandlerFactory = Callable[[Any], Callable[[Any], Any]]
+
+_MODELS: dict[str, tuple[type, type, type]] = {
+    'llm': (LLMGatewayPolicyConfig, LLMGatewayRequest, LLMGatewayResponse),
+    'mcp': (MCPGatewayPolicyConfig, MCPGatewayRequest, MCPGatewayResponse),
+}
+
+# Decisions that may be served from the cache. require_approval responses
+# carry a fresh approval_id and must never be replayed.
+_CACHEABLE = frozenset({Decision.allow.value, Decision.warn.value, Decision.deny.value})
+
+
+class GatewayWorkerError(RuntimeError):
+    """A worker failed to handle a request, or died while it was queued."""
+
+
+def _worker_main(
+    kind: str,
+    handler_factory: HandlerFactory,
+    config_json: bytes,
+    generation: int,
+    cache_name: Optional[str],
+    inbox: Connection,
+    outbox: Connection,
+) -> None:
+    config_model, request_model, _ = _MODELS[kind]
+    handler = handler_factory(config_model.model_validate_json(config_json))
+    cache = SharedDecisionCache.attach(cache_name) if cache_name else None
+    try:
+        while True:
+            message = inbox.recv()
+            if message[0] == 'stop':
+                return
+            if message[0] == 'reload':
+                _, generation, config_json = message
+                handler = handler_factory(config_model.model_validate_json(config_json))
+                outbox.send(('reloaded', generation))
+                continue
+            results = []
+            hits = 0
+            for ticket, data in message[1]:
+                try:
+                    request = request_model.model_validate_json(data)
+                    key = decision_cache_key(request) if cache is not None else b''
+                    cached = cache.get(key, generation) if cache is not None else None
+                    if cached is not None:
+                        hits += 1
+                        body = json.loads(cached)
+                        body['request_id'] = request.request_id
+                        body['timestamp'] = format_timestamp(datetime.now(timezone.utc))
+                        out = json.dumps(body).encode()
+                    else:
+                        response = handler(request)
+                        out = response.model_dump_json(exclude_none=True).encode()
+                        if cache is not None and response.decision.value in _CACHEABLE:
+                            cache.put(key, response.model_dump_json(
+                                exclude_none=True, exclude={'request_id', 'timestamp'},
+                            ).encode(), generation)
+                    results.append((ticket, True, out))
+                except Exception as exc:  # reported to the caller, worker keeps serving
+                    results.append((ticket, False, f"{type(exc).__name__}: {exc}"))
+            outbox.send(('results', results, hits))
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+class _Worker:
+    def __init__(self, process: Any, inbox: Connection, outbox: Connection, generation: int) -> None:
+        self.process = process
+        self.inbox = inbox
+        self.outbox = outbox
+        self.generation = generation
+        """Policy generation the worker has confirmed it runs."""
+        self.send_lock = threading.Lock()
+        """Serializes writes to `inbox`: Connection.send is not thread-safe, and large messages take several writes."""
+        self.pending: dict[int, Future] = {}
+        self.alive = True
+        self.handled = 0
+        self.cache_hits = 0
+
+
+class PreforkGateway:
+    """
+    Supervisor for a pool of gateway worker processes.
+
+    `kind` is 'llm' or 'mcp' and selects the request/response/config models.
+    `workers` defaults to os.cpu_count(). `cache_slots=0` disables the shared
+    decision cache; use it when rules match on `request_id` or `timestamp`,
+    which the cache key leaves out. Dead workers are restarted; requests queued to them fail
+    with GatewayWorkerError.
+    """
+
+    def __init__(
+        self,
+        handler_factory: HandlerFactory,
+        config: GatewayPolicyConfig,
+        workers: Optional[int] = None,
+        kind: str = 'llm',
+        cache_slots: int = 65536,
+        cache_ttl: float = 60.0,
+        start_method: Optional[str] = None,
+    ) -> None:
+        if kind not in _MODELS:
+            raise ValueError(f"kind must be 'llm' or 'mcp', not {kind!r}")
+        self.kind = kind
+        self.handler_factory = handler_factory
+        self.config = config
+        self.workers = workers or os.cpu_count() or 1
+        if start_method is None:
+            methods = multiprocessing.get_all_start_methods()
+            start_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        self._context = multiprocessing.get_context(start_method)
+        self._cache = SharedDecisionCache(cache_slots, ttl=cache_ttl) if cache_slots else None
+        self._generation = self._cache.generation if self._cache else 1
+        self._config_hash = canonical_hash(config)
+        self._tickets = itertools.count()
+        self._lock = threading.Lock()
+        self._reloads: dict[int, threading.Event] = {}
+        self._pool: list[_Worker] = []
+        self._collector: Optional[threading.Thread] = None
+        self._closing = False
+
+    # Lifecycle
+
+    def _spawn(self) -> _Worker:
+        """Start a worker on the current config; call without the lock held (starting a process is slow)."""
+        with self._lock:
+            config_json = self.config.model_dump_json().encode()
+            generation = self._generation
+        inbox_recv, inbox_send = self._context.Pipe(duplex=False)
+        outbox_recv, outbox_send = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                self.kind, self.handler_factory, config_json, generation,
+                self._cache.name if self._cache else None, inbox_recv, outbox_send,
+            ),
+            daemon=True,
+        )
+        process.start()
+        inbox_recv.close()
+        outbox_send.close()
+        return _Worker(process, inbox_send, outbox_recv, generation)
+
+    @staticmethod
+    def _send(worker: _Worker, message: tuple) -> bool:
+        """Send `message` to `worker`; False if its pipe is gone (the worker died)."""
+        with worker.send_lock:
+            try:
+                worker.inbox.send(message)
+            except (OSError, ValueError):
+                return False
+        return True
+
+    def start(self) -> None:
+        if self._pool:
+            return
+        self._closing = False
+        self._pool = [self._spawn() for _ in range(self.workers)]
+        self._collector = threading.Thread(target=self._collect, name='prefork-gateway-collector', daemon=True)
+        self._collector.start()
+
+    def close(self) -> None:
+        """Stop workers after they drain their queues, then release the cache."""
+        self._closing = True
+        for worker in self._pool:
+            self._send(worker, ('stop',))
+        for worker in self._pool:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        if self._collector is not None:
+            self._collector.join(timeout=10)
+        for worker in self._pool:
+            worker.inbox.close()
+            worker.outbox.close()
+        self._pool = []
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
+
+    def __enter__(self) -> PreforkGateway:
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    # Result collection
+
+    def _collect(self) -> None:
+        while not self._closing or any(w.pending for w in self._pool):
+            by_conn = {w.outbox: i for i, w in enumerate(self._pool) if w.alive}
+            if not by_conn:
+                break
+            for conn in wait(list(by_conn), timeout=0.1):
+                index = by_conn[conn]
+                worker = self._pool[index]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    self._worker_died(index)
+                    continue
+                if message[0] == 'reloaded':
+                    with self._lock:
+                        worker.generation = max(worker.generation, message[1])
+                        self._check_reloads()
+                    continue
+                _, results, hits = message
+                worker.cache_hits += hits
+                for ticket, ok, payload in results:
+                    with self._lock:
+                        future = worker.pending.pop(ticket, None)
+                    if future is None:
+                        continue
+                    worker.handled += 1
+                    if ok:
+                        future.set_result(payload)
+                    else:
+                        future.set_exception(GatewayWorkerError(payload))
+
+    def _worker_died(self, index: int) -> None:
+        worker = self._pool[index]
+        # Start the replacement before taking the lock. Until the swap below,
+        # submit_many still attaches futures to the dead worker; they are
+        # taken from its pending and failed together with the rest.
+        replacement = None if self._closing else self._spawn()
+        stale = None
+        with self._lock:
+            worker.alive = False
+            pending, worker.pending = worker.pending, {}
+            if replacement is not None:
+                self._pool[index] = replacement
+                if replacement.generation < self._generation:
+                    # A reload ran while it was starting; it holds up that reload until switched.
+                    stale = ('reload', self._generation, self.config.model_dump_json().encode())
+            self._check_reloads()
+        if stale is not None:
+            self._send(replacement, stale)
+        for future in pending.values():
+            future.set_exception(GatewayWorkerError(f"gateway worker {index} exited"))
+        with worker.send_lock:
+            worker.inbox.close()
+        worker.outbox.close()
+
+    # Dispatch
+
+    def route(self, request: GatewayRequest, session: Optional[str] = None) -> int:
+        """Worker index for `request` (stable across processes and restarts)."""
+        key = session if session is not None else request.request_id
+        return zlib.crc32(key.encode('utf-8')) % len(self._pool)
+
+    def submit_many(
+        self,
+        requests: list[GatewayRequest],
+        sessions: Optional[list[Optional[str]]] = None,
+    ) -> list[Future]:
+        """
+        Queue requests (one message per worker) and return futures resolving
+        to the response JSON bytes, in request order.
+        """
+        if not self._pool:
+            raise RuntimeError("gateway is not started")
+        batches: dict[int, tuple[_Worker, list[tuple[int, bytes]]]] = {}
+        futures = []
+        with self._lock:
+            for position, request in enumerate(requests):
+                index = self.route(request, sessions[position] if sessions else None)
+                worker = self._pool[index]
+                future: Future = Future()
+                futures.append(future)
+                if not worker.alive:
+                    # Dead and not replaced (the gateway is closing).
+                    future.set_exception(GatewayWorkerError(f"gateway worker {index} exited"))
+                    continue
+                ticket = next(self._tickets)
+                worker.pending[ticket] = future
+                batches.setdefault(index, (worker, []))[1].append((ticket, request.model_dump_json().encode()))
+        for worker, batch in batches.values():
+            # If the worker died after routing, _worker_died fails its pending futures.
+            self._send(worker, ('batch', batch))
+        return futures
+
+    def _decode(self, payload: bytes, raw: bool) -> Union[GatewayResponse, bytes]:
+        return payload if raw else _MODELS[self.kind][2].model_validate_json(payload)
+
+    def handle(
+        self,
+        request: GatewayRequest,
+        session: Optional[str] = None,
+        timeout: Optional[float] = None,
+        raw: bool = False,
+    ) -> Union[GatewayResponse, bytes]:
+        """Handle one request; `raw=True` returns the response JSON bytes unparsed."""
+        future = self.submit_many([request], [session])[0]
+        return self._decode(future.result(timeout), raw)
+
+    def handle_many(
+        self,
+        requests: list[GatewayRequest],
+        sessions: Optional[list[Optional[str]]] = None,
+        timeout: Optional[float] = None,
+        raw: bool = False,
+    ) -> list[Union[GatewayResponse, bytes]]:
+        futures = self.submit_many(requests, sessions)
+        return [self._decode(f.result(timeout), raw) for f in futures]
+
+    # Policy reload
+
+    def _check_reloads(self) -> None:
+        """Set the event of every reload all live workers have confirmed; call with the lock held."""
+        for generation, event in list(self._reloads.items()):
+            if all(w.generation >= generation for w in self._pool if w.alive):
+                event.set()
+                del self._reloads[generation]
+
+    def reload(self, config: GatewayPolicyConfig, wait: bool = True, timeout: Optional[float] = 30.0) -> bool:
+        """
+        Switch every worker to `config`. Returns False (and does nothing) if
+        the config is canonically identical to the current one.
+
+        Each worker switches after the batches already queued to it, which it
+        still evaluates under the old policy (old cached decisions included);
+        batches submitted after reload() returns with `wait=True` see only the
+        new one. A worker that dies meanwhile is replaced by one started on
+        `config`, so it does not hold up the wait. Raises GatewayWorkerError if
+        the workers have not all switched within `timeout`.
+        """
+        config_hash = canonical_hash(config)
+        if config_hash == self._config_hash:
+            return False
+        event = threading.Event()
+        with self._lock:
+            self.config = config
+            self._config_hash = config_hash
+            self._generation = self._cache.invalidate() if self._cache else self._generation + 1
+            generation = self._generation
+            self._reloads[generation] = event
+            workers = list(self._pool)
+            self._check_reloads()
+        config_json = config.model_dump_json().encode()
+        for worker in workers:
+            self._send(worker, ('reload', generation, config_json))  # if dead, its replacement starts on this config
+        if wait and not event.wait(timeout):
+            raise GatewayWorkerError(f"gateway workers did not switch to the new policy within {timeout}s")
+        return True
+
+    def reload_from_file(self, path: Union[str, os.PathLike], **kwargs: Any) -> bool:
+        """Load a *GatewayPolicyConfig JSON file and `reload()` if it changed."""
+        with open(path, 'rb') as fh:
+            config = _MODELS[self.kind][0].model_validate_json(fh.read())
+        return self.reload(config, **kwargs)
+
+    def stats(self) -> list[dict[str, int]]:
+        """Per-worker counters: pid, handled, cache_hits, pending."""
+        return [
+            {'pid': w.process.pid, 'handled': w.handled, 'cache_hits': w.cache_hits, 'pending': len(w.pending)}
+            for w in self._pool
+        ]
@@ -0,0 +1,215 @@
+# CabinCrew Protocol - Gateway rate limiting
+#
+# Hand-written helper; not generated from the schema.
+#
+# Hierarchical token buckets keyed by request fields, checked in-process:
+#
+#   limiter = RateLimiter([
+#       RateLimitLevel(key=['source'], limit=RateLimit(rate=200, burst=400)),
+#       RateLimitLevel(key=['source', 'model'], limit=RateLimit(rate=20, burst=40),
+#                      overrides={'ci/gpt-4': RateLimit(rate=2, burst=5)}),
+#       RateLimitLevel(key=['model'], limit=RateLimit(rate=500, burst=500), action='warn'),
+#   ])
+#   evaluation = limiter.check(request)    # None, or a warn / deny PolicyEvaluation
+#
+# `key` names attributes of the request (LLMGatewayRequest: source, model,
+# provider; MCPGatewayRequest: source, server_id, method). A level whose key
+# names an attribute the request does not have does not apply to it, so one
+# limiter can hold LLM and MCP levels side by side. Override keys join the
+# values with '/'; only the last value may itself contain '/' (model names,
+# server ids). A request takes one token from its bucket at every level that
+# applies. If a `deny` level is empty the request is denied and nothing is
+# taken; an empty `warn` level only adds a warning.
+#
+# A bucket that has refilled to its burst is the same as no bucket, so idle
+# keys are dropped by a sweep every `sweep_interval` seconds without changing
+# any decision; `max_keys` caps each level in between (least recently used
+# keys go first). Buckets live in plain dicts and are not locked: use one
+# limiter per thread or event loop (each PreforkGateway worker limits on its
+# own, so divide rates by the worker count).
+
+from __future__ import annotations
+
+import time
+from operator import attrgetter
+from typing import Any, Callable, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field, field_validator, model_validator
+
+from ..orchestrator.policy import make_policy_evaluation
+from ..protocol import Decision, LLMGatewayRequest, MCPGatewayRequest, PolicyEvaluation, Source
+
+GatewayRequest = Union[LLMGatewayRequest, MCPGatewayRequest]
+
+
+class RateLimit(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    rate: float = Field(..., gt=0)
+    """Tokens added per second."""
+    burst: float = Field(..., gt=0)
+    """Bucket capacity."""
+
+
+class RateLimitLevel(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    key: list[str] = Field(..., min_length=1)
+    """Request attributes identifying a bucket, e.g. ['source', 'server_id']."""
+    limit: RateLimit
+    action: Decision = Decision.deny
+    """`deny` or `warn` when the bucket is empty."""
+    overrides: dict[str, RateLimit] = Field(default_factory=dict)
+    """Per-key limits; keys are the attribute values joined with '/' (only the last may contain '/')."""
+    policy_id: Optional[str] = None
+    """Defaults to 'rate_limit/<key fields joined with '/'>'."""
+
+    @field_validator('action')
+    @classmethod
+    def _warn_or_deny(cls, action: Decision) -> Decision:
+        if action not in (Decision.warn, Decision.deny):
+            raise ValueError("action must be 'warn' or 'deny'")
+        return action
+
+    @model_validator(mode='after')
+    def _override_keys(self) -> RateLimitLevel:
+        for name in self.overrides:
+            if len(name.split('/', len(self.key) - 1)) != len(self.key):
+                raise ValueError(f"override {name!r} needs {len(self.key)} '/'-separated values for {self.key}")
+        return self
+
+
+class _Level:
+    __slots__ = ('spec', 'policy_id', 'key_of', 'rate', 'burst', 'deny', 'overrides', 'buckets')
+
+    def __init__(self, spec: RateLimitLevel) -> None:
+        self.spec = spec
+        self.policy_id = spec.policy_id or 'rate_limit/' + '/'.join(spec.key)
+        self.key_of = attrgetter(*spec.key)
+        self.rate = spec.limit.rate
+        self.burst = spec.limit.burst
+        self.deny = spec.action is Decision.deny
+        self.overrides = {
+            (tuple(name.split('/', len(spec.key) - 1)) if len(spec.key) > 1 else name): (limit.rate, limit.burst)
+            for name, limit in spec.overrides.items()
+        }
+        # key -> [tokens, last refill, rate, burst]
+        self.buckets: dict[Any, list[float]] = {}
+
+
+class RateLimiter:
+    """Token-bucket limiter over one or more key levels; see the module comment."""
+
+    def __init__(
+        self,
+        levels: list[Union[RateLimitLevel, dict[str, Any]]],
+        sweep_interval: float = 10.0,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._levels = [_Level(RateLimitLevel.model_validate(level)) for level in levels]
+        self.sweep_interval = sweep_interval
+        self.max_keys = max_keys
+        self.clock = clock
+        self._next_sweep = clock() + sweep_interval
+        self.checks = 0
+        self.limited = 0
+
+    def __len__(self) -> int:
+        """Buckets currently held across all levels."""
+        return sum(len(level.buckets) for level in self._levels)
+
+    def check(self, request: GatewayRequest, cost: float = 1.0) -> Optional[PolicyEvaluation]:
+        """Take `cost` tokens for `request`; None if allowed without warning."""
+        now = self.clock()
+        if now >= self._next_sweep:
+            self.sweep(now)
+        self.checks += 1
+        warned = None
+        taken = []
+        for level in self._levels:
+            try:
+                key = level.key_of(request)
+            except AttributeError:
+                continue  # e.g. a 'model' level and an MCP request
+            buckets = level.buckets
+            bucket = buckets.get(key)
+            if bucket is None:
+                if len(buckets) >= self.max_keys:
+                    self._evict(level, now)
+                rate, burst = level.overrides.get(key, (level.rate, level.burst))
+                bucket = buckets[key] = [burst, now, rate, burst]
+            else:
+                tokens = bucket[0] + (now - bucket[1]) * bucket[2]
+                bucket[0] = tokens if tokens < bucket[3] else bucket[3]
+                bucket[1] = now
+            if bucket[0] >= cost:
+                taken.append(bucket)
+            elif level.deny:
+                self.limited += 1
+                return self._evaluation(request, level, key, bucket, cost, Decision.deny)
+            elif warned is None:
+                warned = (level, key, bucket)
+        for bucket in taken:
+            bucket[0] -= cost
+        if warned is not None:
+            self.limited += 1
+            return self._evaluation(request, *warned, cost, Decision.warn)
+        return None
+
+    def _evaluation(
+        self,
+        request: GatewayRequest,
+        level: _Level,
+        key: Any,
+        bucket: list[float],
+        cost: float,
+        decision: Decision,
+    ) -> PolicyEvaluation:
+        values = key if isinstance(key, tuple) else (key,)
+        described = ' '.join(f"{name}={value}" for name, value in zip(level.spec.key, values))
+        return make_policy_evaluation(
+            Source.llm_gateway if isinstance(request, LLMGatewayRequest) else Source.mcp_gateway,
+            level.policy_id,
+            decision,
+            reason=f"rate limit of {bucket[2]:g}/s (burst {bucket[3]:g}) exceeded for {described}",
+            evidence={
+                'key': dict(zip(level.spec.key, values)),
+                'rate': bucket[2],
+                'burst': bucket[3],
+                'tokens': bucket[0],
+                'retry_after': (cost - bucket[0]) / bucket[2],
+            },
+        )
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop buckets that have refilled completely; returns how many were dropped."""
+        now = self.clock() if now is None else now
+        self._next_sweep = now + self.sweep_interval
+        dropped = 0
+        for level in self._levels:
+            idle = [
+                key for key, (tokens, last, rate, burst) in level.buckets.items()
+                if tokens + (now - last) * rate >= burst
+            ]
+            for key in idle:
+                del level.buckets[key]
+            dropped += len(idle)
+        return dropped
+
+    def _evict(self, level: _Level, now: float) -> None:
+        """Bring a level back under `max_keys`: full buckets first, then the least recently used."""
+        self.sweep(now)
+        excess = len(level.buckets) - self.max_keys * 9 // 10
+        if excess > 0:
+            for key in sorted(level.buckets, key=lambda k: level.buckets[k][1])[:excess]:
+                del level.buckets[key]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            'checks': self.checks,
+            'limited': self.limited,
+            'keys': {level.policy_id: len(level.buckets) for level in self._levels},
+        }
@@ -0,0 +1,264 @@
+# CabinCrew Protocol - Latency-aware model routing
+#
+# Hand-written helper; not generated from the schema.
+#
+# Compiles LLMGatewayPolicyConfig.model_routing into per-model routes and
+# picks LLMGatewayResponse.routed_model from live backend health:
+#
+#   "model_routing": {
+#     "routes": {
+#       "gpt-4":  {"strategy": "fallback", "targets": ["gpt-4", "gpt-4-eu", "local-70b"]},
+#       "chat":   {"strategy": "weighted", "targets": {"gpt-4o": 3, "local-70b": 1}},
+#       "fast":   {"strategy": "least_latency", "targets": ["haiku", "local-8b"]}
+#     },
+#     "default": {"strategy": "fallback", "targets": ["local-8b"]},   (optional)
+#     "ewma_alpha": 0.2,          weight of each new observation
+#     "max_error_rate": 0.5,      EWMA error rate above which a model is unhealthy
+#     "cooldown": 30              seconds an unhealthy model is skipped after its last error,
+#                                 and after which least_latency re-probes an idle model
+#   }
+#
+# Requested models without a route (and no "default") pass through unchanged.
+#
+#   fallback       first healthy target, in order
+#   weighted       healthy targets by weight; the pick is a hash of request_id,
+#                  so a request routes the same way for the same health state
+#   least_latency  healthy target with the lowest latency EWMA; targets with
+#                  no observation in the last `cooldown` seconds are tried
+#                  first, so a recovered model is noticed again
+#
+# When every target is unhealthy the strategy runs over all of them rather
+# than refusing to route. The gateway reports each backend call with
+# `observe(model, latency, ok)`; `unavailable(model, seconds)` takes a model
+# out (e.g. on a 429 with Retry-After). `stats()` is the live view for
+# dashboards, and with telemetry enabled every observation is also recorded as
+# a 'model_latency' metric labelled by model.
+#
+#   router = ModelRouter.from_config(config)
+#   model = router.route(request)
+#   ...call the backend...
+#   router.observe(model, elapsed, ok=True)
+
+from __future__ import annotations
+
+import bisect
+import time
+import zlib
+from enum import Enum
+from typing import Any, Callable, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+from ..protocol import Decision, LLMGatewayPolicyConfig, LLMGatewayRequest, LLMGatewayResponse
+from ..telemetry import instrumentation
+from .rules import RuleGatewayHandler
+
+
+class RoutingStrategy(Enum):
+    fallback = 'fallback'
+    weighted = 'weighted'
+    least_latency = 'least_latency'
+
+
+class RoutingConfigError(ValueError):
+    """`model_routing` does not follow the documented format."""
+
+
+class ModelStats(BaseModel):
+    """Live view of one backend model."""
+
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    model: str
+    requests: int
+    errors: int
+    latency_ewma_ms: Optional[float] = None
+    error_rate: float
+    """EWMA of failures (1) and successes (0)."""
+    healthy: bool
+    routed: int
+    """Times this model was chosen as routed_model."""
+
+
+class _Model:
+    __slots__ = (
+        'name', 'latency', 'error_rate', 'requests', 'errors', 'routed', 'last_seen', 'last_error', 'unavailable_until',
+    )
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.routed = 0
+        self.last_seen = float('-inf')
+        self.last_error = float('-inf')
+        self.unavailable_until = float('-inf')
+
+
+class _Route:
+    __slots__ = ('strategy', 'targets', 'cumulative', 'total')
+
+    def __init__(self, strategy: RoutingStrategy, targets: list[_Model], weights: list[float]) -> None:
+        self.strategy = strategy
+        self.targets = targets
+        self.cumulative: list[float] = []
+        running = 0.0
+        for weight in weights:
+            running += weight
+            self.cumulative.append(running)
+        self.total = running
+
+
+class ModelRouter:
+    """Routes requested models to backend models; see the module comment for the config format."""
+
+    def __init__(
+        self,
+        routing: Optional[Union[dict[str, Any], BaseModel]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if isinstance(routing, BaseModel):
+            routing = routing.model_dump()
+        routing = dict(routing or {})
+        self.clock = clock
+        self.alpha = float(routing.pop('ewma_alpha', 0.2))
+        self.max_error_rate = float(routing.pop('max_error_rate', 0.5))
+        self.cooldown = float(routing.pop('cooldown', 30.0))
+        if not 0 < self.alpha <= 1:
+            raise RoutingConfigError("ewma_alpha must be in (0, 1]")
+        self._models: dict[str, _Model] = {}
+        routes = routing.pop('routes', {}) or {}
+        default = routing.pop('default', None)
+        if routing:
+            raise RoutingConfigError(f"unknown model_routing keys: {', '.join(sorted(routing))}")
+        if not isinstance(routes, dict):
+            raise RoutingConfigError("model_routing.routes must be an object")
+        self._routes = {name: self._compile(name, spec) for name, spec in routes.items()}
+        self._default = self._compile('default', default) if default is not None else None
+
+    @classmethod
+    def from_config(cls, config: LLMGatewayPolicyConfig, **kwargs: Any) -> ModelRouter:
+        return cls(config.model_routing, **kwargs)
+
+    def _model(self, name: str) -> _Model:
+        model = self._models.get(name)
+        if model is None:
+            model = self._models[name] = _Model(name)
+        return model
+
+    def _compile(self, name: str, spec: Any) -> _Route:
+        if not isinstance(spec, dict):
+            raise RoutingConfigError(f"route {name!r} must be an object")
+        try:
+            strategy = RoutingStrategy(spec.get('strategy', 'fallback'))
+        except ValueError:
+            raise RoutingConfigError(f"route {name!r}: unknown strategy {spec.get('strategy')!r}") from None
+        targets = spec.get('targets')
+        if isinstance(targets, dict):
+            names, weights = list(targets), [float(w) for w in targets.values()]
+        elif isinstance(targets, list):
+            names, weights = [str(t) for t in targets], [1.0] * len(targets)
+        else:
+            raise RoutingConfigError(f"route {name!r}: targets must be a list or an object of weights")
+        if not names or any(w <= 0 for w in weights):
+            raise RoutingConfigError(f"route {name!r}: needs at least one target, weights must be positive")
+        return _Route(strategy, [self._model(n) for n in names], weights)
+
+    # Routing
+
+    def _healthy(self, model: _Model, now: float) -> bool:
+        if model.unavailable_until > now:
+            return False
+        return model.error_rate <= self.max_error_rate or now - model.last_error >= self.cooldown
+
+    def route_model(self, requested: str, key: str = '') -> str:
+        """Backend model for `requested`; `key` (e.g. request_id) drives weighted picks."""
+        route = self._routes.get(requested, self._default)
+        if route is None:
+            return requested
+        now = self.clock()
+        targets = route.targets
+        healthy = [m for m in targets if self._healthy(m, now)]
+        candidates = healthy or targets
+        if route.strategy is RoutingStrategy.fallback:
+            chosen = candidates[0]
+        elif route.strategy is RoutingStrategy.least_latency:
+            stale = now - self.cooldown
+            chosen = min(candidates, key=lambda m: -1.0 if m.last_seen <= stale else m.latency)
+        else:
+            chosen = self._weighted(route, candidates, key)
+        chosen.routed += 1
+        return chosen.name
+
+    @staticmethod
+    def _weighted(route: _Route, candidates: list[_Model], key: str) -> _Model:
+        point = zlib.crc32(key.encode()) / 0x100000000
+        if len(candidates) == len(route.targets):
+            return route.targets[bisect.bisect_right(route.cumulative, point * route.total)]
+        # Re-spread the healthy targets' weights over the same point.
+        weights = [
+            route.cumulative[i] - (route.cumulative[i - 1] if i else 0.0)
+            for i, model in enumerate(route.targets) if model in candidates
+        ]
+        target = point * sum(weights)
+        for model, weight in zip(candidates, weights):
+            target -= weight
+            if target < 0:
+                return model
+        return candidates[-1]
+
+    def route(self, request: LLMGatewayRequest) -> str:
+        return self.route_model(request.model, request.request_id)
+
+    # Feedback
+
+    def observe(self, model: str, latency: float, ok: bool = True) -> None:
+        """Record one backend call to `model` taking `latency` seconds."""
+        stats = self._model(model)
+        alpha = self.alpha
+        stats.requests += 1
+        stats.latency = latency if stats.latency is None else stats.latency + alpha * (latency - stats.latency)
+        stats.error_rate += alpha * ((0.0 if ok else 1.0) - stats.error_rate)
+        stats.last_seen = self.clock()
+        if not ok:
+            stats.errors += 1
+            stats.last_error = stats.last_seen
+        sink = instrumentation.sink
+        if sink is not None:
+            sink.observe('model_latency', model, int(latency * 1e9))
+
+    def unavailable(self, model: str, seconds: float) -> None:
+        """Skip `model` for `seconds` (rate limited, maintenance, ...)."""
+        self._model(model).unavailable_until = self.clock() + seconds
+
+    def stats(self) -> dict[str, ModelStats]:
+        now = self.clock()
+        return {
+            name: ModelStats(
+                model=name,
+                requests=m.requests,
+                errors=m.errors,
+                latency_ewma_ms=None if m.latency is None else m.latency * 1e3,
+                error_rate=m.error_rate,
+                healthy=self._healthy(m, now),
+                routed=m.routed,
+            )
+            for name, m in self._models.items()
+        }
+
+
+class RoutingGatewayHandler(RuleGatewayHandler):
+    """RuleGatewayHandler that also sets `routed_model` on LLM responses that are not denied."""
+
+    def __init__(self, config: LLMGatewayPolicyConfig, router: Optional[ModelRouter] = None) -> None:
+        super().__init__(config)
+        self.router = router if router is not None else ModelRouter.from_config(config)
+
+    def __call__(self, request: LLMGatewayRequest) -> LLMGatewayResponse:
+        response = super().__call__(request)
+        if isinstance(request, LLMGatewayRequest) and response.decision is not Decision.deny:
+            response.routed_model = self.router.route(request)
+        return response
@@ -0,0 +1,132 @@
+# CabinCrew Protocol - Gateway rule evaluation
+#
+# Hand-written helper; not generated from the schema.
+#
+# Evaluates LLMGatewayRule / MCPGatewayRule lists against a request:
+#   match   {dotted.path: expected} over the request's JSON form; every entry
+#           must hold. A list `expected` matches any of its values.
+#   action  a Decision value ('allow', 'warn', 'require_approval', 'deny').
+#           Rules with other actions are not decisions and are skipped.
+#   metadata.reason / metadata.required_role / metadata.id are optional.
+# Decisions combine most-restrictive-wins, as in the gateway specs.
+
+from __future__ import annotations
+
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Optional, Union
+
+from ..orchestrator.policy import make_policy_evaluation, most_restrictive
+from ..protocol import (
+    Decision,
+    GatewayApproval,
+    LLMGatewayPolicyConfig,
+    LLMGatewayRequest,
+    LLMGatewayResponse,
+    LLMGatewayRule,
+    MCPGatewayPolicyConfig,
+    MCPGatewayRequest,
+    MCPGatewayResponse,
+    MCPGatewayRule,
+    PolicyEvaluation,
+    Source,
+)
+
+GatewayRequest = Union[LLMGatewayRequest, MCPGatewayRequest]
+GatewayResponse = Union[LLMGatewayResponse, MCPGatewayResponse]
+GatewayPolicyConfig = Union[LLMGatewayPolicyConfig, MCPGatewayPolicyConfig]
+
+_MISSING = object()
+_DECISIONS = {d.value: d for d in Decision}
+
+
+def _lookup(data: Any, path: str) -> Any:
+    for part in path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+
+def rule_matches(rule: Union[LLMGatewayRule, MCPGatewayRule], request_data: dict[str, Any]) -> bool:
+    """True if every `rule.match` entry holds for the request's JSON-mode dict."""
+    for path, expected in rule.match.model_dump().items():
+        actual = _lookup(request_data, path)
+        if actual is _MISSING:
+            return False
+        if isinstance(expected, list) and not isinstance(actual, list):
+            if actual not in expected:
+                return False
+        elif actual != expected:
+            return False
+    return True
+
+
+def _matching_rules(
+    config: GatewayPolicyConfig, request: GatewayRequest,
+) -> list[tuple[str, Decision, dict[str, Any]]]:
+    """(policy_id, decision, metadata) for every matching decision rule."""
+    if not config.rules:
+        return []
+    data = request.model_dump(mode='json', exclude_none=True)
+    matches = []
+    for index, rule in enumerate(config.rules):
+        decision = _DECISIONS.get(rule.action)
+        if decision is None or not rule_matches(rule, data):
+            continue
+        metadata = rule.metadata.model_dump() if rule.metadata is not None else {}
+        matches.append((metadata.get('id', f"rules[{index}]"), decision, metadata))
+    return matches
+
+
+def _evaluations(
+    request: GatewayRequest, matches: list[tuple[str, Decision, dict[str, Any]]],
+) -> list[PolicyEvaluation]:
+    source = Source.llm_gateway if isinstance(request, LLMGatewayRequest) else Source.mcp_gateway
+    evaluated_at = datetime.now(timezone.utc)
+    return [
+        make_policy_evaluation(source, policy_id, decision, reason=metadata.get('reason'), evaluated_at=evaluated_at)
+        for policy_id, decision, metadata in matches
+    ]
+
+
+def evaluate_rules(config: GatewayPolicyConfig, request: GatewayRequest) -> list[PolicyEvaluation]:
+    """One PolicyEvaluation per matching decision rule, in rule order."""
+    return _evaluations(request, _matching_rules(config, request))
+
+
+class RuleGatewayHandler:
+    """
+    Minimal gateway handler: `handler(request) -> response` from rule
+    evaluation alone. Usable directly as a PreforkGateway handler factory
+    (`RuleGatewayHandler(config)`), or as a base for handlers that add OPA/ONNX
+    evaluation and forwarding.
+    """
+
+    def __init__(self, config: GatewayPolicyConfig) -> None:
+        self.config = config
+
+    def __call__(self, request: GatewayRequest) -> GatewayResponse:
+        matches = _matching_rules(self.config, request)
+        decision = most_restrictive(d for _, d, _ in matches)
+        reasons = {
+            d: [metadata.get('reason', policy_id) for policy_id, matched, metadata in matches if matched is d]
+            for d in (Decision.warn, Decision.deny)
+        }
+        approval: Optional[GatewayApproval] = None
+        if decision is Decision.require_approval:
+            policy_id, _, metadata = next(m for m in matches if m[1] is Decision.require_approval)
+            approval = GatewayApproval(
+                approval_id=str(uuid.uuid4()),
+                required_role=metadata.get('required_role'),
+                reason=metadata.get('reason', policy_id),
+            )
+        response_model = LLMGatewayResponse if isinstance(request, LLMGatewayRequest) else MCPGatewayResponse
+        return response_model(
+            request_id=request.request_id,
+            timestamp=datetime.now(timezone.utc),
+            decision=decision,
+            warnings=reasons[Decision.warn] or None,
+            violations=reasons[Decision.deny] or None,
+            approval=approval,
+        )
@@ -0,0 +1,40 @@
+# CabinCrew Protocol - Integrity helpers
+# Canonical serialization and hashing shared by all hash-bearing fields.
+
+from .canonical import canonical_hash, canonical_json, format_timestamp, sha256_hex, to_canonical
+from .diff import ArtifactChange, ArtifactDifference, audit_integrity, diff_artifacts
+from .evidence import (
+    EvidenceFailure,
+    EvidenceProblem,
+    EvidenceVerification,
+    EvidenceVerifier,
+    verify_evidence,
+)
+from .governance import GovernanceComponent, GovernanceDigest, GovernanceDigestBuilder, governance_digest
+from .workspace import DEFAULT_IGNORE, WorkspaceHasher, WorkspaceHashResult, hash_file, workspace_hash
+
+__all__ = [
+    "DEFAULT_IGNORE",
+    "ArtifactChange",
+    "ArtifactDifference",
+    "EvidenceFailure",
+    "EvidenceProblem",
+    "EvidenceVerification",
+    "EvidenceVerifier",
+    "GovernanceComponent",
+    "GovernanceDigest",
+    "GovernanceDigestBuilder",
+    "WorkspaceHashResult",
+    "WorkspaceHasher",
+    "audit_integrity",
+    "canonical_hash",
+    "canonical_json",
+    "diff_artifacts",
+    "format_timestamp",
+    "governance_digest",
+    "hash_file",
+    "sha256_hex",
+    "to_canonical",
+    "verify_evidence",
+    "workspace_hash",
+]
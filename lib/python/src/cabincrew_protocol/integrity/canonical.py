@@ -0,0 +1,62 @@
+# CabinCrew Protocol - Canonical serialization and hashing
+#
+# Hand-written helper; not generated from the schema.
+#
+# Every hash produced by this library (WAL checksums, audit chain hashes,
+# plan/governance digests) is SHA256 over the canonical JSON form defined here:
+# the model's JSON-mode dump with None fields dropped, keys sorted, no
+# insignificant whitespace, UTF-8 encoded.
+
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import datetime
+from typing import Any, Union
+
+from pydantic import BaseModel
+
+from ..telemetry import instrumentation
+
+_ENCODER = json.JSONEncoder(
+    ensure_ascii=False,
+    sort_keys=True,
+    separators=(',', ':'),
+    allow_nan=False,
+)
+
+
+def format_timestamp(value: datetime) -> str:
+    """RFC3339 timestamp exactly as pydantic serializes AwareDatetime fields."""
+    text = value.isoformat()
+    return text[:-6] + 'Z' if text.endswith('+00:00') else text
+
+
+def to_canonical(value: Any) -> Any:
+    """JSON-compatible form of `value` (models are dumped with None fields dropped)."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode='json', exclude_none=True)
+    return value
+
+
+def canonical_json(value: Any) -> bytes:
+    """Canonical JSON bytes for a model or an already JSON-compatible value."""
+    return _ENCODER.encode(to_canonical(value)).encode('utf-8')
+
+
+def sha256_hex(data: Union[bytes, str]) -> str:
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+def canonical_hash(value: Any) -> str:
+    """SHA256 hex digest of `canonical_json(value)`."""
+    sink = instrumentation.sink
+    if sink is None:
+        return hashlib.sha256(canonical_json(value)).hexdigest()
+    start = instrumentation.clock()
+    try:
+        return hashlib.sha256(canonical_json(value)).hexdigest()
+    finally:
+        sink.observe('hash', type(value).__name__, instrumentation.clock() - start)
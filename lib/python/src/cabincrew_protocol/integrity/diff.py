@@ -0,0 +1,161 @@
+# CabinCrew Protocol - Plan vs. take-off artifact diff
+#
+# Hand-written helper; not generated from the schema.
+#
+# Compares the artifacts recorded in a PlanToken with the artifacts present at
+# take-off and explains any mismatch for AuditIntegrity:
+#
+#   added     name not in the plan
+#   removed   planned name missing at take-off (and its hash not found elsewhere)
+#   modified  same name, different hash
+#   renamed   planned hash present at take-off under a new name
+#
+# Only the planned side is indexed (by name, then leftovers by hash); take-off
+# artifacts are streamed, and unchanged artifacts are dropped as soon as they
+# match, so memory is proportional to the plan plus the differences. Results
+# come out in chunks: modifications while streaming, then renames, additions
+# and removals.
+#
+#   integrity = audit_integrity(plan_token, engine_output.artifacts, actual_plan_token=token)
+#   for chunk in diff_artifacts(plan_token.artifacts, read_manifest(path), chunk_size=5000):
+#       report(chunk)
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Iterator
+from enum import Enum
+from typing import Any, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+from ..protocol import AuditArtifact, AuditIntegrity, EngineArtifact, PlanArtifactHash, PlanToken
+
+ArtifactLike = Union[PlanArtifactHash, EngineArtifact, AuditArtifact, dict[str, Any]]
+
+
+class ArtifactChange(Enum):
+    added = 'added'
+    removed = 'removed'
+    modified = 'modified'
+    renamed = 'renamed'
+
+
+class ArtifactDifference(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    change: ArtifactChange
+    name: str
+    """Take-off name (the planned name for `removed`)."""
+    hash: Optional[str] = None
+    """Take-off hash (the planned hash for `removed`)."""
+    previous_name: Optional[str] = None
+    """Planned name, for `renamed`."""
+    previous_hash: Optional[str] = None
+    """Planned hash, for `modified`."""
+
+    def describe(self) -> str:
+        """One `AuditIntegrity.differences` line."""
+        if self.change is ArtifactChange.modified:
+            return f"modified: {self.name} ({self.previous_hash} -> {self.hash})"
+        if self.change is ArtifactChange.renamed:
+            return f"renamed: {self.previous_name} -> {self.name} ({self.hash})"
+        return f"{self.change.value}: {self.name} ({self.hash})"
+
+
+def _fields(artifact: ArtifactLike) -> tuple[str, Optional[str]]:
+    if isinstance(artifact, dict):
+        return artifact['name'], artifact.get('hash')
+    return artifact.name, artifact.hash
+
+
+def diff_artifacts(
+    planned: Iterable[ArtifactLike],
+    actual: Iterable[ArtifactLike],
+    chunk_size: int = 1000,
+) -> Iterator[list[ArtifactDifference]]:
+    """
+    Yield lists of at most `chunk_size` differences between planned and
+    take-off artifacts, in O(len(planned) + len(actual)). A name repeated at
+    take-off is reported as added after its first occurrence.
+    """
+    by_name: dict[str, Optional[str]] = {}
+    for artifact in planned:
+        name, digest = _fields(artifact)
+        by_name[name] = digest
+
+    chunk: list[ArtifactDifference] = []
+    added: list[tuple[str, Optional[str]]] = []
+    for artifact in actual:
+        name, digest = _fields(artifact)
+        if name not in by_name:
+            added.append((name, digest))
+            continue
+        planned_hash = by_name.pop(name)
+        if planned_hash != digest:
+            chunk.append(ArtifactDifference(
+                change=ArtifactChange.modified, name=name, hash=digest, previous_hash=planned_hash,
+            ))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+    # Whatever is left of the plan was removed or renamed; pair it with
+    # additions carrying the same hash, in plan order.
+    removed_by_hash: dict[Optional[str], deque[str]] = {}
+    for name, digest in by_name.items():
+        removed_by_hash.setdefault(digest, deque()).append(name)
+    by_name.clear()
+
+    renamed, unmatched = [], []
+    for name, digest in added:
+        candidates = removed_by_hash.get(digest) if digest is not None else None
+        if candidates:
+            renamed.append(ArtifactDifference(
+                change=ArtifactChange.renamed, name=name, hash=digest, previous_name=candidates.popleft(),
+            ))
+        else:
+            unmatched.append(ArtifactDifference(change=ArtifactChange.added, name=name, hash=digest))
+    added.clear()
+    removed = (
+        ArtifactDifference(change=ArtifactChange.removed, name=name, hash=digest)
+        for digest, names in removed_by_hash.items()
+        for name in names
+    )
+
+    for difference in (*renamed, *unmatched, *removed):
+        chunk.append(difference)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def audit_integrity(
+    plan_token: PlanToken,
+    actual_artifacts: Iterable[ArtifactLike],
+    actual_plan_token: Optional[str] = None,
+    max_differences: Optional[int] = 1000,
+) -> AuditIntegrity:
+    """
+    AuditIntegrity for a take-off check. `plan_token_match` is set only when
+    `actual_plan_token` is given. At most `max_differences` lines are kept,
+    followed by a count of the rest, so one audit record stays bounded.
+    """
+    differences: list[str] = []
+    total = 0
+    for chunk in diff_artifacts(plan_token.artifacts, actual_artifacts):
+        total += len(chunk)
+        room = len(chunk) if max_differences is None else max(0, max_differences - len(differences))
+        differences.extend(d.describe() for d in chunk[:room])
+    if total > len(differences):
+        differences.append(f"... and {total - len(differences)} more differences")
+    return AuditIntegrity(
+        expected_plan_token=plan_token.token,
+        actual_plan_token=actual_plan_token,
+        plan_token_match=None if actual_plan_token is None else actual_plan_token == plan_token.token,
+        artifacts_match=total == 0,
+        differences=differences or None,
+    )
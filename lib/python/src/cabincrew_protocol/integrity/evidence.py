@@ -0,0 +1,198 @@
+# CabinCrew Protocol - PreflightEvidence verification
+#
+# Hand-written helper; not generated from the schema.
+#
+# Confirms that every PreflightEvidence file (PreflightInput.evidence,
+# ApprovalRequest.evidence) still has the SHA256 it was recorded with.
+# Files are hashed on a bounded thread pool (hashlib releases the GIL while
+# digesting, so reads and hashing overlap), each distinct path is hashed once,
+# and by default verification stops at the first failure.
+#
+#   verifier = EvidenceVerifier(base_dir=workspace, workers=16)
+#   result = verifier.verify(preflight_input.evidence)
+#   if not result.ok:
+#       return result.preflight_output()
+#
+# `hash` values may be bare hex or carry a `sha256:` prefix.
+
+from __future__ import annotations
+
+import asyncio
+import os
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from enum import Enum
+from pathlib import Path
+from typing import Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+from ..protocol import Decision, PreflightEvidence, PreflightOutput
+from .workspace import hash_file
+
+
+class EvidenceProblem(Enum):
+    mismatch = 'mismatch'
+    missing = 'missing'
+    unreadable = 'unreadable'
+    outside_base = 'outside_base'
+
+
+class EvidenceFailure(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    name: str
+    path: str
+    problem: EvidenceProblem
+    expected_hash: str
+    actual_hash: Optional[str] = None
+    detail: Optional[str] = None
+
+    def describe(self) -> str:
+        """One `PreflightOutput.violations` line."""
+        text = f"evidence {self.name} ({self.path}): {self.problem.value}"
+        if self.problem is EvidenceProblem.mismatch:
+            return f"{text}, expected {self.expected_hash} got {self.actual_hash}"
+        return f"{text} ({self.detail})" if self.detail else text
+
+
+class EvidenceVerification(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    checked: int
+    """Evidence entries compared against a computed hash."""
+    files_hashed: int
+    duplicates: int
+    """Entries that reused another entry's hash of the same path."""
+    failures: list[EvidenceFailure]
+    complete: bool
+    """False when fail-fast stopped before every entry was checked."""
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+    def preflight_output(self) -> PreflightOutput:
+        """`allow`, or `deny` with one violation per failure."""
+        if self.ok:
+            return PreflightOutput(decision=Decision.allow)
+        return PreflightOutput(decision=Decision.deny, violations=[f.describe() for f in self.failures])
+
+
+def _normalize(digest: str) -> str:
+    digest = digest.strip().lower()
+    return digest[7:] if digest.startswith('sha256:') else digest
+
+
+class EvidenceVerifier:
+    """
+    Reusable verifier; keeps its thread pool between calls. Relative evidence
+    paths resolve against `base_dir`, and when `base_dir` is set paths that
+    resolve outside it fail with `outside_base`.
+    """
+
+    def __init__(self, base_dir: Optional[Union[str, Path]] = None, workers: Optional[int] = None) -> None:
+        self.base_dir = Path(base_dir).resolve() if base_dir is not None else None
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='evidence')
+
+    def _resolve(self, path: str) -> Optional[Path]:
+        resolved = Path(path) if self.base_dir is None else (self.base_dir / path).resolve()
+        if self.base_dir is not None and resolved != self.base_dir and self.base_dir not in resolved.parents:
+            return None
+        return resolved
+
+    def verify(self, evidence: Optional[Iterable[PreflightEvidence]], fail_fast: bool = True) -> EvidenceVerification:
+        """
+        Hash every distinct evidence path and compare. With `fail_fast` the
+        first failure cancels work not yet started; otherwise every failure is
+        collected.
+        """
+        failures: list[EvidenceFailure] = []
+        by_path: dict[Path, list[PreflightEvidence]] = {}
+        entries = 0
+        for item in evidence or ():
+            entries += 1
+            resolved = self._resolve(item.path)
+            if resolved is None:
+                failures.append(EvidenceFailure(
+                    name=item.name, path=item.path, problem=EvidenceProblem.outside_base, expected_hash=item.hash,
+                ))
+                continue
+            by_path.setdefault(resolved, []).append(item)
+        if failures and fail_fast:
+            return EvidenceVerification(checked=0, files_hashed=0, duplicates=0, failures=failures[:1], complete=entries == 1)
+
+        # Keep only a small window in flight so fail-fast has little queued
+        # work to cancel.
+        paths = iter(by_path)
+        pending: dict[Future, Path] = {}
+        checked = files_hashed = 0
+        try:
+            while True:
+                for path in paths:
+                    pending[self._pool.submit(hash_file, path)] = path
+                    if len(pending) >= 2 * self.workers:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    items = by_path[pending.pop(future)]
+                    problem, actual, detail = None, None, None
+                    try:
+                        actual = future.result()
+                        files_hashed += 1
+                    except FileNotFoundError:
+                        problem = EvidenceProblem.missing
+                    except OSError as exc:
+                        problem, detail = EvidenceProblem.unreadable, exc.strerror or type(exc).__name__
+                    for item in items:
+                        checked += 1
+                        if problem is None and _normalize(item.hash) == actual:
+                            continue
+                        failures.append(EvidenceFailure(
+                            name=item.name, path=item.path, problem=problem or EvidenceProblem.mismatch,
+                            expected_hash=item.hash, actual_hash=actual, detail=detail,
+                        ))
+                if failures and fail_fast:
+                    break
+        finally:
+            for future in pending:
+                future.cancel()
+        return EvidenceVerification(
+            checked=checked,
+            files_hashed=files_hashed,
+            duplicates=sum(len(items) - 1 for items in by_path.values()),
+            failures=failures,
+            complete=checked + sum(1 for f in failures if f.problem is EvidenceProblem.outside_base) == entries,
+        )
+
+    async def verify_async(
+        self, evidence: Optional[Iterable[PreflightEvidence]], fail_fast: bool = True,
+    ) -> EvidenceVerification:
+        """`verify()` without blocking the event loop."""
+        evidence = list(evidence or ())
+        return await asyncio.get_running_loop().run_in_executor(None, self.verify, evidence, fail_fast)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> EvidenceVerifier:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def verify_evidence(
+    evidence: Optional[Iterable[PreflightEvidence]],
+    base_dir: Optional[Union[str, Path]] = None,
+    workers: Optional[int] = None,
+    fail_fast: bool = True,
+) -> PreflightOutput:
+    """One-shot verification returning the PreflightOutput directly."""
+    with EvidenceVerifier(base_dir, workers) as verifier:
+        return verifier.verify(evidence, fail_fast).preflight_output()
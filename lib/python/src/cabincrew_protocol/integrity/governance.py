@@ -0,0 +1,165 @@
+# CabinCrew Protocol - Policy and governance digests
+#
+# Hand-written helper; not generated from the schema.
+#
+# PlanToken.policy_digest   canonical hash of the gateway policy configurations
+#                           ({"llm": LLMGatewayPolicyConfig, "mcp":
+#                           MCPGatewayPolicyConfig}) together with the content
+#                           hash of every policy/model file they reference, so
+#                           editing a referenced file changes it too.
+# PlanToken.governance_hash canonical hash of the ordered component list
+#                           [[gateway, kind, ref, hash], ...] covering the
+#                           content of every OPA policy and ONNX model the
+#                           configs reference, plus every gateway rule.
+#
+# Policy and model files are hashed once per content identity (device, inode,
+# size, mtime); directories (OPA bundles) are hashed with WorkspaceHasher, so
+# rebuilding after a config change only reads what changed. As in
+# WorkspaceHasher, a file modified within the racy window before it was hashed
+# is reused only within the same build: a same-size rewrite in the same mtime
+# tick would keep its identity.
+
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+from typing import Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+from ..protocol import LLMGatewayPolicyConfig, MCPGatewayPolicyConfig
+from .canonical import canonical_hash, sha256_hex, to_canonical
+from .workspace import _RACY_WINDOW_NS, WorkspaceHasher, hash_file
+
+GatewayPolicyConfig = Union[LLMGatewayPolicyConfig, MCPGatewayPolicyConfig]
+
+
+class GovernanceComponent(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    gateway: str
+    """'llm' or 'mcp'."""
+    kind: str
+    """'opa_policy', 'onnx_model' or 'rule'."""
+    ref: str
+    """Path as written in the config, or 'rules[<index>]'."""
+    hash: str
+    size: Optional[int] = None
+    """File size in bytes; None for directories, rules and unresolved references."""
+
+
+class GovernanceDigest(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    policy_digest: str
+    governance_hash: str
+    components: list[GovernanceComponent]
+    files_hashed: int
+    """Policy/model files whose content was read for this digest (cache misses)."""
+
+
+class GovernanceDigestBuilder:
+    """
+    Builds GovernanceDigest values, memoizing file hashes between builds.
+
+    Relative policy/model paths resolve against `base_dir`. With `strict=True`
+    a reference that does not exist on disk raises FileNotFoundError; with
+    `strict=False` the reference string itself is hashed instead.
+    """
+
+    def __init__(self, base_dir: Optional[Union[str, Path]] = None, strict: bool = True) -> None:
+        self.base_dir = Path(base_dir) if base_dir is not None else Path.cwd()
+        self.strict = strict
+        # (st_dev, st_ino, st_size, st_mtime_ns) -> sha256
+        self._by_identity: dict[tuple[int, int, int, int], str] = {}
+        self._trees: dict[Path, WorkspaceHasher] = {}
+
+    def _hash_ref(
+        self, ref: str, seen: dict[tuple[int, int, int, int], str], seen_trees: set[Path],
+    ) -> tuple[str, Optional[int], int]:
+        """Return (hash, size, files_read) for a policy/model reference."""
+        path = self.base_dir / ref
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            if self.strict:
+                raise
+            return sha256_hex(ref.encode('utf-8')), None, 0
+        if os.path.isdir(path):
+            seen_trees.add(path)
+            tree = self._trees.get(path)
+            if tree is None:
+                tree = self._trees[path] = WorkspaceHasher(path)
+            result = tree.scan()
+            return result.workspace_hash, None, result.files_hashed
+        identity = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        digest = seen.get(identity) or self._by_identity.get(identity)
+        if digest is not None:
+            seen[identity] = digest
+            return digest, st.st_size, 0
+        digest = seen[identity] = hash_file(path)
+        if st.st_mtime_ns < time.time_ns() - _RACY_WINDOW_NS:
+            self._by_identity[identity] = digest  # racy files are only reused within this build
+        return digest, st.st_size, 1
+
+    def _components(
+        self,
+        gateway: str,
+        config: GatewayPolicyConfig,
+        seen: dict[tuple[int, int, int, int], str],
+        seen_trees: set[Path],
+    ) -> tuple[list[GovernanceComponent], int]:
+        components = []
+        read = 0
+        for kind, refs in (('opa_policy', config.opa_policies), ('onnx_model', config.onnx_models)):
+            for ref in refs or ():
+                digest, size, files_read = self._hash_ref(ref, seen, seen_trees)
+                read += files_read
+                components.append(GovernanceComponent(gateway=gateway, kind=kind, ref=ref, hash=digest, size=size))
+        for index, rule in enumerate(config.rules or ()):
+            components.append(
+                GovernanceComponent(gateway=gateway, kind='rule', ref=f"rules[{index}]", hash=canonical_hash(rule))
+            )
+        return components, read
+
+    def build(
+        self,
+        llm: Optional[LLMGatewayPolicyConfig] = None,
+        mcp: Optional[MCPGatewayPolicyConfig] = None,
+    ) -> GovernanceDigest:
+        seen: dict[tuple[int, int, int, int], str] = {}
+        seen_trees: set[Path] = set()
+        components: list[GovernanceComponent] = []
+        read = 0
+        configs = {}
+        for gateway, config in (('llm', llm), ('mcp', mcp)):
+            if config is None:
+                continue
+            configs[gateway] = to_canonical(config)
+            part, part_read = self._components(gateway, config, seen, seen_trees)
+            components.extend(part)
+            read += part_read
+        # Forget hashes of file versions no longer referenced.
+        for identity in set(self._by_identity) - seen.keys():
+            del self._by_identity[identity]
+        for path in set(self._trees) - seen_trees:
+            del self._trees[path]
+        files = [[c.gateway, c.kind, c.ref, c.hash] for c in components if c.kind != 'rule']
+        return GovernanceDigest(
+            policy_digest=canonical_hash({'configs': configs, 'files': files}),
+            governance_hash=canonical_hash([[c.gateway, c.kind, c.ref, c.hash] for c in components]),
+            components=components,
+            files_hashed=read,
+        )
+
+
+def governance_digest(
+    llm: Optional[LLMGatewayPolicyConfig] = None,
+    mcp: Optional[MCPGatewayPolicyConfig] = None,
+    base_dir: Optional[Union[str, Path]] = None,
+) -> GovernanceDigest:
+    """One-shot digest (no memoization across calls)."""
+    return GovernanceDigestBuilder(base_dir).build(llm=llm, mcp=mcp)
@@ -0,0 +1,357 @@
+# CabinCrew Protocol - Incremental workspace hashing
+#
+# Hand-written helper; not generated from the schema.
+#
+# Computes PlanToken.workspace_hash / EngineOrchestrator.workspace_hash as the
+# root of a Merkle tree over the workspace directory:
+#
+#   file      sha256(content)
+#   symlink   sha256("link:" + target)
+#   directory sha256 of one line per child, sorted by UTF-8 name bytes:
+#             "<kind> <hash> <name>\n"   with kind f (file), l (symlink), d (dir)
+#
+# Paths, permissions, timestamps and the host OS do not enter the hash, so
+# identical trees hash identically on every machine. Per-file and per-directory
+# hashes are cached; later runs rehash only files whose stat data changed (or
+# the paths passed to `update()`), and recompute only the directories above them.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import stat
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+DEFAULT_IGNORE = frozenset({'.git', '.hg', '.svn'})
+_CHUNK = 1 << 20
+_CACHE_VERSION = 1
+# Coarse-timestamp filesystems (FAT, some network mounts) round mtime down to
+# 2s; entries modified that close to a scan are not trusted by the next one.
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+def hash_file(path: Union[str, Path]) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb', buffering=0) as fh:
+        while True:
+            chunk = fh.read(_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _sort_key(name: str) -> bytes:
+    return name.encode('utf-8', 'surrogateescape')
+
+
+def _parent(rel: str) -> str:
+    return rel.rpartition('/')[0]
+
+
+def _join(rel: str, name: str) -> str:
+    return f"{rel}/{name}" if rel else name
+
+
+class WorkspaceHashResult(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    workspace_hash: str
+    files_total: int
+    files_hashed: int
+    """Files whose content was read during this run."""
+    directories_rehashed: int
+    duration_seconds: float
+
+
+class WorkspaceHasher:
+    """
+    Merkle-tree workspace hasher with a persistent per-path cache.
+
+    `scan()` walks the tree and rehashes files whose (size, mtime, inode)
+    changed. `update(paths)` skips the walk and refreshes only the given paths,
+    for callers that already know what changed (e.g. from a file watcher or
+    `git status`). `workers > 1` hashes files on a thread pool, which mostly
+    helps the first full build.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        cache_file: Optional[Union[str, Path]] = None,
+        ignore: Iterable[str] = DEFAULT_IGNORE,
+        workers: int = 1,
+    ) -> None:
+        self.root = Path(root).resolve()
+        # Resolved so it compares equal to walked paths when it lives inside root.
+        self.cache_file = Path(cache_file).resolve() if cache_file else None
+        self._cache_paths = (
+            {str(self.cache_file), str(self.cache_file) + '.tmp'} if self.cache_file else set()
+        )
+        self.ignore = frozenset(ignore)
+        self.workers = workers
+        # rel path -> [size, mtime_ns, inode, kind, hash]
+        self._files: dict[str, list] = {}
+        # rel path -> sorted child names; '' is the root
+        self._dirs: dict[str, list[str]] = {}
+        self._dir_hashes: dict[str, str] = {}
+        # Cached entries modified at or after this instant may have changed
+        # again within the same timestamp tick; they are always rehashed.
+        self._trusted_before = 0
+        self._scanned_at = 0
+        if self.cache_file and self.cache_file.exists():
+            self._load_cache()
+
+    # Cache
+
+    def _load_cache(self) -> None:
+        data = json.loads(self.cache_file.read_text())
+        if data.get('version') != _CACHE_VERSION or data.get('root') != str(self.root):
+            return
+        self._files = data['files']
+        self._dirs = data['dirs']
+        self._dir_hashes = data['dir_hashes']
+        self._trusted_before = data['scanned_at_ns'] - _RACY_WINDOW_NS
+
+    def save_cache(self) -> None:
+        if self.cache_file is None:
+            return
+        data = {
+            'version': _CACHE_VERSION,
+            'root': str(self.root),
+            'scanned_at_ns': self._scanned_at,
+            'files': self._files,
+            'dirs': self._dirs,
+            'dir_hashes': self._dir_hashes,
+        }
+        tmp = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        tmp.write_text(json.dumps(data, separators=(',', ':')))
+        os.replace(tmp, self.cache_file)
+
+    # Hash accessors
+
+    @property
+    def workspace_hash(self) -> str:
+        return self._dir_hashes['']
+
+    def subtree_hash(self, rel_path: str = '') -> str:
+        rel = rel_path.strip('/')
+        if rel in self._dir_hashes:
+            return self._dir_hashes[rel]
+        return self._files[rel][4]
+
+    def _dir_hash(self, rel: str) -> str:
+        lines = []
+        for name in self._dirs[rel]:
+            child = _join(rel, name)
+            entry = self._files.get(child)
+            if entry is not None:
+                lines.append(f"{entry[3]} {entry[4]} {name}\n")
+            else:
+                lines.append(f"d {self._dir_hashes[child]} {name}\n")
+        return hashlib.sha256(''.join(lines).encode('utf-8', 'surrogateescape')).hexdigest()
+
+    # Walking
+
+    def _is_ignored(self, name: str, path: str) -> bool:
+        return name in self.ignore or path in self._cache_paths
+
+    def _visit_file(
+        self, rel: str, st: os.stat_result, path: str, pending: list[tuple[str, str]], force: bool = False,
+    ) -> bool:
+        """Refresh one file/symlink entry; returns True if it (may have) changed."""
+        kind = 'l' if stat.S_ISLNK(st.st_mode) else 'f'
+        cached = self._files.get(rel)
+        if (
+            not force
+            and cached is not None
+            and cached[0] == st.st_size
+            and cached[1] == st.st_mtime_ns
+            and cached[2] == st.st_ino
+            and cached[3] == kind
+            and st.st_mtime_ns < self._trusted_before
+        ):
+            return False
+        if kind == 'l':
+            digest = hashlib.sha256(('link:' + os.readlink(path)).encode('utf-8', 'surrogateescape')).hexdigest()
+            self._files[rel] = [st.st_size, st.st_mtime_ns, st.st_ino, kind, digest]
+            return cached is None or cached[4] != digest
+        self._files[rel] = [st.st_size, st.st_mtime_ns, st.st_ino, kind, '']
+        pending.append((rel, path))
+        return True
+
+    def _walk(self, rel: str, path: str, pending: list[tuple[str, str]], dirty: set[str]) -> None:
+        children = []
+        changed = rel not in self._dirs
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if self._is_ignored(entry.name, entry.path):
+                    continue
+                child = _join(rel, entry.name)
+                children.append(entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    self._files.pop(child, None)
+                    self._walk(child, entry.path, pending, dirty)
+                    if child in dirty:
+                        changed = True
+                elif entry.is_file(follow_symlinks=False) or entry.is_symlink():
+                    self._forget_dir(child)
+                    if self._visit_file(child, entry.stat(follow_symlinks=False), entry.path, pending):
+                        changed = True
+                else:
+                    children.pop()  # sockets, fifos, devices are not workspace content
+        children.sort(key=_sort_key)
+        old = self._dirs.get(rel)
+        if old != children:
+            changed = True
+            for name in set(old or ()) - set(children):
+                self._forget(_join(rel, name))
+        self._dirs[rel] = children
+        if changed:
+            dirty.add(rel)
+
+    def _forget_dir(self, rel: str) -> None:
+        if rel not in self._dirs:
+            return
+        for name in self._dirs.pop(rel):
+            self._forget(_join(rel, name))
+        self._dir_hashes.pop(rel, None)
+
+    def _forget(self, rel: str) -> None:
+        self._files.pop(rel, None)
+        self._forget_dir(rel)
+
+    def _hash_pending(self, pending: list[tuple[str, str]]) -> None:
+        if self.workers > 1 and len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                digests = list(pool.map(hash_file, [path for _, path in pending]))
+        else:
+            digests = [hash_file(path) for _, path in pending]
+        for (rel, _), digest in zip(pending, digests):
+            self._files[rel][4] = digest
+
+    def _rehash_dirs(self, dirty: set[str]) -> int:
+        # Deepest first so every child hash is current before its parent.
+        ordered = sorted(dirty, key=lambda rel: rel.count('/') + (1 if rel else 0), reverse=True)
+        for rel in ordered:
+            self._dir_hashes[rel] = self._dir_hash(rel)
+        return len(ordered)
+
+    def _finish(self, started: float, pending: int, dirty: set[str]) -> WorkspaceHashResult:
+        # Every dirty directory's ancestors are dirty too.
+        for rel in list(dirty):
+            while rel:
+                rel = _parent(rel)
+                dirty.add(rel)
+        rehashed = self._rehash_dirs(dirty)
+        self.save_cache()
+        return WorkspaceHashResult(
+            workspace_hash=self.workspace_hash,
+            files_total=len(self._files),
+            files_hashed=pending,
+            directories_rehashed=rehashed,
+            duration_seconds=time.perf_counter() - started,
+        )
+
+    def scan(self) -> WorkspaceHashResult:
+        """Stat-walk the whole workspace and rehash whatever changed."""
+        started = time.perf_counter()
+        self._scanned_at = time.time_ns()
+        pending: list[tuple[str, str]] = []
+        dirty: set[str] = set()
+        self._walk('', str(self.root), pending, dirty)
+        self._hash_pending(pending)
+        result = self._finish(started, len(pending), dirty)
+        self._trusted_before = self._scanned_at - _RACY_WINDOW_NS
+        return result
+
+    def update(self, changed_paths: Iterable[Union[str, Path]]) -> WorkspaceHashResult:
+        """
+        Refresh only `changed_paths` (relative to the root, or absolute inside it):
+        added, modified or deleted files and directories. Requires a previous
+        `scan()` or a loaded cache.
+        """
+        if '' not in self._dirs:
+            return self.scan()
+        started = time.perf_counter()
+        self._scanned_at = time.time_ns()
+        pending: list[tuple[str, str]] = []
+        dirty: set[str] = set()
+        for changed in changed_paths:
+            path = Path(os.path.normpath(self.root / changed))
+            rel = path.relative_to(self.root).as_posix()
+            if rel == '.':
+                return self.scan()
+            if any(part in self.ignore for part in rel.split('/')) or self._is_ignored('', str(path)):
+                continue
+            parent = _parent(rel)
+            try:
+                st = os.lstat(path)
+            except (FileNotFoundError, NotADirectoryError):
+                # A deleted tree is often reported by a path inside it (`git status`,
+                # file watchers): drop it from its topmost directory that is gone.
+                while parent and not self._is_dir(parent):
+                    rel, parent = parent, _parent(parent)
+                path = self.root / rel
+                try:
+                    st = os.lstat(path)
+                except FileNotFoundError:
+                    self._forget(rel)
+                    self._unlink_child(parent, rel.rpartition('/')[2], dirty)
+                    continue
+            self._link_child(parent, dirty)
+            name = rel.rpartition('/')[2]
+            siblings = self._dirs[parent]
+            if name not in siblings:
+                siblings.append(name)
+                siblings.sort(key=_sort_key)
+            if stat.S_ISDIR(st.st_mode):
+                self._files.pop(rel, None)
+                self._walk(rel, str(path), pending, dirty)
+            else:
+                self._forget_dir(rel)
+                self._visit_file(rel, st, str(path), pending, force=True)
+            dirty.add(parent)
+        self._hash_pending(pending)
+        result = self._finish(started, len(pending), dirty)
+        self._trusted_before = self._scanned_at - _RACY_WINDOW_NS
+        return result
+
+    def _is_dir(self, rel: str) -> bool:
+        try:
+            return stat.S_ISDIR(os.lstat(self.root / rel).st_mode)
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+
+    def _link_child(self, rel: str, dirty: set[str]) -> None:
+        """Make sure directory `rel` and its ancestors exist in the tree."""
+        if rel in self._dirs:
+            return
+        self._dirs[rel] = []
+        if rel:
+            parent = _parent(rel)
+            self._link_child(parent, dirty)
+            name = rel.rpartition('/')[2]
+            self._dirs[parent].append(name)
+            self._dirs[parent].sort(key=_sort_key)
+            dirty.add(parent)
+        dirty.add(rel)
+
+    def _unlink_child(self, parent: str, name: str, dirty: set[str]) -> None:
+        siblings = self._dirs.get(parent)
+        if siblings is not None and name in siblings:
+            siblings.remove(name)
+            dirty.add(parent)
+
+
+def workspace_hash(root: Union[str, Path], workers: int = 1, ignore: Iterable[str] = DEFAULT_IGNORE) -> str:
+    """One-shot workspace hash (no cache)."""
+    return WorkspaceHasher(root, ignore=ignore, workers=workers).scan().workspace_hash
@@ -0,0 +1,56 @@
+# CabinCrew Protocol - Orchestrator helpers
+# Hand-written runtime support built on the generated models in ..protocol
+
+from .approvals import EXPIRED_APPROVER, ApprovalError, ApprovalQueue
+from .compaction import CompactionResult, WALArchive, WALCompactor, read_archive
+from .persistence import WorkflowStateStore
+from .policy import aggregate_decisions, decision_severity, make_policy_evaluation, most_restrictive
+from .replay import FINAL_ENTRY_TYPES, WALReplayer, WALReplayError, replay_wal
+from .replication import WALFollower, WALShipper, parse_address
+from .scheduler import StepGraphError, StepScheduler, StepSpec, WorkflowRunResult
+from .state import IncrementalWorkflowState, WorkflowStateDelta, WorkflowStateSnapshot
+from .wal import (
+    WAL_DATA_MODELS,
+    WALCorruptionError,
+    WALWriter,
+    make_wal_entry,
+    read_wal,
+    verify_checksum,
+    wal_checksum,
+)
+
+__all__ = [
+    "EXPIRED_APPROVER",
+    "FINAL_ENTRY_TYPES",
+    "WAL_DATA_MODELS",
+    "ApprovalError",
+    "ApprovalQueue",
+    "CompactionResult",
+    "IncrementalWorkflowState",
+    "StepGraphError",
+    "StepScheduler",
+    "StepSpec",
+    "WALArchive",
+    "WALCompactor",
+    "WALCorruptionError",
+    "WALFollower",
+    "WALReplayError",
+    "WALReplayer",
+    "WALShipper",
+    "WALWriter",
+    "WorkflowRunResult",
+    "WorkflowStateDelta",
+    "WorkflowStateSnapshot",
+    "WorkflowStateStore",
+    "aggregate_decisions",
+    "decision_severity",
+    "make_policy_evaluation",
+    "make_wal_entry",
+    "most_restrictive",
+    "parse_address",
+    "read_archive",
+    "read_wal",
+    "replay_wal",
+    "verify_checksum",
+    "wal_checksum",
+]
@@ -0,0 +1,344 @@
+# CabinCrew Protocol - In-process approval queue
+#
+# Hand-written helper; not generated from the schema.
+#
+# Holds pending ApprovalRequests indexed by approval_id, required_role and
+# workflow_id. Each decision (a verified ApprovalResponse, or expiry) becomes
+# an ApprovalRecord that is handed to `on_record` for persistence (e.g.
+# IncrementalWorkflowState.record_approval) and wakes every asyncio waiter for
+# that approval. Expiry runs on a hashed timer wheel, so advancing time costs
+# O(expired + slots passed) regardless of how many approvals are pending.
+
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+from dateutil import parser as date_parser
+
+from ..protocol import ApprovalRecord, ApprovalRequest, ApprovalResponse
+
+EXPIRED_APPROVER = 'system:expired'
+"""ApprovalRecord.approver used for approvals that timed out."""
+
+
+class ApprovalError(ValueError):
+    """An ApprovalResponse failed verification against its ApprovalRequest."""
+
+
+class _TimerWheel:
+    """Hashed timer wheel keyed by approval_id; deadlines are in clock seconds."""
+
+    def __init__(self, tick: float, slots: int, now: float) -> None:
+        self.tick = tick
+        self.slots: list[dict[str, float]] = [{} for _ in range(slots)]
+        self.current = int(now // tick)
+        self.where: dict[str, int] = {}
+
+    def add(self, key: str, deadline: float) -> None:
+        slot = max(int(deadline // self.tick), self.current) % len(self.slots)
+        self.slots[slot][key] = deadline
+        self.where[key] = slot
+
+    def remove(self, key: str) -> None:
+        slot = self.where.pop(key, None)
+        if slot is not None:
+            del self.slots[slot][key]
+
+    def advance(self, now: float) -> list[str]:
+        """Pop every key whose deadline is <= `now`."""
+        target = int(now // self.tick)
+        expired: list[str] = []
+        if target < self.current:
+            return expired
+        # After a long pause every slot is due once; never loop more than a rotation.
+        steps = min(target - self.current + 1, len(self.slots))
+        for offset in range(steps):
+            slot = self.slots[(self.current + offset) % len(self.slots)]
+            due = [key for key, deadline in slot.items() if deadline <= now]
+            for key in due:
+                del slot[key]
+                del self.where[key]
+            expired.extend(due)
+        self.current = target
+        return expired
+
+
+class ApprovalQueue:
+    """
+    Pending approvals with indexed lookup, asyncio waiters and expiry.
+
+    `timeout` (seconds) is the default lifetime of a submitted request; None
+    means requests never expire unless `submit(..., timeout=...)` says so.
+    `clock` returns wall-clock seconds and is injectable for tests.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        on_record: Optional[Callable[[ApprovalRecord], None]] = None,
+        tick: float = 1.0,
+        wheel_slots: int = 4096,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.timeout = timeout
+        self.on_record = on_record
+        self.clock = clock
+        self._lock = threading.RLock()
+        self._pending: dict[str, ApprovalRequest] = {}
+        self._deadlines: dict[str, float] = {}
+        # Ordered sets (dict keys) so removal is O(1) and listing keeps submit order.
+        self._by_role: dict[str, dict[str, None]] = {}
+        self._by_workflow: dict[str, dict[str, None]] = {}
+        self._records: dict[str, ApprovalRecord] = {}
+        self._waiters: dict[str, list[asyncio.Future]] = {}
+        self._wheel = _TimerWheel(tick, wheel_slots, clock())
+
+    # Submission and lookup
+
+    def submit(self, request: ApprovalRequest, timeout: Optional[float] = None) -> None:
+        """Queue a request; raises ApprovalError if its approval_id is already known."""
+        with self._lock:
+            approval_id = request.approval_id
+            if approval_id in self._pending or approval_id in self._records:
+                raise ApprovalError(f"approval {approval_id!r} already exists")
+            lifetime = timeout if timeout is not None else self.timeout
+            self._enqueue(request, None if lifetime is None else self.clock() + lifetime)
+
+    def _enqueue(self, request: ApprovalRequest, deadline: Optional[float]) -> None:
+        approval_id = request.approval_id
+        self._pending[approval_id] = request
+        self._by_role.setdefault(request.required_role, {})[approval_id] = None
+        self._by_workflow.setdefault(request.workflow_id, {})[approval_id] = None
+        if deadline is not None:
+            self._deadlines[approval_id] = deadline
+            self._wheel.add(approval_id, deadline)
+
+    def get(self, approval_id: str) -> Optional[ApprovalRequest]:
+        return self._pending.get(approval_id)
+
+    def record(self, approval_id: str) -> Optional[ApprovalRecord]:
+        """The decision for `approval_id`, if one was made."""
+        return self._records.get(approval_id)
+
+    def pending(self, role: Optional[str] = None, workflow_id: Optional[str] = None) -> list[ApprovalRequest]:
+        """Pending requests in submission order, optionally filtered by role and/or workflow."""
+        with self._lock:
+            if role is None and workflow_id is None:
+                return list(self._pending.values())
+            by_role = self._by_role.get(role, {}) if role is not None else None
+            by_workflow = self._by_workflow.get(workflow_id, {}) if workflow_id is not None else None
+            if by_role is None or (by_workflow is not None and len(by_workflow) < len(by_role)):
+                ids, other = by_workflow, by_role
+            else:
+                ids, other = by_role, by_workflow
+            return [self._pending[i] for i in ids if other is None or i in other]
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __contains__(self, approval_id: object) -> bool:
+        return approval_id in self._pending
+
+    # Decisions
+
+    def respond(
+        self,
+        response: ApprovalResponse,
+        plan_token_hash: Optional[str] = None,
+        approver_roles: Optional[Iterable[str]] = None,
+    ) -> ApprovalRecord:
+        """
+        Verify `response` against its pending request and record the decision.
+
+        `plan_token_hash` is the orchestrator's current plan-token hash and
+        `approver_roles` the roles held by the approver; when given, they must
+        match the request's `plan_token_hash` / `required_role`.
+        """
+        with self._lock:
+            request = self._pending.get(response.approval_id)
+            if request is None:
+                raise ApprovalError(f"no pending approval {response.approval_id!r}")
+            if plan_token_hash is not None and plan_token_hash != request.plan_token_hash:
+                raise ApprovalError(f"approval {request.approval_id!r} is bound to a different plan-token")
+            if approver_roles is not None and request.required_role not in set(approver_roles):
+                raise ApprovalError(f"approver lacks required role {request.required_role!r}")
+            if not response.approver:
+                raise ApprovalError(f"approval {request.approval_id!r} response has no approver")
+            if response.timestamp:
+                approved_at = date_parser.isoparse(response.timestamp)
+                if approved_at.tzinfo is None:
+                    approved_at = approved_at.replace(tzinfo=timezone.utc)
+            else:
+                approved_at = datetime.fromtimestamp(self.clock(), timezone.utc)
+            record = ApprovalRecord(
+                approval_id=request.approval_id,
+                step_id=request.step_id,
+                plan_token_hash=request.plan_token_hash,
+                approved=response.approved,
+                approver=response.approver,
+                approved_at=approved_at,
+                reason=response.reason,
+                evidence_hashes=[e.hash for e in request.evidence] if request.evidence else None,
+            )
+            self._decide(request, record)
+            return record
+
+    def cancel(self, approval_id: str) -> Optional[ApprovalRequest]:
+        """Drop a pending request without recording a decision; waiters are cancelled."""
+        with self._lock:
+            request = self._pending.get(approval_id)
+            if request is None:
+                return None
+            self._unindex(request)
+            for future in self._waiters.pop(approval_id, ()):
+                _wake(future, None)
+            return request
+
+    def expire(self, now: Optional[float] = None) -> list[ApprovalRecord]:
+        """Record a rejection for every request whose deadline has passed."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            records = []
+            for approval_id in self._wheel.advance(now):
+                request = self._pending[approval_id]
+                record = ApprovalRecord(
+                    approval_id=approval_id,
+                    step_id=request.step_id,
+                    plan_token_hash=request.plan_token_hash,
+                    approved=False,
+                    approver=EXPIRED_APPROVER,
+                    approved_at=datetime.fromtimestamp(self._deadlines[approval_id], timezone.utc),
+                    reason='approval expired',
+                )
+                self._decide(request, record)
+                records.append(record)
+            return records
+
+    def _unindex(self, request: ApprovalRequest) -> None:
+        approval_id = request.approval_id
+        del self._pending[approval_id]
+        for index, key in ((self._by_role, request.required_role), (self._by_workflow, request.workflow_id)):
+            ids = index[key]
+            del ids[approval_id]
+            if not ids:
+                del index[key]
+        if self._deadlines.pop(approval_id, None) is not None:
+            self._wheel.remove(approval_id)
+
+    def _decide(self, request: ApprovalRequest, record: ApprovalRecord) -> None:
+        self._unindex(request)
+        self._records[record.approval_id] = record
+        if self.on_record is not None:
+            self.on_record(record)
+        for future in self._waiters.pop(record.approval_id, ()):
+            _wake(future, record)
+
+    def forget(self, approval_id: str) -> Optional[ApprovalRecord]:
+        """Drop a decided record once it no longer needs to be served to waiters."""
+        with self._lock:
+            return self._records.pop(approval_id, None)
+
+    # Waiting
+
+    async def wait(self, approval_id: str, timeout: Optional[float] = None) -> ApprovalRecord:
+        """
+        Wait for the decision on `approval_id` (returns at once if already decided).
+        Raises KeyError for unknown approvals and asyncio.TimeoutError if
+        `timeout` elapses first; the approval itself stays pending.
+        """
+        with self._lock:
+            record = self._records.get(approval_id)
+            if record is not None:
+                return record
+            if approval_id not in self._pending:
+                raise KeyError(approval_id)
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.setdefault(approval_id, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(approval_id)
+                if waiters is not None and future in waiters:
+                    waiters.remove(future)
+                    if not waiters:
+                        del self._waiters[approval_id]
+
+    async def run_expiry(self) -> None:
+        """Advance the timer wheel once per tick until cancelled."""
+        while True:
+            await asyncio.sleep(self._wheel.tick)
+            self.expire()
+
+    # Persistence
+
+    def restore(
+        self,
+        requests: Iterable[ApprovalRequest],
+        records: Iterable[ApprovalRecord] = (),
+        deadlines: Optional[dict[str, float]] = None,
+    ) -> None:
+        """
+        Rebuild state after a restart: `records` are known decisions (e.g.
+        WorkflowStateRecord.approvals); requests already decided there are not
+        re-queued. `deadlines` maps approval_id to an absolute clock deadline.
+        """
+        deadlines = deadlines or {}
+        with self._lock:
+            for record in records:
+                self._records[record.approval_id] = record
+            for request in requests:
+                if request.approval_id in self._records or request.approval_id in self._pending:
+                    continue
+                self._enqueue(request, deadlines.get(request.approval_id))
+
+    def dump(self, path: Union[str, Path]) -> None:
+        """Write pending requests (with deadlines) and decided records as NDJSON."""
+        with self._lock:
+            lines = [
+                json.dumps({'request': request.model_dump(mode='json'), 'deadline': self._deadlines.get(i)})
+                for i, request in self._pending.items()
+            ]
+            lines.extend(json.dumps({'record': r.model_dump(mode='json')}) for r in self._records.values())
+        tmp = Path(path).with_name(Path(path).name + '.tmp')
+        tmp.write_text(''.join(line + '\n' for line in lines))
+        tmp.replace(path)
+
+    def load(self, path: Union[str, Path]) -> None:
+        """Restore state written by `dump()`."""
+        requests, records, deadlines = [], [], {}
+        with open(path) as fh:
+            for line in fh:
+                item = json.loads(line)
+                if 'record' in item:
+                    records.append(ApprovalRecord.model_validate(item['record']))
+                    continue
+                request = ApprovalRequest.model_validate(item['request'])
+                requests.append(request)
+                if item['deadline'] is not None:
+                    deadlines[request.approval_id] = item['deadline']
+        self.restore(requests, records, deadlines)
+
+
+def _wake(future: asyncio.Future, record: Optional[ApprovalRecord]) -> None:
+    """Resolve (or cancel, for None) a waiter from any thread."""
+    loop = future.get_loop()
+    if loop.is_closed():
+        return
+    loop.call_soon_threadsafe(_settle, future, record)
+
+
+def _settle(future: asyncio.Future, record: Optional[ApprovalRecord]) -> None:
+    if future.done():
+        return
+    if record is None:
+        future.cancel()
+    else:
+        future.set_result(record)
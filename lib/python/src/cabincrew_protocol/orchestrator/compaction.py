@@ -0,0 +1,391 @@
+# CabinCrew Protocol - WAL compaction and archival
+#
+# Hand-written helper; not generated from the schema.
+#
+# Moves the entries of finished workflows (last entry workflow_completed or
+# workflow_failed) out of the active WAL. Each pass:
+#
+#   1. replays the WAL through WALReplayer, verifying every checksum
+#   2. streams the finished workflows' entries into a compressed archive
+#      (wal-<first seq>-<last seq>.ndjson.gz) and everything else into a new
+#      active file
+#   3. writes the archive manifest (wal-<first>-<last>.json): archive SHA256,
+#      sequence range and each archived workflow's final WorkflowStateRecord
+#   4. copies entries appended meanwhile, then swaps the new file in with
+#      os.replace while the WALWriter is paused for just that final copy
+#
+# Reads and writes are throttled to `max_bytes_per_second`. A crash before
+# step 4 leaves the active WAL untouched (the entries are archived again by the
+# next pass). The workflow owning the newest entry is always kept, so the
+# active WAL never loses its highest sequence and WALWriter keeps numbering
+# from it.
+#
+#   compactor = WALCompactor(writer, archive_dir='wal-archive').start()   # background
+#   result = compactor.compact()                                          # or on demand
+#   for entry in read_archive(compactor.archives()[0], archive_dir='wal-archive'):
+#       ...
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import os
+import threading
+import time
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Callable, Optional, Union
+
+from pydantic import AwareDatetime, BaseModel, ConfigDict
+
+from ..protocol import WALEntry, WorkflowStateRecord
+from .replay import WALReplayer
+from .wal import WALCorruptionError, WALWriter, _parse_entry
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - exercised only without the extra
+    zstandard = None
+
+_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'none': ''}
+_COPY_SIZE = 1 << 20
+
+
+class WALArchive(BaseModel):
+    """Manifest of one compaction pass's archive."""
+
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    file: str
+    """Archive file name, relative to the archive directory."""
+    compression: str
+    sha256: str
+    """SHA256 of the stored (compressed) archive file."""
+    size: int
+    entries: int
+    first_sequence: int
+    last_sequence: int
+    created_at: AwareDatetime
+    records: dict[str, WorkflowStateRecord]
+    """Final state of each archived workflow."""
+
+
+class CompactionResult(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    workflows: list[str]
+    """Archived workflow ids (candidates for `WALReplayer.forget`)."""
+    archived_entries: int
+    kept_entries: int
+    bytes_before: int
+    bytes_after: int
+    archive: Optional[str] = None
+    """Manifest file name, when anything was archived."""
+    duration: float
+    paused: float
+    """Seconds appends were blocked for the final swap."""
+
+
+def _require_codec(compression: str) -> None:
+    if compression not in _SUFFIXES:
+        raise ValueError(f"unknown compression {compression!r}; expected one of {', '.join(_SUFFIXES)}")
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError("zstd compression requires zstandard: pip install 'cabincrew-protocol[zstd]'")
+
+
+def _open_write(raw: IO[bytes], compression: str) -> IO[bytes]:
+    if compression == 'gzip':
+        return gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0)
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    return raw
+
+
+def _open_read(path: Path, compression: str) -> IO[bytes]:
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        _require_codec(compression)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+    return open(path, 'rb')
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for block in iter(lambda: fh.read(_COPY_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class _Throttle:
+    """Sleeps so that bytes passed to `consume` average at most `rate` per second."""
+
+    def __init__(self, rate: Optional[float]) -> None:
+        self.rate = rate
+        self._start = time.monotonic()
+        self._bytes = 0
+
+    def consume(self, size: int) -> None:
+        if not self.rate:
+            return
+        self._bytes += size
+        ahead = self._bytes / self.rate - (time.monotonic() - self._start)
+        if ahead > 0.01:
+            time.sleep(ahead)
+
+
+class WALCompactor:
+    """
+    Archives finished workflows out of an active WAL. Pass the live WALWriter
+    so the final swap pauses its appends; a plain path is only safe when
+    nothing is writing to the file. Passes reclaiming fewer than
+    `min_reclaim_bytes` are skipped.
+    """
+
+    def __init__(
+        self,
+        wal: Union[WALWriter, str, Path],
+        archive_dir: Union[str, Path],
+        compression: str = 'gzip',
+        max_bytes_per_second: Optional[float] = 32 << 20,
+        min_reclaim_bytes: int = 0,
+        interval: float = 60.0,
+        fsync: bool = True,
+        on_compacted: Optional[Callable[[CompactionResult], None]] = None,
+    ) -> None:
+        _require_codec(compression)
+        self.writer = wal if isinstance(wal, WALWriter) else None
+        self.path = wal.path if isinstance(wal, WALWriter) else Path(wal)
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.max_bytes_per_second = max_bytes_per_second
+        self.min_reclaim_bytes = min_reclaim_bytes
+        self.interval = interval
+        self.fsync = fsync
+        self.on_compacted = on_compacted
+        self.last_result: Optional[CompactionResult] = None
+        self.last_error: Optional[BaseException] = None
+        """Exception raised by the last background pass, if it failed."""
+        self._manifests: dict[str, WALArchive] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Archives
+
+    def archives(self) -> list[WALArchive]:
+        """Manifests in the archive directory in the order they were written (each is parsed once)."""
+        archives = []
+        for path in self.archive_dir.glob('wal-*.json'):
+            if path.name not in self._manifests:
+                self._manifests[path.name] = WALArchive.model_validate_json(path.read_bytes())
+            archives.append(self._manifests[path.name])
+        return sorted(archives, key=lambda archive: archive.created_at)
+
+    def archived_record(self, workflow_id: str) -> Optional[WorkflowStateRecord]:
+        """Final record of an archived workflow (latest archive wins)."""
+        for archive in reversed(self.archives()):
+            if workflow_id in archive.records:
+                return archive.records[workflow_id]
+        return None
+
+    # Compaction
+
+    def compact(self) -> CompactionResult:
+        """Run one pass now (passes never overlap)."""
+        with self._lock:
+            result = self._compact()
+        self.last_result = result
+        if self.on_compacted is not None:
+            self.on_compacted(result)
+        return result
+
+    def _compact(self) -> CompactionResult:
+        started = time.monotonic()
+        throttle = _Throttle(self.max_bytes_per_second)
+        replayer = WALReplayer()
+        owners: list[str] = []
+        sequences: list[int] = []
+        sizes: dict[str, int] = {}
+        end = 0
+        try:
+            source = open(self.path, 'rb')
+        except FileNotFoundError:
+            return CompactionResult(
+                workflows=[], archived_entries=0, kept_entries=0, bytes_before=0, bytes_after=0,
+                duration=time.monotonic() - started, paused=0.0,
+            )
+        with source:
+            inode = os.fstat(source.fileno()).st_ino
+            for line in source:
+                if not line.endswith(b'\n'):
+                    break
+                throttle.consume(len(line))
+                entry = _parse_entry(line, True, sequences[-1] if sequences else -1)
+                replayer.apply(entry)
+                owners.append(entry.workflow_id)
+                sequences.append(entry.sequence)
+                sizes[entry.workflow_id] = sizes.get(entry.workflow_id, 0) + len(line)
+                end += len(line)
+
+        finished = replayer.finished - {owners[-1]} if owners else set()
+        if not finished or sum(sizes[w] for w in finished) < max(self.min_reclaim_bytes, 1):
+            return CompactionResult(
+                workflows=[], archived_entries=0, kept_entries=len(owners), bytes_before=end, bytes_after=end,
+                duration=time.monotonic() - started, paused=0.0,
+            )
+        archived_sequences = [seq for owner, seq in zip(owners, sequences) if owner in finished]
+        stem = f"wal-{archived_sequences[0]:012d}-{archived_sequences[-1]:012d}"
+        archive_file = f"{stem}.ndjson{_SUFFIXES[self.compression]}"
+
+        keep_path = self.path.with_name(self.path.name + '.compact.tmp')
+        archive_tmp = self.archive_dir / f".{archive_file}.tmp"
+        try:
+            with open(self.path, 'rb') as source, open(keep_path, 'wb') as keep:
+                if os.fstat(source.fileno()).st_ino != inode:
+                    raise WALCorruptionError(f"{self.path} was replaced during compaction")
+                with open(archive_tmp, 'wb') as raw:
+                    archive = _open_write(raw, self.compression)
+                    for owner in owners:
+                        line = source.readline()
+                        throttle.consume(len(line))
+                        (archive if owner in finished else keep).write(line)
+                    if archive is not raw:
+                        archive.close()
+                    self._sync(raw)
+                os.replace(archive_tmp, self.archive_dir / archive_file)
+                manifest = WALArchive(
+                    file=archive_file,
+                    compression=self.compression,
+                    sha256=_file_sha256(self.archive_dir / archive_file),
+                    size=(self.archive_dir / archive_file).stat().st_size,
+                    entries=len(archived_sequences),
+                    first_sequence=archived_sequences[0],
+                    last_sequence=archived_sequences[-1],
+                    created_at=datetime.now(timezone.utc),
+                    records={w: replayer.record(w) for w in sorted(finished)},
+                )
+                self._write_atomic(self.archive_dir / f"{stem}.json", manifest.model_dump_json().encode())
+                self._manifests[f"{stem}.json"] = manifest
+
+                # Catch up with appends made during the pass without blocking
+                # the writer, then pause it only for whatever is left.
+                source.seek(end)
+                tail = self._copy(source, keep, whole_lines=True)
+                paused_at = time.monotonic()
+                if self.writer is not None:
+                    with self.writer.paused():
+                        tail += self._swap(source, keep, keep_path)
+                else:
+                    tail += self._swap(source, keep, keep_path)
+                paused = time.monotonic() - paused_at
+        finally:
+            for leftover in (keep_path, archive_tmp):
+                if leftover.exists():
+                    leftover.unlink()
+
+        return CompactionResult(
+            workflows=sorted(finished),
+            archived_entries=len(archived_sequences),
+            kept_entries=len(owners) - len(archived_sequences) + tail,
+            bytes_before=end,
+            bytes_after=self.path.stat().st_size,
+            archive=f"{stem}.json",
+            duration=time.monotonic() - started,
+            paused=paused,
+        )
+
+    @staticmethod
+    def _copy(source: IO[bytes], target: IO[bytes], whole_lines: bool = False) -> int:
+        """Copy `source` to its end (or its last complete line); returns the lines copied."""
+        lines = 0
+        while True:
+            block = source.read(_COPY_SIZE)
+            if not block:
+                return lines
+            if whole_lines and not block.endswith(b'\n'):
+                cut = block.rfind(b'\n') + 1
+                source.seek(cut - len(block), os.SEEK_CUR)
+                block = block[:cut]
+                if not block:
+                    return lines
+            target.write(block)
+            lines += block.count(b'\n')
+
+    def _swap(self, source: IO[bytes], keep: IO[bytes], keep_path: Path) -> int:
+        lines = self._copy(source, keep)
+        self._sync(keep)
+        os.replace(keep_path, self.path)
+        return lines
+
+    def _sync(self, fh: IO[bytes]) -> None:
+        fh.flush()
+        if self.fsync:
+            os.fsync(fh.fileno())
+
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+            self._sync(fh)
+        os.replace(tmp, path)
+
+    # Background
+
+    def start(self) -> WALCompactor:
+        """Run `compact()` every `interval` seconds on a daemon thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='wal-compactor', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.compact()
+                self.last_error = None
+            except Exception as exc:  # keep compacting on the next interval
+                self.last_error = exc
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> WALCompactor:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+def read_archive(
+    archive: Union[WALArchive, str, Path],
+    archive_dir: Optional[Union[str, Path]] = None,
+    verify: bool = True,
+) -> Iterator[WALEntry]:
+    """
+    Entries of an archive, given its WALArchive (plus `archive_dir`) or the
+    path of its manifest. With `verify`, the archive's SHA256 and every entry
+    checksum are checked first / as read.
+    """
+    if not isinstance(archive, WALArchive):
+        manifest_path = Path(archive)
+        archive = WALArchive.model_validate_json(manifest_path.read_bytes())
+        archive_dir = archive_dir if archive_dir is not None else manifest_path.parent
+    path = Path(archive_dir if archive_dir is not None else '.') / archive.file
+    if verify and _file_sha256(path) != archive.sha256:
+        raise WALCorruptionError(f"archive {archive.file} does not match its manifest SHA256")
+    last = -1
+    with _open_read(path, archive.compression) as fh:
+        for line in fh:
+            entry = _parse_entry(line, verify, last)
+            last = entry.sequence
+            yield entry
@@ -0,0 +1,313 @@
+# CabinCrew Protocol - Delta-encoded WorkflowStateRecord persistence
+#
+# Hand-written helper; not generated from the schema.
+#
+# On-disk layout, one directory per workflow:
+#
+#   <root>/<workflow_id>/base-<version>.json      full record at <version>
+#   <root>/<workflow_id>/deltas-<version>.ndjson  WorkflowStateDelta lines
+#                                                 written after <version>
+#
+# Each update appends one NDJSON line, so write cost is proportional to the
+# change. Compaction starts a new delta segment at the current version and then
+# writes the matching base; older bases and segments stay on disk so historical
+# versions remain loadable until pruned.
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+from ..protocol import WorkflowStateRecord
+from .state import IncrementalWorkflowState, WorkflowStateDelta
+from .wal import _truncate_torn_tail
+
+_VERSION_WIDTH = 20
+
+
+def _versioned(prefix: str, version: int, suffix: str) -> str:
+    return f"{prefix}-{version:0{_VERSION_WIDTH}d}{suffix}"
+
+
+def _parse_version(name: str, prefix: str, suffix: str) -> Optional[int]:
+    if not (name.startswith(prefix + '-') and name.endswith(suffix)):
+        return None
+    digits = name[len(prefix) + 1:len(name) - len(suffix)]
+    return int(digits) if digits.isdigit() else None
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+class _WorkflowLog:
+    """Open delta segment and bookkeeping for one workflow."""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.segment_start = 0
+        self.segment_deltas = 0
+        self.version = 0
+        self.handle: Optional[IO[bytes]] = None
+        self.compacting: Optional[Future] = None
+
+    def open_segment(self, start: int) -> None:
+        if self.handle is not None:
+            self.handle.close()
+        self.segment_start = start
+        self.segment_deltas = 0
+        path = self.directory / _versioned('deltas', start, '.ndjson')
+        if path.exists():
+            _truncate_torn_tail(path)
+        self.handle = open(path, 'ab')
+
+    def close(self) -> None:
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+
+class WorkflowStateStore:
+    """
+    Persist WorkflowStateRecords as a base document plus appended deltas.
+
+    `save()` writes only `state.delta_since(last_saved)`. When a segment holds
+    `compact_after` deltas a new base is written on a background thread;
+    appends continue into the next segment while it runs. `load(version=...)`
+    reconstructs any version between the oldest retained base and the latest
+    delta.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path],
+        compact_after: int = 1000,
+        fsync: bool = False,
+        background: bool = True,
+    ) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.compact_after = compact_after
+        self.fsync = fsync
+        self._logs: dict[str, _WorkflowLog] = {}
+        self._logs_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='wfstate-compact') if background else None
+
+    # Layout helpers
+
+    def _directory(self, workflow_id: str) -> Path:
+        if not workflow_id or workflow_id.startswith('.') or '/' in workflow_id or '\\' in workflow_id:
+            raise ValueError(f"workflow_id {workflow_id!r} cannot be used as a directory name")
+        return self.root / workflow_id
+
+    def _scan(self, directory: Path, prefix: str, suffix: str) -> list[int]:
+        versions = []
+        for entry in os.listdir(directory):
+            version = _parse_version(entry, prefix, suffix)
+            if version is not None:
+                versions.append(version)
+        return sorted(versions)
+
+    def bases(self, workflow_id: str) -> list[int]:
+        """Versions for which a full base record is stored."""
+        return self._scan(self._directory(workflow_id), 'base', '.json')
+
+    def _segments(self, directory: Path) -> list[int]:
+        return self._scan(directory, 'deltas', '.ndjson')
+
+    def _log(self, workflow_id: str) -> _WorkflowLog:
+        with self._logs_lock:
+            log = self._logs.get(workflow_id)
+            if log is None:
+                directory = self._directory(workflow_id)
+                if not directory.is_dir():
+                    raise KeyError(workflow_id)
+                log = _WorkflowLog(directory)
+                segments = self._segments(directory)
+                start = segments[-1] if segments else self.bases(workflow_id)[-1]
+                log.version = start
+                for delta in self._read_segment(directory, start):
+                    log.version = delta.version
+                    log.segment_deltas += 1
+                count = log.segment_deltas
+                log.open_segment(start)
+                log.segment_deltas = count
+                self._logs[workflow_id] = log
+            return log
+
+    # Writing
+
+    def create(self, record: WorkflowStateRecord, version: int = 0) -> None:
+        """Store `record` as the first base of a new workflow."""
+        directory = self._directory(record.workflow_id)
+        directory.mkdir(parents=True, exist_ok=False)
+        self._write_base(directory, version, record)
+        log = _WorkflowLog(directory)
+        log.version = version
+        log.open_segment(version)
+        with self._logs_lock:
+            self._logs[record.workflow_id] = log
+
+    def append(self, delta: WorkflowStateDelta) -> None:
+        """Append one delta. It must start at the latest stored version."""
+        if delta.is_empty():
+            return
+        log = self._log(delta.workflow_id)
+        line = delta.model_dump_json(exclude_defaults=True).encode() + b'\n'
+        with log.lock:
+            if delta.base_version != log.version:
+                raise ValueError(
+                    f"delta starts at version {delta.base_version}, store is at {log.version}"
+                )
+            log.handle.write(line)
+            log.handle.flush()
+            if self.fsync:
+                os.fsync(log.handle.fileno())
+            log.version = delta.version
+            log.segment_deltas += 1
+            due = log.segment_deltas >= self.compact_after and log.compacting is None
+        if due:
+            self.compact(delta.workflow_id, wait=self._executor is None)
+
+    def save(self, state: IncrementalWorkflowState) -> int:
+        """
+        Persist the changes made to `state` since it was last saved and trim
+        its in-memory change log. Returns the stored version.
+        """
+        try:
+            version = self.latest_version(state.workflow_id)
+        except KeyError:
+            self.create(state.to_record(), state.version)
+            state.trim_history(state.version)
+            return state.version
+        self.append(state.delta_since(version))
+        state.trim_history(state.version)
+        return state.version
+
+    def latest_version(self, workflow_id: str) -> int:
+        return self._log(workflow_id).version
+
+    # Compaction
+
+    def compact(self, workflow_id: str, wait: bool = True) -> Optional[Future]:
+        """
+        Start a new segment at the current version and write a base for it.
+        With `wait=False` the base is built on the background thread and the
+        returned future completes when it is on disk.
+        """
+        log = self._log(workflow_id)
+        with log.lock:
+            if log.compacting is not None or log.segment_deltas == 0:
+                return log.compacting
+            version = log.version
+            log.open_segment(version)
+            if not wait and self._executor is not None:
+                log.compacting = self._executor.submit(self._run_compaction, log, workflow_id, version)
+                return log.compacting
+            log.compacting = Future()
+        self._run_compaction(log, workflow_id, version)
+        return None
+
+    def _run_compaction(self, log: _WorkflowLog, workflow_id: str, version: int) -> None:
+        try:
+            self._write_compacted_base(workflow_id, version)
+        finally:
+            with log.lock:
+                log.compacting = None
+
+    def _write_compacted_base(self, workflow_id: str, version: int) -> None:
+        record = self.load(workflow_id, version)
+        self._write_base(self._directory(workflow_id), version, record)
+
+    def _write_base(self, directory: Path, version: int, record: WorkflowStateRecord) -> None:
+        body = record.model_dump_json().encode()
+        data = b'{"version":%d,"record":%s}' % (version, body)
+        _write_atomic(directory / _versioned('base', version, '.json'), data)
+
+    def prune(self, workflow_id: str, keep_bases: int = 1) -> None:
+        """
+        Remove all but the newest `keep_bases` bases and the delta segments
+        only they depend on. Versions older than the oldest kept base are lost.
+        """
+        directory = self._directory(workflow_id)
+        bases = self.bases(workflow_id)
+        if len(bases) <= keep_bases:
+            return
+        oldest_kept = bases[-keep_bases]
+        for version in bases[:-keep_bases]:
+            (directory / _versioned('base', version, '.json')).unlink()
+        for start in self._segments(directory):
+            if start < oldest_kept:
+                (directory / _versioned('deltas', start, '.ndjson')).unlink()
+
+    # Reading
+
+    def _read_segment(self, directory: Path, start: int) -> Iterator[WorkflowStateDelta]:
+        path = directory / _versioned('deltas', start, '.ndjson')
+        if not path.exists():
+            return
+        with open(path, 'rb') as fh:
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    # Torn write from a crash; the delta was never acknowledged.
+                    break
+                yield WorkflowStateDelta.model_validate_json(line)
+
+    def load(self, workflow_id: str, version: Optional[int] = None) -> WorkflowStateRecord:
+        """
+        Reconstruct the record at `version` (default: latest) from the newest
+        base at or before it plus the following deltas.
+        """
+        directory = self._directory(workflow_id)
+        bases = [v for v in self.bases(workflow_id) if version is None or v <= version]
+        if not bases:
+            raise KeyError(f"no base at or before version {version} for {workflow_id!r}")
+        current = bases[-1]
+        raw = json.loads((directory / _versioned('base', current, '.json')).read_bytes())
+        record = WorkflowStateRecord.model_validate(raw['record'])
+        for start in self._segments(directory):
+            if start < current:
+                continue
+            for delta in self._read_segment(directory, start):
+                if version is not None and delta.version > version:
+                    break
+                if delta.base_version < current:
+                    continue
+                if delta.base_version != current:
+                    raise ValueError(
+                        f"gap in delta log for {workflow_id!r}: {current} -> {delta.base_version}"
+                    )
+                record = delta.apply(record)
+                current = delta.version
+        if version is not None and current != version:
+            raise KeyError(f"version {version} is not stored for {workflow_id!r}")
+        return record
+
+    def load_state(self, workflow_id: str) -> IncrementalWorkflowState:
+        """Load the latest record as an IncrementalWorkflowState ready for `save()`."""
+        version = self.latest_version(workflow_id)
+        return IncrementalWorkflowState.from_record(self.load(workflow_id, version), version)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        with self._logs_lock:
+            for log in self._logs.values():
+                log.close()
+            self._logs.clear()
+
+    def __enter__(self) -> WorkflowStateStore:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
@@ -0,0 +1,111 @@
+# CabinCrew Protocol - Policy decision aggregation
+#
+# Hand-written helper; not generated from the schema.
+# Aggregation semantics follow the AggregationMethod comments in src/audit.ts.
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional, Union
+
+from ..protocol import (
+    AggregationMethod1,
+    Decision,
+    DecisionSeverity,
+    PolicyEvaluation,
+    RecordStringAny,
+    Source,
+)
+from ..telemetry import instrumentation
+
+_SEVERITY = {
+    Decision.allow: DecisionSeverity.number_0,
+    Decision.warn: DecisionSeverity.number_1,
+    Decision.require_approval: DecisionSeverity.number_2,
+    Decision.deny: DecisionSeverity.number_3,
+}
+_BY_SEVERITY = {severity.value: decision for decision, severity in _SEVERITY.items()}
+
+
+def decision_severity(decision: Union[Decision, str]) -> DecisionSeverity:
+    """0=allow, 1=warn, 2=require_approval, 3=deny."""
+    return _SEVERITY[Decision(decision)]
+
+
+def most_restrictive(decisions: Iterable[Decision]) -> Decision:
+    worst = max((_SEVERITY[d].value for d in decisions), default=0)
+    return _BY_SEVERITY[worst]
+
+
+def make_policy_evaluation(
+    source: Union[Source, str],
+    policy_id: str,
+    decision: Union[Decision, str],
+    reason: Optional[str] = None,
+    evidence: Optional[dict[str, Any]] = None,
+    evaluated_at: Optional[datetime] = None,
+) -> PolicyEvaluation:
+    """PolicyEvaluation with `severity` derived from `decision`."""
+    decision = Decision(decision)
+    return PolicyEvaluation(
+        source=Source(source),
+        policy_id=policy_id,
+        decision=decision,
+        severity=_SEVERITY[decision],
+        reason=reason,
+        evidence=RecordStringAny.model_validate(evidence) if evidence is not None else None,
+        evaluated_at=evaluated_at or datetime.now(timezone.utc),
+    )
+
+
+def _aggregate(
+    decisions: list[Decision],
+    method: AggregationMethod1,
+    custom: Optional[Callable[[list[Decision]], Decision]],
+) -> Decision:
+    if method is AggregationMethod1.custom:
+        if custom is None:
+            raise ValueError("aggregation method 'custom' requires a custom aggregator")
+        return Decision(custom(decisions))
+    if not decisions:
+        return Decision.allow
+    if method is AggregationMethod1.majority:
+        counts = Counter(decisions)
+        top = max(counts.values())
+        return most_restrictive(d for d, n in counts.items() if n == top)
+    if method is AggregationMethod1.any_deny and Decision.deny in decisions:
+        return Decision.deny
+    if method is AggregationMethod1.all_allow and all(d is Decision.allow for d in decisions):
+        return Decision.allow
+    if method is AggregationMethod1.unanimous and len(set(decisions)) == 1:
+        return decisions[0]
+    # most_restrictive, and the fallback for every other method
+    return most_restrictive(decisions)
+
+
+def aggregate_decisions(
+    evaluations: Iterable[Union[PolicyEvaluation, Decision, str]],
+    method: Union[AggregationMethod1, str] = AggregationMethod1.most_restrictive,
+    custom: Optional[Callable[[list[Decision]], Decision]] = None,
+) -> Decision:
+    """
+    Combine individual policy decisions into the final decision.
+
+    most_restrictive: deny > require_approval > warn > allow
+    unanimous / all_allow / any_deny: their agreed outcome, otherwise most restrictive
+    majority: most frequent decision, ties go to the most restrictive
+    custom: delegated to `custom(decisions)`
+    No evaluations aggregate to allow.
+    """
+    decisions = [e.decision if isinstance(e, PolicyEvaluation) else Decision(e) for e in evaluations]
+    method = AggregationMethod1(method)
+    sink = instrumentation.sink
+    if sink is None:
+        return _aggregate(decisions, method, custom)
+    start = instrumentation.clock()
+    try:
+        return _aggregate(decisions, method, custom)
+    finally:
+        sink.observe('aggregate', method.value, instrumentation.clock() - start)
@@ -0,0 +1,154 @@
+# CabinCrew Protocol - WAL replay into workflow state
+#
+# Hand-written helper; not generated from the schema.
+#
+# Rebuilds IncrementalWorkflowState for every workflow from WALEntry records.
+# This is the single replay path: crash recovery (`replay_wal`), hot-standby
+# followers and compaction all apply entries through `WALReplayer.apply`.
+#
+#   workflow_started    new state (initial_state, plan_token_hash)
+#   step_started        step added to steps_pending; becomes the current step
+#   policy_evaluated    PolicyEvaluationRecord for the current step
+#   approval_requested  current_state -> AWAITING_APPROVAL
+#   approval_received   ApprovalRecord for the requesting step; APPROVED if approved
+#   artifact_created    ArtifactRecord for the current step
+#   step_completed      step moved to steps_completed
+#   workflow_completed  current_state -> final_state
+#   workflow_failed     current_state -> FAILED, error and failed_step in metadata
+#
+# Entries at or below `last_sequence` are ignored, so re-delivered entries
+# (e.g. after a follower reconnects) are harmless.
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Optional, Union
+
+from ..protocol import (
+    ApprovalRecord,
+    ArtifactRecord,
+    PolicyEvaluationRecord,
+    State,
+    WALEntry,
+    WALEntryType,
+    WorkflowStateRecord,
+)
+from .state import IncrementalWorkflowState
+from .wal import read_wal
+
+FINAL_ENTRY_TYPES = frozenset({WALEntryType.workflow_completed, WALEntryType.workflow_failed})
+
+
+class WALReplayError(ValueError):
+    """An entry cannot be applied to the replayed state (e.g. unknown workflow)."""
+
+
+class WALReplayer:
+    """
+    Workflow states rebuilt from WAL entries. With `keep_history=False` each
+    state's change log is trimmed after every entry; keep it when deltas are
+    persisted through a WorkflowStateStore.
+    """
+
+    def __init__(self, keep_history: bool = False) -> None:
+        self.keep_history = keep_history
+        self.last_sequence = -1
+        self.states: dict[str, IncrementalWorkflowState] = {}
+        self.finished: set[str] = set()
+        """Workflows whose last applied entry was workflow_completed / workflow_failed."""
+        self._current_step: dict[str, str] = {}
+        self._approval_steps: dict[tuple[str, str], str] = {}
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def record(self, workflow_id: str) -> WorkflowStateRecord:
+        return self.states[workflow_id].to_record()
+
+    def apply(self, entry: WALEntry) -> bool:
+        """Apply one entry; False if it was already applied (sequence not above `last_sequence`)."""
+        if entry.sequence <= self.last_sequence:
+            return False
+        workflow_id = entry.workflow_id
+        data = entry.data
+        at = entry.timestamp
+        kind = entry.entry_type
+        if kind is WALEntryType.workflow_started:
+            self.states[workflow_id] = IncrementalWorkflowState(
+                workflow_id=workflow_id,
+                plan_token_hash=data.plan_token_hash,
+                current_state=data.initial_state,
+                created_at=at,
+            )
+            self.finished.discard(workflow_id)
+            self.last_sequence = entry.sequence
+            return True
+
+        state = self.states.get(workflow_id)
+        if state is None:
+            raise WALReplayError(f"{kind.value} at sequence {entry.sequence} for unknown workflow {workflow_id}")
+        step_id = self._current_step.get(workflow_id, '')
+        if kind is WALEntryType.step_started:
+            state.add_pending_step(data.step_id, at)
+            self._current_step[workflow_id] = data.step_id
+        elif kind is WALEntryType.step_completed:
+            state.complete_step(data.step_id, at)
+        elif kind is WALEntryType.policy_evaluated:
+            state.record_evaluation(PolicyEvaluationRecord(
+                evaluation_id=data.evaluation_id, step_id=step_id, policy_name=data.policy_name,
+                decision=data.decision, evaluated_at=at,
+            ), at)
+        elif kind is WALEntryType.approval_requested:
+            self._approval_steps[(workflow_id, data.approval_id)] = data.step_id
+            state.set_state(State.AWAITING_APPROVAL, at)
+        elif kind is WALEntryType.approval_received:
+            state.record_approval(ApprovalRecord(
+                approval_id=data.approval_id,
+                step_id=self._approval_steps.pop((workflow_id, data.approval_id), step_id),
+                plan_token_hash=state.plan_token_hash, approved=data.approved, approver=data.approver,
+                approved_at=at,
+            ), at)
+            if data.approved:
+                state.set_state(State.APPROVED, at)
+        elif kind is WALEntryType.artifact_created:
+            state.append_artifact(ArtifactRecord(
+                artifact_id=data.artifact_id, step_id=step_id, artifact_hash=data.artifact_hash,
+                artifact_type=data.artifact_type, created_at=at,
+            ), at)
+        elif kind is WALEntryType.workflow_completed:
+            state.set_state(data.final_state, at)
+        elif kind is WALEntryType.workflow_failed:
+            metadata = state.metadata.model_dump() if state.metadata is not None else {}
+            metadata.update(error=data.error, failed_step=data.failed_step)
+            state.set_metadata(metadata, at)
+            state.set_state(State.FAILED, at)
+        if kind in FINAL_ENTRY_TYPES:
+            self.finished.add(workflow_id)
+            self._current_step.pop(workflow_id, None)
+        if not self.keep_history:
+            state.trim_history(state.version)
+        self.last_sequence = entry.sequence
+        return True
+
+    def apply_many(self, entries: Iterable[WALEntry]) -> int:
+        return sum(self.apply(entry) for entry in entries)
+
+    def forget(self, workflow_id: str) -> None:
+        """Drop a workflow's state (e.g. after it has been archived)."""
+        self.states.pop(workflow_id, None)
+        self.finished.discard(workflow_id)
+        self._current_step.pop(workflow_id, None)
+        for key in [k for k in self._approval_steps if k[0] == workflow_id]:
+            del self._approval_steps[key]
+
+
+def replay_wal(
+    path: Union[str, Path],
+    replayer: Optional[WALReplayer] = None,
+    verify: bool = True,
+) -> WALReplayer:
+    """Apply every entry of a WAL file after `replayer.last_sequence`."""
+    replayer = replayer if replayer is not None else WALReplayer()
+    replayer.apply_many(read_wal(path, start=replayer.last_sequence + 1, verify=verify))
+    return replayer
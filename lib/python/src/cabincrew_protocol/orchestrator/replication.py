@@ -0,0 +1,522 @@
+# CabinCrew Protocol - WAL shipping to hot-standby orchestrators
+#
+# Hand-written helper; not generated from the schema.
+#
+# The primary runs a WALShipper next to its WALWriter; standbys run a
+# WALFollower. Both ends speak NDJSON over a TCP (`('host', port)` or
+# 'host:port') or Unix socket (a filesystem path):
+#
+#   follower -> primary   {"follower": "<name>", "after": <last applied sequence>}
+#                         {"ack": <sequence>}            after each applied batch
+#   primary  -> follower  WAL lines, verbatim from the primary's WAL file
+#
+# The shipper keeps a sparse sequence -> byte offset index of the WAL file, so
+# a follower that reconnects with `after=N` is served from the nearest indexed
+# offset instead of from the start. Followers verify each entry's checksum,
+# append it to their own WAL (optional) and apply it through WALReplayer, the
+# same path used for crash recovery.
+#
+#   # primary
+#   shipper = WALShipper('primary.wal', ('127.0.0.1', 7400)).start()
+#   writer = WALWriter('primary.wal', on_append=shipper.notify)
+#
+#   # standby (another process)
+#   follower = WALFollower(('127.0.0.1', 7400), wal_path='standby.wal').start()
+#   follower.replayer.record(workflow_id)
+#
+#   python -m cabincrew_protocol.orchestrator.replication serve primary.wal --listen 127.0.0.1:7400
+#   python -m cabincrew_protocol.orchestrator.replication follow --connect 127.0.0.1:7400 --wal standby.wal
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import IO, Any, Callable, Optional, Union
+
+from ..protocol import WALEntry
+from .replay import WALReplayer, replay_wal
+from .wal import WALCorruptionError, WALWriter, verify_checksum
+
+Address = Union[str, tuple[str, int]]
+
+_READ_SIZE = 1 << 16
+_SEQUENCE_PREFIX = b'{"sequence":'
+
+
+def parse_address(text: str) -> Address:
+    """'host:port' -> ('host', port); anything else is a Unix socket path."""
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit() and '/' not in text:
+        return (host or '127.0.0.1', int(port))
+    return text
+
+
+def _line_sequence(line: bytes) -> int:
+    if line.startswith(_SEQUENCE_PREFIX):
+        end = line.find(b',', len(_SEQUENCE_PREFIX))
+        if end > 0:
+            return int(line[len(_SEQUENCE_PREFIX):end])
+    return json.loads(line)['sequence']
+
+
+def _send_json(sock: socket.socket, message: dict[str, Any]) -> None:
+    sock.sendall(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+
+
+def _lines(buffer: bytearray) -> list[bytes]:
+    """Remove and return the complete lines at the front of `buffer`."""
+    end = buffer.rfind(b'\n') + 1
+    if not end:
+        return []
+    lines = bytes(buffer[:end]).splitlines(keepends=True)
+    del buffer[:end]
+    return lines
+
+
+class _OffsetIndex:
+    """Sparse sequence -> byte offset index of one WAL file (one inode)."""
+
+    def __init__(self, stride: int) -> None:
+        self.stride = stride
+        self.inode: Optional[int] = None
+        self._sequences: list[int] = []
+        self._offsets: list[int] = []
+        self._lock = threading.Lock()
+
+    def reset(self, inode: int) -> None:
+        with self._lock:
+            self.inode = inode
+            self._sequences.clear()
+            self._offsets.clear()
+
+    def note(self, inode: int, sequence: int, offset: int) -> None:
+        with self._lock:
+            if inode != self.inode:
+                return
+            if not self._sequences or sequence >= self._sequences[-1] + self.stride:
+                self._sequences.append(sequence)
+                self._offsets.append(offset)
+
+    def offset_for(self, inode: int, sequence: int) -> int:
+        """Offset of an entry at or before `sequence` (0 if unknown)."""
+        with self._lock:
+            if inode != self.inode:
+                return 0
+            position = bisect.bisect_right(self._sequences, sequence) - 1
+            return self._offsets[position] if position >= 0 else 0
+
+
+class WALShipper:
+    """
+    Serves a WAL file to followers and tracks their acknowledgements.
+    Call `notify()` after appends (or pass it as `WALWriter(on_append=...)`)
+    for low latency; otherwise new entries are picked up every `poll_interval`.
+    """
+
+    def __init__(
+        self,
+        wal_path: Union[str, Path],
+        address: Address,
+        poll_interval: float = 0.05,
+        index_stride: int = 1024,
+    ) -> None:
+        self.wal_path = Path(wal_path)
+        self._requested_address = address
+        self.poll_interval = poll_interval
+        self._index = _OffsetIndex(index_stride)
+        self._changed = threading.Condition()
+        self._acked = threading.Condition()
+        self.acknowledged: dict[str, int] = {}
+        """Last sequence acknowledged by each connected (or previously connected) follower."""
+        self._listener: Optional[socket.socket] = None
+        self._connections: set[socket.socket] = set()
+        self._closed = False
+        self._generation = 0
+
+    @property
+    def address(self) -> Address:
+        """Bound address (with the real port when listening on port 0)."""
+        if self._listener is None:
+            return self._requested_address
+        bound = self._listener.getsockname()
+        return bound if isinstance(self._requested_address, str) else (bound[0], bound[1])
+
+    def start(self) -> WALShipper:
+        address = self._requested_address
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.unlink(address)
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(address)
+            listener.listen()
+        else:
+            listener = socket.create_server(address)
+        self._listener = listener
+        self._build_index()
+        threading.Thread(target=self._accept_loop, name='wal-shipper', daemon=True).start()
+        return self
+
+    def _build_index(self) -> None:
+        try:
+            fh = open(self.wal_path, 'rb')
+        except FileNotFoundError:
+            return
+        with fh:
+            inode = os.fstat(fh.fileno()).st_ino
+            self._index.reset(inode)
+            offset = 0
+            for line in fh:
+                if not line.endswith(b'\n'):
+                    break
+                self._index.note(inode, _line_sequence(line), offset)
+                offset += len(line)
+
+    def notify(self, entry: Optional[WALEntry] = None) -> None:
+        """Wake follower streams; accepts (and ignores) the appended entry."""
+        with self._changed:
+            self._generation += 1
+            self._changed.notify_all()
+
+    def _accept_loop(self) -> None:
+        while not self._closed:
+            try:
+                conn, _ = self._listener.accept()
+            except OSError:
+                return
+            self._connections.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), name='wal-shipper-conn', daemon=True).start()
+
+    def _serve(self, conn: socket.socket) -> None:
+        buffer = bytearray()
+        try:
+            while b'\n' not in buffer:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    return
+                buffer += chunk
+            hello = json.loads(_lines(buffer)[0])
+            name = str(hello.get('follower') or id(conn))
+            after = int(hello.get('after', -1))
+            with self._acked:
+                self.acknowledged[name] = max(after, self.acknowledged.get(name, -1))
+                self._acked.notify_all()
+            gone = threading.Event()
+            threading.Thread(
+                target=self._read_acks, args=(conn, name, buffer, gone), name='wal-shipper-acks', daemon=True,
+            ).start()
+            self._stream(conn, after, gone)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._connections.discard(conn)
+            conn.close()
+
+    def _read_acks(self, conn: socket.socket, name: str, buffer: bytearray, gone: threading.Event) -> None:
+        try:
+            while True:
+                for line in _lines(buffer):
+                    ack = json.loads(line).get('ack')
+                    if ack is not None:
+                        with self._acked:
+                            if ack > self.acknowledged.get(name, -1):
+                                self.acknowledged[name] = ack
+                                self._acked.notify_all()
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                buffer += chunk
+        except (OSError, ValueError):
+            pass
+        finally:
+            gone.set()
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _open(self, after: int) -> tuple[IO[bytes], int, int]:
+        fh = open(self.wal_path, 'rb')
+        inode = os.fstat(fh.fileno()).st_ino
+        if inode != self._index.inode:
+            self._index.reset(inode)  # replaced (e.g. compacted); index rebuilds as it is read
+        offset = self._index.offset_for(inode, after + 1)
+        fh.seek(offset)
+        return fh, inode, offset
+
+    def _stream(self, conn: socket.socket, after: int, gone: threading.Event) -> None:
+        """Send every complete WAL line with sequence > `after`, then follow the file."""
+        fh: Optional[IO[bytes]] = None
+        last_sent = after
+        try:
+            while not self._closed and not gone.is_set():
+                if fh is None:
+                    try:
+                        fh, inode, offset = self._open(last_sent)
+                    except FileNotFoundError:
+                        self._wait(self._generation)
+                        continue
+                    pending = bytearray()
+                generation = self._generation
+                chunk = fh.read(_READ_SIZE)
+                if chunk:
+                    pending += chunk
+                    batch = []
+                    for line in _lines(pending):
+                        sequence = _line_sequence(line)
+                        self._index.note(inode, sequence, offset)
+                        offset += len(line)
+                        if sequence > last_sent:
+                            batch.append(line)
+                            last_sent = sequence
+                    if batch:
+                        conn.sendall(b''.join(batch))
+                    continue
+                try:
+                    st = os.stat(self.wal_path)
+                except FileNotFoundError:
+                    st = None
+                if st is None or st.st_ino != inode or st.st_size < offset + len(pending):
+                    fh.close()
+                    fh = None
+                    continue
+                self._wait(generation)
+        finally:
+            if fh is not None:
+                fh.close()
+
+    def _wait(self, generation: int) -> None:
+        with self._changed:
+            if self._generation == generation and not self._closed:
+                self._changed.wait(self.poll_interval)
+
+    def wait_for_ack(self, sequence: int, followers: int = 1, timeout: Optional[float] = None) -> bool:
+        """Block until `followers` followers have acknowledged `sequence`; False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._acked:
+            while sum(1 for acked in self.acknowledged.values() if acked >= sequence) < followers:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._acked.wait(remaining)
+            return True
+
+    def close(self) -> None:
+        self._closed = True
+        if self._listener is not None:
+            self._listener.close()
+            if isinstance(self._requested_address, str) and os.path.exists(self._requested_address):
+                os.unlink(self._requested_address)
+        for conn in list(self._connections):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.notify()
+
+    def __enter__(self) -> WALShipper:
+        return self.start() if self._listener is None else self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class WALFollower:
+    """
+    Hot-standby side: receives entries, optionally appends them to a local WAL
+    (`wal_path`), applies them to `replayer` and acknowledges by sequence.
+    On start, an existing local WAL is replayed first and streaming resumes
+    after its last entry. Disconnects are retried every `reconnect_interval`.
+
+    An entry that fails to parse, verify or apply is retried with doubling
+    back-off; after `max_failures` consecutive failures without progress the
+    follower stops and the error stays in `last_error`.
+    """
+
+    def __init__(
+        self,
+        address: Address,
+        replayer: Optional[WALReplayer] = None,
+        wal_path: Optional[Union[str, Path]] = None,
+        name: Optional[str] = None,
+        reconnect_interval: float = 0.5,
+        fsync: bool = False,
+        on_entry: Optional[Callable[[WALEntry], None]] = None,
+        max_failures: int = 5,
+    ) -> None:
+        self.address = address
+        self.replayer = replayer if replayer is not None else WALReplayer()
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.reconnect_interval = reconnect_interval
+        self.on_entry = on_entry
+        self.max_failures = max_failures
+        self.writer: Optional[WALWriter] = None
+        if wal_path is not None:
+            if Path(wal_path).exists():
+                replay_wal(wal_path, self.replayer)
+            self.writer = WALWriter(wal_path, fsync=fsync)
+        self.connections = 0
+        """Successful connections so far (reconnects included)."""
+        self.last_error: Optional[BaseException] = None
+        """Exception that ended the last connection, if any."""
+        self._applied = threading.Condition()
+        self._stopped = threading.Event()
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def applied_sequence(self) -> int:
+        return self.replayer.last_sequence
+
+    def start(self) -> WALFollower:
+        self._thread = threading.Thread(target=self.run, name='wal-follower', daemon=True)
+        self._thread.start()
+        return self
+
+    def _connect(self) -> socket.socket:
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.address)
+            return sock
+        return socket.create_connection(self.address)
+
+    def run(self) -> None:
+        """Follow until `stop()`, or until one entry keeps failing; reconnects after errors."""
+        failures = 0
+        while not self._stopped.is_set():
+            try:
+                self._sock = self._connect()
+            except OSError as exc:
+                self.last_error = exc
+                self._stopped.wait(self.reconnect_interval)
+                continue
+            self.connections += 1
+            start = self.applied_sequence
+            delay = self.reconnect_interval
+            try:
+                self._follow(self._sock)
+                self.last_error = None
+            except OSError as exc:
+                self.last_error = exc  # the primary went away; not the entry's fault
+            except Exception as exc:  # includes WALCorruptionError and errors from apply/on_entry
+                self.last_error = exc
+                failures = failures + 1 if self.applied_sequence == start else 1
+                if failures >= self.max_failures:
+                    break  # the entry after applied_sequence will not apply; see last_error
+                delay = self.reconnect_interval * 2 ** (failures - 1)
+            finally:
+                self._sock.close()
+                self._sock = None
+            self._stopped.wait(delay)
+        self._stopped.set()
+        with self._applied:
+            self._applied.notify_all()
+
+    def _follow(self, sock: socket.socket) -> None:
+        _send_json(sock, {'follower': self.name, 'after': self.applied_sequence})
+        buffer = bytearray()
+        while not self._stopped.is_set():
+            chunk = sock.recv(_READ_SIZE)
+            if not chunk:
+                return
+            buffer += chunk
+            applied = False
+            for line in _lines(buffer):
+                entry = WALEntry.model_validate_json(line)
+                if entry.sequence <= self.applied_sequence:
+                    continue
+                if not verify_checksum(entry):
+                    raise WALCorruptionError(f"checksum mismatch at sequence {entry.sequence}")
+                if self.writer is not None:
+                    self.writer.append_entry(entry)
+                with self._applied:
+                    self.replayer.apply(entry)
+                    self._applied.notify_all()
+                if self.on_entry is not None:
+                    self.on_entry(entry)
+                applied = True
+            if applied:
+                _send_json(sock, {'ack': self.applied_sequence})
+
+    def wait_for(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """Block until `sequence` has been applied; False on timeout or once the follower has stopped."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._applied:
+            while self.applied_sequence < sequence:
+                if self._stopped.is_set():
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._applied.wait(remaining)
+            return True
+
+    def stop(self) -> None:
+        self._stopped.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self.writer is not None:
+            self.writer.close()
+
+    def __enter__(self) -> WALFollower:
+        return self.start() if self._thread is None else self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Ship a WAL to hot-standby followers, or follow one.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="serve a WAL file to followers")
+    serve.add_argument('wal', help="primary WAL file")
+    serve.add_argument('--listen', required=True, help="host:port or Unix socket path")
+    follow = commands.add_parser('follow', help="replicate from a primary")
+    follow.add_argument('--connect', required=True, help="host:port or Unix socket path")
+    follow.add_argument('--wal', help="local WAL file to append replicated entries to")
+    follow.add_argument('--until', type=int, help="exit once this sequence has been applied")
+    follow.add_argument('--timeout', type=float, help="give up after this many seconds")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        with WALShipper(args.wal, parse_address(args.listen)) as shipper:
+            print(f"serving {args.wal} on {shipper.address}", flush=True)
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                pass
+        return 0
+
+    with WALFollower(parse_address(args.connect), wal_path=args.wal) as follower:
+        if args.until is None:
+            try:
+                follower._thread.join(args.timeout)
+            except KeyboardInterrupt:
+                pass
+            return 0
+        reached = follower.wait_for(args.until, args.timeout)
+    print(json.dumps({
+        'applied_sequence': follower.applied_sequence,
+        'workflows': len(follower.replayer),
+        'finished': len(follower.replayer.finished),
+    }), flush=True)
+    return 0 if reached else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+# CabinCrew Protocol - Parallel step scheduler
+#
+# Hand-written helper; not generated from the schema.
+#
+# Runs each workflow's steps as soon as their dependencies have completed,
+# on one asyncio event loop:
+#
+#   scheduler = StepScheduler(run_step, max_concurrency=256, max_per_workflow=8, wal=writer)
+#   result = await scheduler.run('wf-1', [
+#       StepSpec(step_id='fetch'),
+#       StepSpec(step_id='lint', depends_on=['fetch']),
+#       StepSpec(step_id='test', depends_on=['fetch']),
+#       StepSpec(step_id='package', depends_on=['lint', 'test']),
+#   ], state=incremental_state)
+#
+# `run_step(workflow_id, step)` is a coroutine returning the step's artifact
+# ids (or None). Dispatching writes a step_started WALEntry and adds the step
+# to `steps_pending`; success writes step_completed and moves it to
+# `steps_completed`. The first failing step stops further dispatch for its
+# workflow; steps already running finish.
+#
+# Fairness: workflows with a ready step and a free per-workflow slot wait in
+# one round-robin queue and get one dispatch per turn, so a workflow with a
+# thousand ready steps cannot starve the others. Every scheduling decision is
+# O(1); each step costs one Task.
+#
+# Resuming from a WorkflowStateRecord: steps in `steps_completed` are not run
+# again, and steps left in `steps_pending` (started before a crash) are.
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Iterable
+from typing import Callable, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from ..protocol import StepCompletedData, StepStartedData, WALEntryType
+from .state import IncrementalWorkflowState
+from .wal import WALWriter
+
+StepRunner = Callable[[str, 'StepSpec'], Awaitable[Optional[list[str]]]]
+
+
+class StepSpec(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    step_id: str
+    step_type: str = 'step'
+    """Recorded in StepStartedData."""
+    depends_on: list[str] = Field(default_factory=list)
+
+
+class StepGraphError(ValueError):
+    """Duplicate step ids, unknown dependencies or a dependency cycle."""
+
+
+class WorkflowRunResult(BaseModel):
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    workflow_id: str
+    completed: list[str]
+    """Steps completed by this run, in completion order."""
+    failed_step: Optional[str] = None
+    error: Optional[str] = None
+    not_run: list[str] = Field(default_factory=list)
+    """Steps never dispatched because an earlier step failed."""
+
+    @property
+    def ok(self) -> bool:
+        return self.failed_step is None
+
+
+def _check_graph(steps: list[StepSpec]) -> None:
+    """Raise StepGraphError unless `steps` form a DAG over known step ids."""
+    ids = {step.step_id for step in steps}
+    if len(ids) != len(steps):
+        raise StepGraphError("duplicate step_id")
+    remaining = {}
+    dependents: dict[str, list[str]] = {}
+    for step in steps:
+        for dependency in step.depends_on:
+            if dependency not in ids:
+                raise StepGraphError(f"step {step.step_id!r} depends on unknown step {dependency!r}")
+            dependents.setdefault(dependency, []).append(step.step_id)
+        remaining[step.step_id] = len(step.depends_on)
+    ready = [step_id for step_id, count in remaining.items() if not count]
+    seen = 0
+    while ready:
+        seen += 1
+        for dependent in dependents.get(ready.pop(), ()):
+            remaining[dependent] -= 1
+            if not remaining[dependent]:
+                ready.append(dependent)
+    if seen != len(steps):
+        raise StepGraphError("dependency cycle among steps: " + ', '.join(s for s, c in remaining.items() if c))
+
+
+class _Run:
+    """Scheduling state of one submitted workflow."""
+
+    __slots__ = (
+        'workflow_id', 'steps', 'state', 'limit', 'future', 'remaining', 'dependents',
+        'ready', 'running', 'queued', 'completed', 'failed_step', 'error',
+    )
+
+    def __init__(
+        self,
+        workflow_id: str,
+        steps: list[StepSpec],
+        state: Optional[IncrementalWorkflowState],
+        limit: int,
+        future: asyncio.Future,
+    ) -> None:
+        self.workflow_id = workflow_id
+        self.steps = {step.step_id: step for step in steps}
+        self.state = state
+        self.limit = limit
+        self.future = future
+        done = set(state.steps_completed) if state is not None else set()
+        self.remaining: dict[str, int] = {}
+        self.dependents: dict[str, list[str]] = {}
+        self.ready: deque[str] = deque()
+        for step in steps:
+            if step.step_id in done:
+                continue
+            waiting = 0
+            for dependency in step.depends_on:
+                if dependency not in done:
+                    waiting += 1
+                    self.dependents.setdefault(dependency, []).append(step.step_id)
+            self.remaining[step.step_id] = waiting
+            if not waiting:
+                self.ready.append(step.step_id)
+        self.running = 0
+        self.queued = False
+        self.completed: list[str] = []
+        self.failed_step: Optional[str] = None
+        self.error: Optional[str] = None
+
+
+class StepScheduler:
+    """
+    Dispatches ready steps of many workflows concurrently, with at most
+    `max_concurrency` steps running in total and `max_per_workflow` per
+    workflow. Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        run_step: StepRunner,
+        max_concurrency: int = 64,
+        max_per_workflow: int = 4,
+        wal: Optional[WALWriter] = None,
+    ) -> None:
+        if max_concurrency < 1 or max_per_workflow < 1:
+            raise ValueError("concurrency limits must be at least 1")
+        self.run_step = run_step
+        self.max_concurrency = max_concurrency
+        self.max_per_workflow = max_per_workflow
+        self.wal = wal
+        self.running = 0
+        """Steps currently running across all workflows."""
+        self._runs: dict[str, _Run] = {}
+        self._turns: deque[_Run] = deque()
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        """Workflows submitted and not yet finished."""
+        return len(self._runs)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'workflows': len(self._runs),
+            'running': self.running,
+            'waiting_workflows': len(self._turns),
+            'ready_steps': sum(len(run.ready) for run in self._runs.values()),
+        }
+
+    # Submission
+
+    def submit(
+        self,
+        workflow_id: str,
+        steps: Iterable[StepSpec],
+        state: Optional[IncrementalWorkflowState] = None,
+        max_per_workflow: Optional[int] = None,
+    ) -> asyncio.Future:
+        """
+        Schedule a workflow's steps; the returned future resolves to its
+        WorkflowRunResult. Raises StepGraphError for an invalid graph and
+        ValueError if the workflow is already running.
+        """
+        steps = list(steps)
+        _check_graph(steps)
+        if workflow_id in self._runs:
+            raise ValueError(f"workflow {workflow_id!r} is already scheduled")
+        future = asyncio.get_running_loop().create_future()
+        run = _Run(workflow_id, steps, state, max_per_workflow or self.max_per_workflow, future)
+        self._runs[workflow_id] = run
+        if not run.remaining:
+            self._finish(run)
+            return future
+        self._offer(run)
+        self._pump()
+        return future
+
+    async def run(
+        self,
+        workflow_id: str,
+        steps: Iterable[StepSpec],
+        state: Optional[IncrementalWorkflowState] = None,
+        max_per_workflow: Optional[int] = None,
+    ) -> WorkflowRunResult:
+        return await self.submit(workflow_id, steps, state, max_per_workflow)
+
+    # Dispatch
+
+    def _offer(self, run: _Run) -> None:
+        """Give `run` a turn if it can start another step."""
+        if not run.queued and run.ready and run.running < run.limit and run.failed_step is None:
+            run.queued = True
+            self._turns.append(run)
+
+    def _pump(self) -> None:
+        while self.running < self.max_concurrency and self._turns:
+            run = self._turns.popleft()
+            run.queued = False
+            if not run.ready:
+                continue  # a step failed (clearing `ready`) while this turn was queued
+            self._dispatch(run, run.steps[run.ready.popleft()])
+            self._offer(run)
+
+    def _dispatch(self, run: _Run, step: StepSpec) -> None:
+        run.running += 1
+        self.running += 1
+        if self.wal is not None:
+            self.wal.append(
+                run.workflow_id, WALEntryType.step_started,
+                StepStartedData(step_id=step.step_id, step_type=step.step_type),
+            )
+        if run.state is not None:
+            run.state.add_pending_step(step.step_id)
+        task = asyncio.get_running_loop().create_task(self._execute(run, step))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, run: _Run, step: StepSpec) -> None:
+        try:
+            artifacts = await self.run_step(run.workflow_id, step)
+        except (Exception, asyncio.CancelledError) as exc:
+            self._failed(run, step, exc)
+        else:
+            self._completed(run, step, artifacts)
+        finally:
+            run.running -= 1
+            self.running -= 1
+            if not run.running and (run.failed_step is not None or not run.ready):
+                self._finish(run)
+            else:
+                self._offer(run)
+            self._pump()
+
+    def _completed(self, run: _Run, step: StepSpec, artifacts: Optional[list[str]]) -> None:
+        if self.wal is not None:
+            self.wal.append(
+                run.workflow_id, WALEntryType.step_completed,
+                StepCompletedData(step_id=step.step_id, artifacts=artifacts),
+            )
+        if run.state is not None:
+            run.state.complete_step(step.step_id)
+        run.completed.append(step.step_id)
+        del run.remaining[step.step_id]
+        for dependent in run.dependents.pop(step.step_id, ()):
+            run.remaining[dependent] -= 1
+            if not run.remaining[dependent] and run.failed_step is None:
+                run.ready.append(dependent)
+
+    def _failed(self, run: _Run, step: StepSpec, exc: BaseException) -> None:
+        if run.failed_step is None:
+            run.failed_step = step.step_id
+            run.error = str(exc) or type(exc).__name__
+        del run.remaining[step.step_id]
+        run.ready.clear()
+
+    def _finish(self, run: _Run) -> None:
+        del self._runs[run.workflow_id]
+        if run.future.done():
+            return
+        run.future.set_result(WorkflowRunResult(
+            workflow_id=run.workflow_id,
+            completed=run.completed,
+            failed_step=run.failed_step,
+            error=run.error,
+            not_run=[step_id for step_id in run.steps if step_id in run.remaining],
+        ))
+
+    async def join(self) -> None:
+        """Wait until every submitted workflow has finished."""
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
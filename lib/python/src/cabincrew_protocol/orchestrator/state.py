@@ -0,0 +1,357 @@
+# CabinCrew Protocol - Incremental WorkflowStateRecord
+#
+# Hand-written helper; not generated from the schema.
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Any, Optional, Union
+
+from pydantic import AwareDatetime, BaseModel, ConfigDict
+
+from ..protocol import (
+    ApprovalRecord,
+    ArtifactRecord,
+    PolicyEvaluationRecord,
+    RecordStringAny,
+    State,
+    WorkflowStateRecord,
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class WorkflowStateDelta(BaseModel):
+    """
+    Changes applied to a WorkflowStateRecord between two versions.
+    Applying the delta to the record at `base_version` yields the record at `version`.
+    """
+
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    workflow_id: str
+    base_version: int
+    version: int
+    updated_at: AwareDatetime
+    current_state: Optional[State] = None
+    steps_completed: list[str] = []
+    steps_pending_added: list[str] = []
+    steps_pending_removed: list[str] = []
+    approvals: list[ApprovalRecord] = []
+    artifacts: list[ArtifactRecord] = []
+    policy_evaluations: list[PolicyEvaluationRecord] = []
+    metadata: Optional[RecordStringAny] = None
+
+    def is_empty(self) -> bool:
+        return self.version == self.base_version
+
+    def apply(self, record: WorkflowStateRecord) -> WorkflowStateRecord:
+        """
+        Return a new record with this delta applied.
+        Unchanged items are shared with `record`; nothing is re-validated.
+        """
+        if record.workflow_id != self.workflow_id:
+            raise ValueError(
+                f"delta for workflow {self.workflow_id!r} applied to {record.workflow_id!r}"
+            )
+        removed = set(self.steps_pending_removed)
+        pending = [s for s in record.steps_pending if s not in removed]
+        pending.extend(self.steps_pending_added)
+        fields = dict(record.__dict__)
+        fields.update(
+            current_state=self.current_state or record.current_state,
+            updated_at=self.updated_at,
+            steps_completed=record.steps_completed + self.steps_completed,
+            steps_pending=pending,
+            approvals=record.approvals + self.approvals,
+            artifacts=record.artifacts + self.artifacts,
+            policy_evaluations=record.policy_evaluations + self.policy_evaluations,
+        )
+        if self.metadata is not None:
+            fields['metadata'] = self.metadata
+        return WorkflowStateRecord.model_construct(**fields)
+
+
+class _PendingSteps:
+    """
+    Versioned pending-step set.
+    Entries are never deleted, only stamped with the version that removed them,
+    so any earlier version can be viewed without copying.
+    """
+
+    __slots__ = ('_entries', '_live')
+
+    def __init__(self) -> None:
+        # [step_id, added_version, removed_version or None]
+        self._entries: list[list[Any]] = []
+        self._live: dict[str, int] = {}
+
+    def __contains__(self, step_id: str) -> bool:
+        return step_id in self._live
+
+    def add(self, step_id: str, version: int) -> bool:
+        if step_id in self._live:
+            return False
+        self._live[step_id] = len(self._entries)
+        self._entries.append([step_id, version, None])
+        return True
+
+    def remove(self, step_id: str, version: int) -> bool:
+        index = self._live.pop(step_id, None)
+        if index is None:
+            return False
+        self._entries[index][2] = version
+        return True
+
+    def view(self, version: int) -> list[str]:
+        return [
+            step_id
+            for step_id, added, removed in self._entries
+            if added <= version and (removed is None or removed > version)
+        ]
+
+
+class WorkflowStateSnapshot:
+    """
+    Immutable view of an IncrementalWorkflowState at a given version.
+    Taking a snapshot is O(1); it shares storage with the live state.
+    """
+
+    __slots__ = ('_state', 'version', '_lengths', '_scalars')
+
+    def __init__(self, state: IncrementalWorkflowState) -> None:
+        self._state = state
+        self.version = state.version
+        self._lengths = state._lengths()
+        self._scalars = (state.current_state, state.updated_at, state.metadata)
+
+    def to_record(self) -> WorkflowStateRecord:
+        return self._state._materialize(self.version, self._lengths, self._scalars)
+
+
+class IncrementalWorkflowState:
+    """
+    Mutable WorkflowStateRecord with O(1) per-step updates.
+
+    Records are append-only and shared between the live state and its snapshots,
+    so completing a step never copies or re-validates the existing history.
+    Every mutation bumps `version`; `delta_since()` returns only the changes made
+    after a given version, ready to be persisted or shipped.
+    """
+
+    def __init__(
+        self,
+        workflow_id: str,
+        plan_token_hash: str,
+        current_state: State = State.INIT,
+        created_at: Optional[datetime] = None,
+        metadata: Optional[RecordStringAny] = None,
+    ) -> None:
+        self.workflow_id = workflow_id
+        self.plan_token_hash = plan_token_hash
+        self.current_state = current_state
+        self.created_at = created_at or _utcnow()
+        self.updated_at = self.created_at
+        self.metadata = metadata
+        self.version = 0
+        self._base_version = 0
+        self._ops: list[tuple[str, Any]] = []
+        self._completed: list[str] = []
+        self._completed_set: set[str] = set()
+        self._pending = _PendingSteps()
+        self._approvals: list[ApprovalRecord] = []
+        self._artifacts: list[ArtifactRecord] = []
+        self._evaluations: list[PolicyEvaluationRecord] = []
+
+    @classmethod
+    def from_record(cls, record: WorkflowStateRecord, version: int = 0) -> IncrementalWorkflowState:
+        """
+        Load an existing record as `version`. The record itself is not modified.
+        """
+        state = cls(
+            workflow_id=record.workflow_id,
+            plan_token_hash=record.plan_token_hash,
+            current_state=record.current_state,
+            created_at=record.created_at,
+            metadata=record.metadata,
+        )
+        state.updated_at = record.updated_at
+        state.version = state._base_version = version
+        state._completed.extend(record.steps_completed)
+        state._completed_set.update(record.steps_completed)
+        for step_id in record.steps_pending:
+            state._pending.add(step_id, version)
+        state._approvals.extend(record.approvals)
+        state._artifacts.extend(record.artifacts)
+        state._evaluations.extend(record.policy_evaluations)
+        return state
+
+    # Mutations
+
+    def _record(self, op: str, payload: Any, at: Optional[datetime]) -> None:
+        self._ops.append((op, payload))
+        self.version += 1
+        self.updated_at = at or _utcnow()
+
+    def set_state(self, state: Union[State, str], at: Optional[datetime] = None) -> None:
+        self.current_state = State(state)
+        self._record('state', self.current_state, at)
+
+    def set_metadata(self, metadata: Union[RecordStringAny, dict[str, Any]], at: Optional[datetime] = None) -> None:
+        self.metadata = RecordStringAny.model_validate(metadata)
+        self._record('metadata', self.metadata, at)
+
+    def add_pending_step(self, step_id: str, at: Optional[datetime] = None) -> None:
+        if step_id in self._completed_set:
+            raise ValueError(f"step {step_id!r} is already completed")
+        if self._pending.add(step_id, self.version + 1):
+            self._record('pending_add', step_id, at)
+
+    def complete_step(self, step_id: str, at: Optional[datetime] = None) -> None:
+        """
+        Move a step from steps_pending to steps_completed.
+        Steps that were never pending are appended to steps_completed directly.
+        """
+        if step_id in self._completed_set:
+            raise ValueError(f"step {step_id!r} is already completed")
+        if self._pending.remove(step_id, self.version + 1):
+            self._ops.append(('pending_remove', step_id))
+            self.version += 1
+        self._completed.append(step_id)
+        self._completed_set.add(step_id)
+        self._record('completed', step_id, at)
+
+    def append_artifact(self, artifact: Union[ArtifactRecord, dict[str, Any]], at: Optional[datetime] = None) -> ArtifactRecord:
+        artifact = ArtifactRecord.model_validate(artifact)
+        self._artifacts.append(artifact)
+        self._record('artifact', artifact, at)
+        return artifact
+
+    def record_approval(self, approval: Union[ApprovalRecord, dict[str, Any]], at: Optional[datetime] = None) -> ApprovalRecord:
+        approval = ApprovalRecord.model_validate(approval)
+        self._approvals.append(approval)
+        self._record('approval', approval, at)
+        return approval
+
+    def record_evaluation(
+        self,
+        evaluation: Union[PolicyEvaluationRecord, dict[str, Any]],
+        at: Optional[datetime] = None,
+    ) -> PolicyEvaluationRecord:
+        evaluation = PolicyEvaluationRecord.model_validate(evaluation)
+        self._evaluations.append(evaluation)
+        self._record('evaluation', evaluation, at)
+        return evaluation
+
+    # Views
+
+    @property
+    def steps_completed(self) -> tuple[str, ...]:
+        return tuple(self._completed)
+
+    @property
+    def steps_pending(self) -> list[str]:
+        return self._pending.view(self.version)
+
+    def is_pending(self, step_id: str) -> bool:
+        return step_id in self._pending
+
+    def is_completed(self, step_id: str) -> bool:
+        return step_id in self._completed_set
+
+    def _lengths(self) -> tuple[int, int, int, int]:
+        return (len(self._completed), len(self._approvals), len(self._artifacts), len(self._evaluations))
+
+    def _materialize(
+        self,
+        version: int,
+        lengths: tuple[int, int, int, int],
+        scalars: tuple[State, datetime, Optional[RecordStringAny]],
+    ) -> WorkflowStateRecord:
+        completed, approvals, artifacts, evaluations = lengths
+        current_state, updated_at, metadata = scalars
+        return WorkflowStateRecord.model_construct(
+            workflow_id=self.workflow_id,
+            current_state=current_state,
+            plan_token_hash=self.plan_token_hash,
+            created_at=self.created_at,
+            updated_at=updated_at,
+            steps_completed=self._completed[:completed],
+            steps_pending=self._pending.view(version),
+            approvals=self._approvals[:approvals],
+            artifacts=self._artifacts[:artifacts],
+            policy_evaluations=self._evaluations[:evaluations],
+            metadata=metadata,
+        )
+
+    def snapshot(self) -> WorkflowStateSnapshot:
+        return WorkflowStateSnapshot(self)
+
+    def to_record(self) -> WorkflowStateRecord:
+        """
+        Materialize the current state. Items are already validated, so the
+        record is built with `model_construct` and costs one list copy per field.
+        """
+        return self._materialize(
+            self.version,
+            self._lengths(),
+            (self.current_state, self.updated_at, self.metadata),
+        )
+
+    def trim_history(self, version: int) -> None:
+        """
+        Forget the change log up to `version` (e.g. once it has been persisted).
+        `delta_since()` is then only available from `version` onwards.
+        """
+        if not self._base_version <= version <= self.version:
+            raise ValueError(f"version {version} outside {self._base_version}..{self.version}")
+        del self._ops[:version - self._base_version]
+        self._base_version = version
+
+    def delta_since(self, version: int) -> WorkflowStateDelta:
+        """
+        Return the changes made after `version`. Cost is proportional to the
+        number of changes, not to the size of the record.
+        """
+        if not self._base_version <= version <= self.version:
+            raise ValueError(f"version {version} outside {self._base_version}..{self.version}")
+        delta = WorkflowStateDelta.model_construct(
+            workflow_id=self.workflow_id,
+            base_version=version,
+            version=self.version,
+            updated_at=self.updated_at,
+            current_state=None,
+            steps_completed=[],
+            steps_pending_added=[],
+            steps_pending_removed=[],
+            approvals=[],
+            artifacts=[],
+            policy_evaluations=[],
+            metadata=None,
+        )
+        added: dict[str, None] = {}
+        for op, payload in self._ops[version - self._base_version:]:
+            if op == 'completed':
+                delta.steps_completed.append(payload)
+            elif op == 'pending_add':
+                added[payload] = None
+            elif op == 'pending_remove':
+                if payload in added:
+                    del added[payload]
+                else:
+                    delta.steps_pending_removed.append(payload)
+            elif op == 'artifact':
+                delta.artifacts.append(payload)
+            elif op == 'approval':
+                delta.approvals.append(payload)
+            elif op == 'evaluation':
+                delta.policy_evaluations.append(payload)
+            elif op == 'state':
+                delta.current_state = payload
+            elif op == 'metadata':
+                delta.metadata = payload
+        delta.steps_pending_added.extend(added)
+        return delta
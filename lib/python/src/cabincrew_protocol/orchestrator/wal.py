@@ -0,0 +1,210 @@
+# CabinCrew Protocol - Write-Ahead Log helpers
+#
+# Hand-written helper; not generated from the schema.
+#
+# WAL files are NDJSON: one WALEntry per line, sequence numbers strictly
+# increasing, each entry carrying `wal_checksum()` of itself.
+
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Callable, Optional, Union
+
+from pydantic import BaseModel
+
+from ..integrity import canonical_hash, to_canonical
+from ..protocol import (
+    ApprovalReceivedData,
+    ApprovalRequestedData,
+    ArtifactCreatedData,
+    PolicyEvaluatedData,
+    StepCompletedData,
+    StepStartedData,
+    WALEntry,
+    WALEntryType,
+    WorkflowCompletedData,
+    WorkflowFailedData,
+    WorkflowStartedData,
+)
+from ..telemetry import instrumentation
+
+WAL_DATA_MODELS: dict[WALEntryType, type[BaseModel]] = {
+    WALEntryType.workflow_started: WorkflowStartedData,
+    WALEntryType.step_started: StepStartedData,
+    WALEntryType.step_completed: StepCompletedData,
+    WALEntryType.approval_requested: ApprovalRequestedData,
+    WALEntryType.approval_received: ApprovalReceivedData,
+    WALEntryType.artifact_created: ArtifactCreatedData,
+    WALEntryType.policy_evaluated: PolicyEvaluatedData,
+    WALEntryType.workflow_completed: WorkflowCompletedData,
+    WALEntryType.workflow_failed: WorkflowFailedData,
+}
+"""Payload model for each entry type."""
+
+
+class WALCorruptionError(ValueError):
+    """A WAL entry failed its checksum or broke sequence ordering."""
+
+
+def wal_checksum(entry: Union[WALEntry, dict[str, Any]]) -> str:
+    """
+    SHA256 over the canonical JSON of the entry without its `checksum` field.
+    Accepts a WALEntry or its JSON-mode dict.
+    """
+    body = dict(to_canonical(entry))
+    body.pop('checksum', None)
+    return canonical_hash(body)
+
+
+def verify_checksum(entry: Union[WALEntry, dict[str, Any]]) -> bool:
+    checksum = entry.checksum if isinstance(entry, WALEntry) else entry.get('checksum')
+    return checksum == wal_checksum(entry)
+
+
+def make_wal_entry(
+    sequence: int,
+    workflow_id: str,
+    entry_type: Union[WALEntryType, str],
+    data: Union[BaseModel, dict[str, Any]],
+    timestamp: Optional[datetime] = None,
+) -> WALEntry:
+    """Build a WALEntry with the payload model matching `entry_type` and a valid checksum."""
+    entry_type = WALEntryType(entry_type)
+    entry = WALEntry(
+        sequence=sequence,
+        timestamp=timestamp or datetime.now(timezone.utc),
+        workflow_id=workflow_id,
+        entry_type=entry_type,
+        data=WAL_DATA_MODELS[entry_type].model_validate(data),
+        checksum='',
+    )
+    entry.checksum = wal_checksum(entry)
+    return entry
+
+
+def _parse_entry(line: bytes, verify: bool, after: int) -> WALEntry:
+    entry = WALEntry.model_validate_json(line)
+    if verify and not verify_checksum(entry):
+        raise WALCorruptionError(f"checksum mismatch at sequence {entry.sequence}")
+    if entry.sequence <= after:
+        raise WALCorruptionError(f"sequence {entry.sequence} does not follow {after}")
+    return entry
+
+
+def read_wal(path: Union[str, Path], start: int = 0, verify: bool = True) -> Iterator[WALEntry]:
+    """
+    Yield entries with `sequence >= start` in file order.
+    A torn final line (crash during append) is ignored; any other bad entry
+    raises WALCorruptionError.
+    """
+    last = -1
+    with open(path, 'rb') as fh:
+        for line in fh:
+            if not line.endswith(b'\n'):
+                break
+            entry = _parse_entry(line, verify, last)
+            last = entry.sequence
+            if entry.sequence >= start:
+                yield entry
+
+
+def _truncate_torn_tail(path: Path) -> None:
+    """Cut a crash-torn last line so the next append starts on a fresh line."""
+    with open(path, 'rb+') as fh:
+        data = fh.read()
+        end = data.rfind(b'\n') + 1
+        if end != len(data):
+            fh.truncate(end)
+
+
+class WALWriter:
+    """
+    Append-only WAL file writer.
+    Assigns monotonic sequence numbers and checksums; safe to share between threads.
+    `on_append` is called with each entry once it is written (e.g. `WALShipper.notify`).
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        fsync: bool = False,
+        on_append: Optional[Callable[[WALEntry], None]] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.fsync = fsync
+        self.on_append = on_append
+        self._lock = threading.Lock()
+        self.last_sequence = -1
+        if self.path.exists():
+            _truncate_torn_tail(self.path)
+            for entry in read_wal(self.path, verify=False):
+                self.last_sequence = entry.sequence
+        self._handle: IO[bytes] = open(self.path, 'ab')
+
+    @property
+    def next_sequence(self) -> int:
+        return self.last_sequence + 1
+
+    def append(
+        self,
+        workflow_id: str,
+        entry_type: Union[WALEntryType, str],
+        data: Union[BaseModel, dict[str, Any]],
+        timestamp: Optional[datetime] = None,
+    ) -> WALEntry:
+        """Build, checksum and append the next entry."""
+        with self._lock:
+            entry = make_wal_entry(self.next_sequence, workflow_id, entry_type, data, timestamp)
+            self._write(entry)
+            return entry
+
+    def append_entry(self, entry: WALEntry) -> None:
+        """Append an already-built entry (e.g. one shipped from another orchestrator)."""
+        if not verify_checksum(entry):
+            raise WALCorruptionError(f"checksum mismatch at sequence {entry.sequence}")
+        with self._lock:
+            if entry.sequence <= self.last_sequence:
+                raise WALCorruptionError(
+                    f"sequence {entry.sequence} does not follow {self.last_sequence}"
+                )
+            self._write(entry)
+
+    def _write(self, entry: WALEntry) -> None:
+        sink = instrumentation.sink
+        start = instrumentation.clock() if sink is not None else 0
+        self._handle.write(entry.model_dump_json().encode() + b'\n')
+        self._handle.flush()
+        if self.fsync:
+            os.fsync(self._handle.fileno())
+        self.last_sequence = entry.sequence
+        if sink is not None:
+            sink.observe('wal_append', entry.entry_type.value, instrumentation.clock() - start)
+        if self.on_append is not None:
+            self.on_append(entry)
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        """
+        Block appends for the duration of the block. If `path` was replaced
+        meanwhile (e.g. by WALCompactor), appends continue in the new file.
+        """
+        with self._lock:
+            yield
+            if os.stat(self.path).st_ino != os.fstat(self._handle.fileno()).st_ino:
+                self._handle.close()
+                self._handle = open(self.path, 'ab')
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
+
+    def __enter__(self) -> WALWriter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
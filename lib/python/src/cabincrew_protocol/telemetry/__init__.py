@@ -0,0 +1,16 @@
+# CabinCrew Protocol - Telemetry helpers
+# Opt-in hot-path instrumentation (instrumentation.py) and EngineMetric aggregation (aggregator.py).
+
+from . import instrumentation
+from .aggregator import MetricsAggregator, QuantileSketch
+from .instrumentation import CallbackSink, InMemorySink, MetricsSink, OpenTelemetrySink
+
+__all__ = [
+    "instrumentation",
+    "CallbackSink",
+    "InMemorySink",
+    "MetricsAggregator",
+    "MetricsSink",
+    "OpenTelemetrySink",
+    "QuantileSketch",
+]
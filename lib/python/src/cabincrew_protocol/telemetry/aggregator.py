@@ -0,0 +1,267 @@
+# CabinCrew Protocol - EngineMetric aggregation
+#
+# Hand-written helper; not generated from the schema.
+#
+# Folds streams of EngineMetric samples into one series per (name, tags).
+# Per series it keeps count/sum/min/max in flat arrays indexed by series id
+# and a log-bucketed quantile sketch (relative error bounded by `accuracy`),
+# so memory grows with the number of series and sketch buckets, never with
+# the number of samples. `flush()` emits compact EngineMetric summaries.
+# NaN and infinite samples have no bucket and would poison sum/min/max; they
+# are skipped and counted in `non_finite`.
+#
+#   aggregator = MetricsAggregator(interval=10.0, on_flush=store.write)
+#   for output in outputs:
+#       aggregator.add_output(output)
+#   aggregator.flush()
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from array import array
+from collections.abc import Iterable
+from typing import Any, Callable, Optional
+
+from ..protocol import EngineMetric, EngineOutput
+
+TagKey = tuple[tuple[str, Any], ...]
+
+
+def _tag_key(tags: Optional[dict[str, Any]]) -> TagKey:
+    if not tags:
+        return ()
+    key = tuple(sorted(tags.items()))
+    try:
+        hash(key)
+    except TypeError:
+        # Nested values (lists, dicts) are interned by their JSON text.
+        key = tuple((k, v if _hashable(v) else json.dumps(v, sort_keys=True)) for k, v in key)
+    return key
+
+
+def _hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+class QuantileSketch:
+    """
+    Log-bucketed sketch (DDSketch-style): every value lands in bucket
+    ceil(log_gamma(|v|)), so quantiles are accurate to a relative error of
+    `accuracy` and the bucket count depends only on the value range.
+    """
+
+    __slots__ = ('gamma', '_log_gamma', 'positive', 'negative', 'zeros', 'count')
+
+    def __init__(self, accuracy: float = 0.01) -> None:
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: dict[int, int] = {}
+        self.negative: dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value: float) -> None:
+        if not math.isfinite(value):
+            raise ValueError(f"cannot sketch non-finite value {value!r}")
+        self.count += 1
+        if value > 0:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.positive[index] = self.positive.get(index, 0) + 1
+        elif value < 0:
+            index = math.ceil(math.log(-value) / self._log_gamma)
+            self.negative[index] = self.negative.get(index, 0) + 1
+        else:
+            self.zeros += 1
+
+    def merge(self, other: QuantileSketch) -> None:
+        for mine, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in theirs.items():
+                mine[index] = mine.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive)) if self.positive else 0.0
+
+    def clear(self) -> None:
+        self.positive.clear()
+        self.negative.clear()
+        self.zeros = 0
+        self.count = 0
+
+
+class MetricsAggregator:
+    """
+    Aggregate EngineMetric samples per series and flush summaries.
+
+    `interval` (seconds): `add*()` flushes automatically once it has elapsed
+    since the previous flush, passing the summaries to `on_flush`. Series stay
+    interned across flushes (their arrays are reset in place); call
+    `reset(forget_series=True)` to drop them.
+    """
+
+    def __init__(
+        self,
+        interval: Optional[float] = 10.0,
+        on_flush: Optional[Callable[[list[EngineMetric]], None]] = None,
+        quantiles: tuple[float, ...] = (0.5, 0.9, 0.99),
+        accuracy: float = 0.01,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = interval
+        self.on_flush = on_flush
+        self.quantiles = quantiles
+        self.accuracy = accuracy
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._ids: dict[tuple[str, TagKey], int] = {}
+        self._series: list[tuple[str, Optional[dict[str, Any]]]] = []
+        self._count = array('q')
+        self._sum = array('d')
+        self._min = array('d')
+        self._max = array('d')
+        self._sketches: list[QuantileSketch] = []
+        self._last_flush = clock()
+        self.non_finite = 0
+        """Samples skipped because their value was NaN or infinite (running total)."""
+
+    def __len__(self) -> int:
+        """Number of interned series."""
+        return len(self._series)
+
+    def _series_id(self, name: str, tags: Optional[dict[str, Any]]) -> int:
+        key = (name, _tag_key(tags))
+        series = self._ids.get(key)
+        if series is None:
+            series = self._ids[key] = len(self._series)
+            self._series.append((name, dict(tags) if tags else None))
+            self._count.append(0)
+            self._sum.append(0.0)
+            self._min.append(math.inf)
+            self._max.append(-math.inf)
+            self._sketches.append(QuantileSketch(self.accuracy))
+        return series
+
+    def observe(self, name: str, value: float, tags: Optional[dict[str, Any]] = None) -> None:
+        """Record one sample without building an EngineMetric."""
+        with self._lock:
+            self._observe(name, value, tags)
+        self._maybe_flush()
+
+    def _observe(self, name: str, value: float, tags: Optional[dict[str, Any]]) -> None:
+        if not math.isfinite(value):
+            self.non_finite += 1
+            return
+        series = self._series_id(name, tags)
+        self._count[series] += 1
+        self._sum[series] += value
+        if value < self._min[series]:
+            self._min[series] = value
+        if value > self._max[series]:
+            self._max[series] = value
+        self._sketches[series].add(value)
+
+    def add(self, metric: EngineMetric) -> None:
+        with self._lock:
+            self._observe(metric.name, metric.value, metric.tags)
+        self._maybe_flush()
+
+    def add_many(self, metrics: Iterable[EngineMetric]) -> None:
+        with self._lock:
+            for metric in metrics:
+                self._observe(metric.name, metric.value, metric.tags)
+        self._maybe_flush()
+
+    def add_output(self, output: EngineOutput) -> None:
+        """Ingest `EngineOutput.metrics`."""
+        if output.metrics:
+            self.add_many(output.metrics)
+
+    def _maybe_flush(self) -> None:
+        if self.interval is not None and self.clock() - self._last_flush >= self.interval:
+            self.flush()
+
+    def snapshot(self) -> dict[tuple[str, TagKey], dict[str, float]]:
+        """Current statistics per (name, interned tags) for series with samples."""
+        with self._lock:
+            return {
+                (name, _tag_key(tags)): self._stats(series)
+                for series, (name, tags) in enumerate(self._series)
+                if self._count[series]
+            }
+
+    def _stats(self, series: int) -> dict[str, float]:
+        stats = {
+            'count': float(self._count[series]),
+            'sum': self._sum[series],
+            'min': self._min[series],
+            'max': self._max[series],
+        }
+        sketch = self._sketches[series]
+        for q in self.quantiles:
+            stats[f"p{q * 100:g}"] = sketch.quantile(q)
+        return stats
+
+    def flush(self) -> list[EngineMetric]:
+        """
+        Emit one EngineMetric per statistic (`<name>.count`, `<name>.sum`,
+        `<name>.min`, `<name>.max`, `<name>.p50`, ...) for every series that
+        received samples since the last flush, then reset those series.
+        """
+        with self._lock:
+            metrics = []
+            for series, (name, tags) in enumerate(self._series):
+                if not self._count[series]:
+                    continue
+                tags = dict(tags) if tags else None
+                for stat, value in self._stats(series).items():
+                    metrics.append(EngineMetric.model_construct(name=f"{name}.{stat}", value=value, tags=tags))
+                self._reset_series(series)
+            self._last_flush = self.clock()
+        if self.on_flush is not None and metrics:
+            self.on_flush(metrics)
+        return metrics
+
+    def _reset_series(self, series: int) -> None:
+        self._count[series] = 0
+        self._sum[series] = 0.0
+        self._min[series] = math.inf
+        self._max[series] = -math.inf
+        self._sketches[series].clear()
+
+    def reset(self, forget_series: bool = False) -> None:
+        with self._lock:
+            if forget_series:
+                self._ids.clear()
+                self._series.clear()
+                for values in (self._count, self._sum, self._min, self._max):
+                    del values[:]
+                self._sketches.clear()
+            else:
+                for series in range(len(self._series)):
+                    self._reset_series(series)
@@ -0,0 +1,240 @@
+# CabinCrew Protocol - Hot-path instrumentation
+#
+# Hand-written helper; not generated from the schema.
+#
+# Instrumentation is off by default. Library hot paths (canonical hashing,
+# policy aggregation, WAL append, and the validate/serialize helpers below)
+# read the module-level `sink` and skip all timing when it is None, so the
+# disabled cost is one attribute lookup and a comparison.
+#
+#   from cabincrew_protocol.telemetry import instrumentation
+#   sink = instrumentation.InMemorySink()
+#   instrumentation.enable(sink)
+#   ...
+#   print(sink.to_prometheus())
+#   metrics = sink.to_engine_metrics()   # list[EngineMetric]
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Callable, Optional, Protocol, TypeVar, Union
+
+from pydantic import BaseModel
+
+from ..protocol import EngineMetric
+
+M = TypeVar('M', bound=BaseModel)
+
+clock = time.perf_counter_ns
+
+# Histogram bucket upper bounds in nanoseconds: 1us .. ~16s, doubling.
+BUCKETS_NS: tuple[int, ...] = tuple(1_000 << i for i in range(25))
+
+
+class MetricsSink(Protocol):
+    def observe(self, operation: str, label: str, duration_ns: int) -> None:
+        """Record one timed operation (e.g. 'validate', 'LLMGatewayRequest', 1200)."""
+
+
+sink: Optional[MetricsSink] = None
+
+
+def enable(new_sink: MetricsSink) -> None:
+    global sink
+    sink = new_sink
+
+
+def disable() -> None:
+    global sink
+    sink = None
+
+
+@contextmanager
+def timed(operation: str, label: str = '') -> Iterator[None]:
+    """Time a block of caller code under `operation` if instrumentation is enabled."""
+    current = sink
+    if current is None:
+        yield
+        return
+    start = clock()
+    try:
+        yield
+    finally:
+        current.observe(operation, label, clock() - start)
+
+
+# Instrumented model helpers
+
+def validate(model: type[M], data: Any) -> M:
+    """`model.model_validate(data)`, timed as 'validate'."""
+    current = sink
+    if current is None:
+        return model.model_validate(data)
+    start = clock()
+    try:
+        return model.model_validate(data)
+    finally:
+        current.observe('validate', model.__name__, clock() - start)
+
+
+def validate_json(model: type[M], data: Union[str, bytes]) -> M:
+    """`model.model_validate_json(data)`, timed as 'validate'."""
+    current = sink
+    if current is None:
+        return model.model_validate_json(data)
+    start = clock()
+    try:
+        return model.model_validate_json(data)
+    finally:
+        current.observe('validate', model.__name__, clock() - start)
+
+
+def serialize(instance: BaseModel, **kwargs: Any) -> str:
+    """`instance.model_dump_json(**kwargs)`, timed as 'serialize'."""
+    current = sink
+    if current is None:
+        return instance.model_dump_json(**kwargs)
+    start = clock()
+    try:
+        return instance.model_dump_json(**kwargs)
+    finally:
+        current.observe('serialize', type(instance).__name__, clock() - start)
+
+
+# Sinks
+
+class _Series:
+    __slots__ = ('count', 'total_ns', 'min_ns', 'max_ns', 'buckets')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * (len(BUCKETS_NS) + 1)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound (ns) of the bucket holding the q-th observation."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank:
+                return float(BUCKETS_NS[index]) if index < len(BUCKETS_NS) else float(self.max_ns)
+        return float(self.max_ns)
+
+
+class InMemorySink:
+    """
+    Counters and fixed-bucket latency histograms per (operation, label).
+    Exportable as Prometheus text or as EngineMetric lists.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, str], _Series] = {}
+
+    def observe(self, operation: str, label: str, duration_ns: int) -> None:
+        index = bisect.bisect_left(BUCKETS_NS, duration_ns)
+        key = (operation, label)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series()
+                series.min_ns = duration_ns
+            series.count += 1
+            series.total_ns += duration_ns
+            if duration_ns < series.min_ns:
+                series.min_ns = duration_ns
+            if duration_ns > series.max_ns:
+                series.max_ns = duration_ns
+            series.buckets[index] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> dict[tuple[str, str], dict[str, float]]:
+        with self._lock:
+            return {
+                key: {
+                    'count': s.count,
+                    'sum_ms': s.total_ns / 1e6,
+                    'min_ms': s.min_ns / 1e6,
+                    'max_ms': s.max_ns / 1e6,
+                    'p50_ms': s.quantile(0.5) / 1e6,
+                    'p99_ms': s.quantile(0.99) / 1e6,
+                }
+                for key, s in self._series.items()
+            }
+
+    def to_engine_metrics(self, prefix: str = 'cabincrew') -> list[EngineMetric]:
+        """One EngineMetric per statistic, tagged with operation and label."""
+        metrics = []
+        for (operation, label), stats in sorted(self.snapshot().items()):
+            tags = {'operation': operation, 'label': label}
+            for stat, value in stats.items():
+                metrics.append(EngineMetric(name=f"{prefix}.{operation}.{stat}", value=float(value), tags=tags))
+        return metrics
+
+    def to_prometheus(self, name: str = 'cabincrew_operation_duration_seconds') -> str:
+        """Prometheus text exposition format (histogram per operation/label)."""
+        lines = [
+            f"# HELP {name} Latency of CabinCrew protocol hot-path operations.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            items = sorted((key, s.count, s.total_ns, list(s.buckets)) for key, s in self._series.items())
+        for (operation, label), count, total_ns, buckets in items:
+            labels = f'operation="{_escape(operation)}",label="{_escape(label)}"'
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS_NS, buckets):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{{{labels},le="{bound / 1e9:g}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {total_ns / 1e9:.9f}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class CallbackSink:
+    """Forward every observation to `callback(operation, label, seconds)`."""
+
+    def __init__(self, callback: Callable[[str, str, float], None]) -> None:
+        self._callback = callback
+
+    def observe(self, operation: str, label: str, duration_ns: int) -> None:
+        self._callback(operation, label, duration_ns / 1e9)
+
+
+class OpenTelemetrySink:
+    """
+    Record into an OpenTelemetry meter (anything with `create_histogram` and
+    `create_counter`, e.g. `opentelemetry.metrics.get_meter(...)`).
+    OpenTelemetry itself is not a dependency of this package.
+    """
+
+    def __init__(self, meter: Any, prefix: str = 'cabincrew') -> None:
+        self._duration = meter.create_histogram(
+            f"{prefix}.operation.duration", unit='s',
+            description='Latency of CabinCrew protocol hot-path operations',
+        )
+        self._calls = meter.create_counter(
+            f"{prefix}.operation.calls", unit='1',
+            description='Number of CabinCrew protocol hot-path operations',
+        )
+
+    def observe(self, operation: str, label: str, duration_ns: int) -> None:
+        attributes = {'operation': operation, 'label': label}
+        self._duration.record(duration_ns / 1e9, attributes=attributes)
+        self._calls.add(1, attributes=attributes)
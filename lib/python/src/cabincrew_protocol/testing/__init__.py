@@ -0,0 +1,12 @@
+# CabinCrew Protocol - Testing helpers
+# Seeded synthetic data for benchmarks, load tests and fuzzing.
+
+from .factories import ModelFactory, protocol_models
+from .workload import WorkloadConfig, WorkloadGenerator
+
+__all__ = [
+    "ModelFactory",
+    "WorkloadConfig",
+    "WorkloadGenerator",
+    "protocol_models",
+]
@@ -0,0 +1,232 @@
+# CabinCrew Protocol - Synthetic model factories
+#
+# Hand-written helper; not generated from the schema.
+
+from __future__ import annotations
+
+import random
+import typing
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Optional, Union
+
+from pydantic import AwareDatetime, BaseModel
+
+from .. import protocol
+from ..integrity import format_timestamp
+from ..orchestrator.wal import WAL_DATA_MODELS
+from ..protocol import (
+    Decision,
+    DecisionSeverity,
+    Mode,
+    Source,
+    State,
+    Status,
+    WALEntryType,
+)
+
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+_SEVERITY = {
+    Decision.allow: DecisionSeverity.number_0,
+    Decision.warn: DecisionSeverity.number_1,
+    Decision.require_approval: DecisionSeverity.number_2,
+    Decision.deny: DecisionSeverity.number_3,
+}
+
+
+def protocol_models() -> list[type[BaseModel]]:
+    """All object models defined in the generated protocol module, in definition order."""
+    return [
+        obj
+        for obj in vars(protocol).values()
+        if isinstance(obj, type)
+        and issubclass(obj, BaseModel)
+        and obj.__module__ == protocol.__name__
+        and 'root' not in obj.model_fields
+    ]
+
+
+class ModelFactory:
+    """
+    Seeded generator of schema-valid payloads.
+
+    `payload(Model)` walks the model's field annotations and returns a
+    JSON-compatible dict that validates against the model. The same seed always
+    produces the same sequence of payloads.
+    """
+
+    def __init__(self, seed: int = 0, list_size: int = 3, string_size: int = 12) -> None:
+        self.rng = random.Random(seed)
+        self.list_size = list_size
+        self.string_size = string_size
+        self._alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789'
+
+    # Primitive values
+
+    def text(self, size: Optional[int] = None) -> str:
+        size = self.string_size if size is None else size
+        return ''.join(self.rng.choices(self._alphabet, k=size))
+
+    def identifier(self, prefix: str) -> str:
+        return f"{prefix}-{self.rng.getrandbits(48):012x}"
+
+    def sha256(self) -> str:
+        return f"{self.rng.getrandbits(256):064x}"
+
+    def timestamp(self, spread: timedelta = timedelta(days=30)) -> str:
+        offset = self.rng.random() * spread.total_seconds()
+        return format_timestamp(EPOCH + timedelta(seconds=offset))
+
+    def nested(self, depth: int, width: int = 2) -> dict[str, Any]:
+        """Nested dict `depth` levels deep, used for RecordStringAny payloads."""
+        if depth <= 0:
+            return {'value': self.text(), 'score': round(self.rng.random(), 4)}
+        return {f"k{i}": self.nested(depth - 1, width) for i in range(width)}
+
+    # Annotation-driven payloads
+
+    def value(self, annotation: Any, name: str = '') -> Any:
+        origin = typing.get_origin(annotation)
+        if origin is Union:
+            args = [a for a in typing.get_args(annotation) if a is not type(None)]
+            return self.value(self.rng.choice(args), name)
+        if origin is list:
+            (item,) = typing.get_args(annotation) or (Any,)
+            return [self.value(item, name) for _ in range(self.list_size)]
+        if origin is dict:
+            return {self.text(6): self.text() for _ in range(self.list_size)}
+        if annotation is AwareDatetime or annotation is datetime:
+            return self.timestamp()
+        if isinstance(annotation, type):
+            if issubclass(annotation, Enum):
+                return self.rng.choice(list(annotation)).value
+            if annotation is protocol.RecordStringAny:
+                return self.nested(1)
+            if issubclass(annotation, BaseModel):
+                return self.payload(annotation)
+            if annotation is bool:
+                return self.rng.random() < 0.5
+            if annotation is int:
+                return self.rng.randrange(0, 1_000_000)
+            if annotation is float:
+                return round(self.rng.random() * 1000, 3)
+            if annotation is str:
+                if name == 'hash' or name.endswith('_hash') or name == 'checksum':
+                    return self.sha256()
+                return self.text()
+        return self.text()
+
+    def payload(self, model: type[BaseModel]) -> dict[str, Any]:
+        return {name: self.value(field.annotation, name) for name, field in model.model_fields.items()}
+
+    def build(self, model: type[BaseModel]) -> BaseModel:
+        return model.model_validate(self.payload(model))
+
+    # Realistic large payloads
+
+    def engine_artifact(self) -> dict[str, Any]:
+        name = f"src/{self.text(8)}/{self.text(10)}.py"
+        return {
+            'name': name,
+            'role': self.rng.choice(['plan', 'evidence', 'state', 'log']),
+            'path': f"artifacts/{name}",
+            'hash': self.sha256(),
+            'size': float(self.rng.randrange(64, 1 << 20)),
+        }
+
+    def engine_output(self, artifacts: int = 1000, metrics: int = 50) -> dict[str, Any]:
+        return {
+            'protocol_version': '1.0.0',
+            'engine_id': self.identifier('engine'),
+            'mode': self.rng.choice(list(Mode)).value,
+            'receipt_id': self.identifier('receipt'),
+            'status': Status.success.value,
+            'warnings': [self.text(40) for _ in range(3)],
+            'artifacts': [self.engine_artifact() for _ in range(artifacts)],
+            'metrics': [
+                {'name': f"engine.{self.text(6)}", 'value': self.rng.random() * 100, 'tags': {'step': self.text(4)}}
+                for _ in range(metrics)
+            ],
+            'plan_token': self.sha256(),
+        }
+
+    def policy_evaluation(self, evidence_depth: int = 3) -> dict[str, Any]:
+        decision = self.rng.choice(list(Decision))
+        return {
+            'source': self.rng.choice(list(Source)).value,
+            'policy_id': self.identifier('policy'),
+            'decision': decision.value,
+            'severity': _SEVERITY[decision].value,
+            'reason': self.text(40),
+            'evidence': self.nested(evidence_depth),
+            'evaluated_at': self.timestamp(),
+        }
+
+    def audit_event(self, evaluations: int = 50, evidence_depth: int = 4, artifacts: int = 20) -> dict[str, Any]:
+        payload = self.payload(protocol.AuditEvent)
+        payload['policy'] = {
+            'decision': self.rng.choice(list(Decision)).value,
+            'policy_evaluations': [self.policy_evaluation(evidence_depth) for _ in range(evaluations)],
+            'aggregation_method': 'most_restrictive',
+            'workflow_state': State.PREFLIGHT_COMPLETE.value,
+            'violations': [self.text(30) for _ in range(3)],
+        }
+        payload['artifacts'] = [self.engine_artifact() for _ in range(artifacts)]
+        return payload
+
+    def workflow_state_record(self, steps: int = 1000) -> dict[str, Any]:
+        step_ids = [f"step-{i:06d}" for i in range(steps)]
+        completed = step_ids[: steps * 3 // 4]
+        return {
+            'workflow_id': self.identifier('wf'),
+            'current_state': State.TAKEOFF_RUNNING.value,
+            'plan_token_hash': self.sha256(),
+            'created_at': format_timestamp(EPOCH),
+            'updated_at': self.timestamp(),
+            'steps_completed': completed,
+            'steps_pending': step_ids[len(completed):],
+            'approvals': [self._approval_record(s) for s in completed[::20]],
+            'artifacts': [self._artifact_record(s) for s in completed],
+            'policy_evaluations': [self._evaluation_record(s) for s in completed],
+        }
+
+    def _approval_record(self, step_id: str) -> dict[str, Any]:
+        return {
+            'approval_id': self.identifier('approval'),
+            'step_id': step_id,
+            'plan_token_hash': self.sha256(),
+            'approved': self.rng.random() < 0.9,
+            'approver': self.identifier('user'),
+            'approved_at': self.timestamp(),
+        }
+
+    def _artifact_record(self, step_id: str) -> dict[str, Any]:
+        return {
+            'artifact_id': self.identifier('artifact'),
+            'step_id': step_id,
+            'artifact_hash': self.sha256(),
+            'artifact_type': self.rng.choice(['file', 'diff', 'patch', 'message']),
+            'created_at': self.timestamp(),
+        }
+
+    def _evaluation_record(self, step_id: str) -> dict[str, Any]:
+        return {
+            'evaluation_id': self.identifier('eval'),
+            'step_id': step_id,
+            'policy_name': self.rng.choice(['opa.default', 'onnx.risk', 'llm.rules']),
+            'decision': self.rng.choice(list(Decision)).value,
+            'evaluated_at': self.timestamp(),
+        }
+
+    def wal_entry(self, sequence: int, workflow_id: str, entry_type: WALEntryType) -> dict[str, Any]:
+        data_model = WAL_DATA_MODELS[entry_type]
+        return {
+            'sequence': sequence,
+            'timestamp': self.timestamp(),
+            'workflow_id': workflow_id,
+            'entry_type': entry_type.value,
+            'data': self.payload(data_model),
+            'checksum': self.sha256(),
+        }
+
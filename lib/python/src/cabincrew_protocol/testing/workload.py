@@ -0,0 +1,366 @@
+# CabinCrew Protocol - Synthetic workload generator
+#
+# Hand-written helper; not generated from the schema.
+#
+# Produces seeded, deterministic streams of schema-valid gateway, engine, audit
+# and WAL records for load tests and benchmarks. Records are built as JSON-mode
+# dicts (cheap enough for millions of records per minute); pass `models=True`
+# to get validated model instances instead.
+#
+#   python -m cabincrew_protocol.testing.workload --kind llm_request --count 1000000 --output llm.ndjson
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from ..integrity import format_timestamp
+from ..orchestrator.wal import wal_checksum
+from ..protocol import (
+    AuditEvent,
+    Decision,
+    EngineOutput,
+    LLMGatewayRequest,
+    MCPGatewayRequest,
+    Severity,
+    State,
+    WALEntry,
+)
+
+_WORDS = (
+    'the a of to and in is for on with that this as be by plan step deploy config '
+    'service user request policy token model file change update review approve data '
+    'error retry cluster region database secret workspace branch commit test build'
+).split()
+
+_MCP_METHODS = ['tools/call', 'tools/list', 'resources/read', 'resources/list', 'prompts/get']
+_EVENT_TYPES = [
+    'engine.started', 'engine.completed', 'preflight.evaluated', 'gateway.llm.request',
+    'gateway.mcp.request', 'approval.requested', 'approval.received', 'plan_token.created',
+]
+
+
+class WorkloadConfig(BaseModel):
+    """
+    Tuning knobs for WorkloadGenerator.
+    Rates are probabilities per decision; sizes are means of skewed distributions.
+    """
+
+    model_config = ConfigDict(
+        extra='forbid',
+    )
+    deny_rate: float = Field(0.03, ge=0, le=1)
+    approval_rate: float = Field(0.05, ge=0, le=1)
+    warn_rate: float = Field(0.10, ge=0, le=1)
+    failure_rate: float = Field(0.02, ge=0, le=1)
+    """Probability that an engine run fails / a workflow ends in workflow_failed."""
+    artifacts_per_step: float = Field(4.0, ge=0)
+    steps_per_workflow: float = Field(6.0, ge=1)
+    payload_bytes: int = Field(2048, ge=0)
+    """Median size of LLM prompts and MCP arguments; sizes are log-normal around it."""
+    payload_sigma: float = Field(1.0, ge=0)
+    concurrent_workflows: int = Field(32, ge=1)
+    sources: int = Field(50, ge=1)
+    models: list[str] = ['gpt-4o', 'claude-3-5-sonnet', 'llama-3-70b', 'mistral-large']
+    mcp_servers: int = Field(12, ge=1)
+    start: datetime = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    mean_interval_ms: float = Field(5.0, gt=0)
+
+
+class WorkloadGenerator:
+    """
+    Deterministic record streams built on the protocol models.
+
+    Every stream method returns an iterator; pass `count=None` for an endless
+    stream. The same seed and config always produce the same records.
+    """
+
+    KINDS = ('llm_request', 'mcp_request', 'engine_output', 'audit_event', 'wal_entry')
+
+    def __init__(self, config: Optional[WorkloadConfig] = None, seed: int = 0) -> None:
+        self.config = config or WorkloadConfig()
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self._clock = self.config.start
+        self._counter = 0
+        corpus_rng = random.Random(seed ^ 0x5EED)
+        self._corpus = ' '.join(corpus_rng.choices(_WORDS, k=200_000))
+
+    # Distributions
+
+    def _tick(self) -> str:
+        self._clock += timedelta(milliseconds=self.rng.expovariate(1.0 / self.config.mean_interval_ms))
+        return format_timestamp(self._clock)
+
+    def _id(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}-{self.seed:x}-{self._counter:010d}"
+
+    def _hash(self) -> str:
+        return f"{self.rng.getrandbits(256):064x}"
+
+    def _size(self) -> int:
+        if self.config.payload_bytes == 0:
+            return 0
+        return min(int(self.rng.lognormvariate(0, self.config.payload_sigma) * self.config.payload_bytes), len(self._corpus))
+
+    def _text(self, size: int) -> str:
+        start = self.rng.randrange(0, len(self._corpus) - size + 1)
+        return self._corpus[start:start + size]
+
+    def _count(self, mean: float) -> int:
+        """Skewed non-negative count with the given mean (geometric distribution)."""
+        if mean <= 0:
+            return 0
+        p = 1.0 / (mean + 1.0)
+        count = 0
+        while self.rng.random() > p:
+            count += 1
+        return count
+
+    def decision(self) -> Decision:
+        r = self.rng.random()
+        config = self.config
+        if r < config.deny_rate:
+            return Decision.deny
+        r -= config.deny_rate
+        if r < config.approval_rate:
+            return Decision.require_approval
+        r -= config.approval_rate
+        if r < config.warn_rate:
+            return Decision.warn
+        return Decision.allow
+
+    def _source(self) -> str:
+        return f"agent-{self.rng.randrange(self.config.sources):03d}"
+
+    def _context(self) -> dict[str, Any]:
+        return {
+            'workflow_id': f"wf-{self.rng.randrange(self.config.concurrent_workflows * 8):05d}",
+            'step_id': f"step-{self.rng.randrange(32):02d}",
+        }
+
+    # Record builders (JSON-mode dicts)
+
+    def llm_request(self) -> dict[str, Any]:
+        model = self.rng.choice(self.config.models)
+        return {
+            'request_id': self._id('llm'),
+            'timestamp': self._tick(),
+            'source': self._source(),
+            'model': model,
+            'provider': model.split('-')[0],
+            'input': {
+                'messages': [
+                    {'role': 'system', 'content': self._text(min(256, self._size()))},
+                    {'role': 'user', 'content': self._text(self._size())},
+                ],
+                'max_tokens': self.rng.choice([256, 512, 1024, 4096]),
+            },
+            'context': self._context(),
+        }
+
+    def mcp_request(self) -> dict[str, Any]:
+        return {
+            'request_id': self._id('mcp'),
+            'timestamp': self._tick(),
+            'source': self._source(),
+            'server_id': f"mcp-{self.rng.randrange(self.config.mcp_servers):02d}",
+            'method': self.rng.choice(_MCP_METHODS),
+            'params': {
+                'name': self.rng.choice(_WORDS),
+                'arguments': {'query': self._text(self._size())},
+            },
+            'context': self._context(),
+        }
+
+    def engine_output(self) -> dict[str, Any]:
+        failed = self.rng.random() < self.config.failure_rate
+        record: dict[str, Any] = {
+            'protocol_version': '1.0.0',
+            'engine_id': f"engine-{self.rng.randrange(8)}",
+            'mode': 'flight-plan' if self.rng.random() < 0.5 else 'take-off',
+            'receipt_id': self._id('receipt'),
+            'status': 'failure' if failed else 'success',
+            'artifacts': [
+                {
+                    'name': f"{self.rng.choice(_WORDS)}/{self.rng.choice(_WORDS)}-{i}.json",
+                    'role': self.rng.choice(('plan', 'evidence', 'state', 'log')),
+                    'path': f"artifacts/{i}/artifact.json",
+                    'hash': self._hash(),
+                    'size': float(self._size()),
+                }
+                for i in range(self._count(self.config.artifacts_per_step))
+            ],
+            'metrics': [
+                {'name': 'engine.duration_ms', 'value': round(self.rng.lognormvariate(6, 1), 3), 'tags': {'phase': 'run'}},
+            ],
+            'plan_token': self._hash(),
+        }
+        if failed:
+            record['error'] = self._text(120)
+        return record
+
+    def audit_event(self) -> dict[str, Any]:
+        decision = self.decision()
+        severity = {
+            Decision.allow: Severity.info,
+            Decision.warn: Severity.warning,
+            Decision.require_approval: Severity.warning,
+            Decision.deny: Severity.error,
+        }[decision]
+        event_type = self.rng.choice(_EVENT_TYPES)
+        timestamp = self._tick()
+        context = self._context()
+        record: dict[str, Any] = {
+            'event_id': self._id('evt'),
+            'timestamp': timestamp,
+            'event_type': event_type,
+            'workflow': {**context, 'mode': 'flight-plan'},
+            'workflow_state': self.rng.choice(list(State)).value,
+            'policy': {
+                'decision': decision.value,
+                'policy_evaluations': [
+                    {
+                        'source': 'opa',
+                        'policy_id': f"policy-{self.rng.randrange(40):02d}",
+                        'decision': decision.value,
+                        'severity': {'allow': 0, 'warn': 1, 'require_approval': 2, 'deny': 3}[decision.value],
+                        'evaluated_at': timestamp,
+                    }
+                    for _ in range(1 + self._count(1.5))
+                ],
+                'aggregation_method': 'most_restrictive',
+                'workflow_state': State.PREFLIGHT_COMPLETE.value,
+            },
+            'message': self._text(min(200, self._size())),
+            'severity': severity.value,
+        }
+        if event_type.startswith('gateway.'):
+            record['gateway'] = {
+                'gateway_type': event_type.split('.')[1],
+                'request_id': self._id('gw'),
+                'model': self.rng.choice(self.config.models),
+                'policy_decision': decision.value,
+            }
+        return record
+
+    def wal_entries(self, count: Optional[int] = None) -> Iterator[dict[str, Any]]:
+        """
+        Interleaved WAL entries for `concurrent_workflows` simulated workflows,
+        with a global monotonic sequence and valid checksums.
+        """
+        active = [self._workflow() for _ in range(self.config.concurrent_workflows)]
+        sequence = 0
+        while count is None or sequence < count:
+            slot = self.rng.randrange(len(active))
+            try:
+                workflow_id, entry_type, data = next(active[slot])
+            except StopIteration:
+                active[slot] = self._workflow()
+                continue
+            entry = {
+                'sequence': sequence,
+                'timestamp': self._tick(),
+                'workflow_id': workflow_id,
+                'entry_type': entry_type,
+                'data': data,
+            }
+            entry['checksum'] = wal_checksum(entry)
+            sequence += 1
+            yield entry
+
+    def _workflow(self) -> Iterator[tuple[str, str, dict[str, Any]]]:
+        workflow_id = self._id('wf')
+        yield workflow_id, 'workflow_started', {'plan_token_hash': self._hash(), 'initial_state': 'INIT'}
+        artifacts: list[str] = []
+        for step in range(1 + self._count(self.config.steps_per_workflow - 1)):
+            step_id = f"step-{step:03d}"
+            yield workflow_id, 'step_started', {'step_id': step_id, 'step_type': self.rng.choice(('flight-plan', 'take-off'))}
+            decision = self.decision()
+            yield workflow_id, 'policy_evaluated', {
+                'evaluation_id': self._id('eval'), 'policy_name': 'preflight', 'decision': decision.value,
+            }
+            if decision is Decision.deny or self.rng.random() < self.config.failure_rate:
+                yield workflow_id, 'workflow_failed', {'error': f"{decision.value} at {step_id}", 'failed_step': step_id}
+                return
+            if decision is Decision.require_approval:
+                approval_id = self._id('approval')
+                yield workflow_id, 'approval_requested', {'approval_id': approval_id, 'step_id': step_id, 'required_role': 'reviewer'}
+                approved = self.rng.random() < 0.9
+                yield workflow_id, 'approval_received', {'approval_id': approval_id, 'approved': approved, 'approver': self._source()}
+                if not approved:
+                    yield workflow_id, 'workflow_failed', {'error': 'approval rejected', 'failed_step': step_id}
+                    return
+            step_artifacts = []
+            for _ in range(self._count(self.config.artifacts_per_step)):
+                artifact_id = self._id('artifact')
+                step_artifacts.append(artifact_id)
+                yield workflow_id, 'artifact_created', {
+                    'artifact_id': artifact_id, 'artifact_hash': self._hash(), 'artifact_type': 'file',
+                }
+            artifacts.extend(step_artifacts)
+            yield workflow_id, 'step_completed', {'step_id': step_id, 'artifacts': step_artifacts}
+        yield workflow_id, 'workflow_completed', {'final_state': 'COMPLETED', 'artifacts': artifacts}
+
+    # Streams
+
+    _MODELS: dict[str, type[BaseModel]] = {
+        'llm_request': LLMGatewayRequest,
+        'mcp_request': MCPGatewayRequest,
+        'engine_output': EngineOutput,
+        'audit_event': AuditEvent,
+        'wal_entry': WALEntry,
+    }
+
+    def stream(self, kind: str, count: Optional[int] = None, models: bool = False) -> Iterator[Any]:
+        """Records of one kind (see KINDS); validated model instances if `models`."""
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown record kind {kind!r}; expected one of {self.KINDS}")
+        if kind == 'wal_entry':
+            records = self.wal_entries(count)
+        else:
+            build = getattr(self, kind)
+            records = (build() for _ in iter(int, 1)) if count is None else (build() for _ in range(count))
+        if not models:
+            return records
+        model = self._MODELS[kind]
+        return (model.model_validate(record) for record in records)
+
+    def write_ndjson(self, destination: Union[str, Path], kind: str, count: int) -> int:
+        """Write `count` records of `kind` as NDJSON. Returns the number written."""
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        written = 0
+        with open(destination, 'w', encoding='utf-8', buffering=1 << 20) as fh:
+            for record in self.stream(kind, count):
+                fh.write(dumps(record))
+                fh.write('\n')
+                written += 1
+        return written
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Generate synthetic CabinCrew protocol traffic as NDJSON.')
+    parser.add_argument('--kind', choices=WorkloadGenerator.KINDS, required=True)
+    parser.add_argument('--count', type=int, required=True)
+    parser.add_argument('--output', type=Path, required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--config', type=Path, help='JSON file with WorkloadConfig overrides')
+    args = parser.parse_args(argv)
+
+    config = WorkloadConfig.model_validate_json(args.config.read_text()) if args.config else WorkloadConfig()
+    written = WorkloadGenerator(config, seed=args.seed).write_ndjson(args.output, args.kind, args.count)
+    print(f"Wrote {written} {args.kind} records to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
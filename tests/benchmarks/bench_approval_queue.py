@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+ApprovalQueue with 100k pending approvals.
+
+Measures submit, indexed lookup (vs. a linear scan of all pending requests,
+which is what polling storage amounts to), respond with asyncio waiters,
+timer-wheel ticks with nothing due, and bulk expiry.
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.orchestrator import ApprovalQueue
+from cabincrew_protocol.protocol import ApprovalRequest, ApprovalResponse
+
+PENDING = 100_000
+ROLES = [f"role-{i}" for i in range(50)]
+WAITERS = 10_000
+
+
+def report(label, seconds, count):
+    print(f"{label:<36} {seconds * 1e3:>9.1f} ms  {seconds / count * 1e6:>8.2f} us/op")
+
+
+def main():
+    now = [0.0]
+    queue = ApprovalQueue(timeout=3600, clock=lambda: now[0])
+    requests = [
+        ApprovalRequest(
+            approval_id=f"a{i}", workflow_id=f"wf-{i // 10}", step_id=f"s{i}", reason="risky",
+            required_role=ROLES[i % len(ROLES)], plan_token_hash="0" * 64,
+        )
+        for i in range(PENDING)
+    ]
+
+    start = time.perf_counter()
+    for i, request in enumerate(requests):
+        queue.submit(request, timeout=60 + i % 3600)
+    report(f"submit x{PENDING}", time.perf_counter() - start, PENDING)
+
+    start = time.perf_counter()
+    for role in ROLES:
+        queue.pending(role=role)
+    report("pending(role=...) indexed", time.perf_counter() - start, len(ROLES))
+    start = time.perf_counter()
+    for role in ROLES:
+        [r for r in queue.pending() if r.required_role == role]
+    report("pending role via linear scan", time.perf_counter() - start, len(ROLES))
+
+    start = time.perf_counter()
+    for i in range(0, PENDING, 100):
+        queue.pending(workflow_id=f"wf-{i // 10}")
+    report("pending(workflow_id=...)", time.perf_counter() - start, PENDING // 100)
+
+    async def respond_with_waiters():
+        ids = [f"a{i}" for i in range(WAITERS)]
+        waiters = [asyncio.ensure_future(queue.wait(i)) for i in ids]
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        for approval_id in ids:
+            queue.respond(ApprovalResponse(approval_id=approval_id, approved=True, approver="bench"))
+        await asyncio.gather(*waiters)
+        return time.perf_counter() - start
+
+    report(f"respond + wake x{WAITERS}", asyncio.run(respond_with_waiters()), WAITERS)
+
+    ticks = 1_000
+    start = time.perf_counter()
+    for _ in range(ticks):
+        now[0] += 0.001
+        queue.expire()
+    report("expire() tick, nothing due", time.perf_counter() - start, ticks)
+
+    remaining = len(queue)
+    now[0] += 7200
+    start = time.perf_counter()
+    expired = queue.expire()
+    report(f"expire all x{len(expired)}", time.perf_counter() - start, max(remaining, 1))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
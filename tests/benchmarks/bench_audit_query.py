@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Audit query filtering over NDJSON AuditEvent logs.
+
+Compares three ways of answering the same query over the same lines:
+  validate   AuditEvent.model_validate_json per line, then filter
+  parse      json.loads per line, then the compiled predicate
+  prefilter  Query.filter_lines (raw-byte needles, parse only candidates)
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.audit import Query
+from cabincrew_protocol.protocol import AuditEvent
+from cabincrew_protocol.testing import WorkloadGenerator
+
+QUERIES = [
+    "severity>=error",
+    "gateway.policy_decision=deny",
+    "workflow.workflow_id={workflow_id}",
+    "event_type=approval.requested or event_type=approval.received",
+]
+
+
+def run(label, lines, filter_fn):
+    start = time.perf_counter()
+    matched = sum(1 for _ in filter_fn(lines))
+    seconds = time.perf_counter() - start
+    megabytes = sum(len(line) for line in lines) / 1e6
+    print(f"  {label:<10} {seconds * 1e3:>9.1f} ms  {len(lines) / seconds:>11,.0f} lines/s  "
+          f"{megabytes / seconds:>7.1f} MB/s  {matched:>6} matches")
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=50_000)
+    args = parser.parse_args()
+
+    generator = WorkloadGenerator(seed=7)
+    lines = [json.dumps(event).encode() + b"\n" for event in generator.stream("audit_event", args.events)]
+    workflow_id = json.loads(lines[0])["workflow"]["workflow_id"]
+    print(f"{len(lines)} events, {sum(map(len, lines)) / 1e6:.1f} MB")
+
+    for text in QUERIES:
+        text = text.format(workflow_id=workflow_id)
+        query = Query(text)
+        print(f"\n{text}")
+
+        def validate(lines):
+            for line in lines:
+                event = AuditEvent.model_validate_json(line)
+                if query.matches(event):
+                    yield event
+
+        def parse(lines):
+            for line in lines:
+                event = json.loads(line)
+                if query.predicate(event):
+                    yield event
+
+        expected = run("validate", lines, validate)
+        assert run("parse", lines, parse) == expected
+        assert run("prefilter", lines, query.filter_lines) == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+ModelRouter against a simulated backend: three models whose latency and error
+rate change halfway through the run (the primary degrades). Reports, per
+strategy, the mean latency and error rate callers saw, each model's share of
+traffic, and the cost of one route() + observe() pair.
+
+The simulation runs on a virtual clock, so nothing actually sleeps.
+"""
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.gateway import ModelRouter
+
+# model -> ((mean latency s, error rate) before, (...) after the change)
+BACKENDS = {
+    "primary": ((0.40, 0.01), (1.60, 0.30)),
+    "secondary": ((0.60, 0.02), (0.60, 0.02)),
+    "local": ((0.90, 0.00), (0.90, 0.00)),
+}
+ROUTES = {
+    "fallback": {"strategy": "fallback", "targets": ["primary", "secondary", "local"]},
+    "weighted": {"strategy": "weighted", "targets": {"primary": 3, "secondary": 2, "local": 1}},
+    "least_latency": {"strategy": "least_latency", "targets": ["primary", "secondary", "local"]},
+}
+
+
+def simulate(strategy, requests, seed):
+    rng = random.Random(seed)
+    clock = [0.0]
+    router = ModelRouter({"routes": {"chat": ROUTES[strategy]}, "cooldown": 5}, clock=lambda: clock[0])
+    latencies, errors, share = 0.0, 0, Counter()
+    overhead = 0.0
+    for i in range(requests):
+        clock[0] += 0.01
+        start = time.perf_counter()
+        model = router.route_model("chat", f"req-{i}")
+        overhead += time.perf_counter() - start
+        mean, error_rate = BACKENDS[model][i >= requests // 2]
+        latency = rng.expovariate(1 / mean)
+        ok = rng.random() >= error_rate
+        start = time.perf_counter()
+        router.observe(model, latency, ok)
+        overhead += time.perf_counter() - start
+        latencies += latency
+        errors += not ok
+        share[model] += 1
+    return latencies / requests, errors / requests, share, overhead / requests, router.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests; 'primary' degrades to {BACKENDS['primary'][1]} halfway")
+    for strategy in ROUTES:
+        mean, error_rate, share, overhead, stats = simulate(strategy, args.requests, args.seed)
+        split = "  ".join(f"{m} {share[m] / args.requests:>5.1%}" for m in BACKENDS)
+        print(f"{strategy:<14} mean {mean * 1e3:>6.0f} ms  errors {error_rate:>5.1%}  "
+              f"route+observe {overhead * 1e6:>5.2f} us  [{split}]")
+    print("final stats:", {m: round(s.latency_ewma_ms) for m, s in stats.items()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+LLMGatewayRequest with a large `input`: inline vs. offloaded to a BlobStore.
+
+Measures the per-hop costs the gateway pays for every request (validate from
+JSON, dump to JSON, decision cache key) and the serialized size, which is what
+audit and request logs store.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.gateway import BlobStore, decision_cache_key, offload_payloads
+from cabincrew_protocol.protocol import LLMGatewayRequest
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--kib", type=int, nargs="+", default=[64, 1024, 4096])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = BlobStore(tmp)
+        print(f"{'input':>8} {'form':<10} {'json bytes':>12} {'validate':>10} {'dump':>10} {'cache key':>10}")
+        for kib in args.kib:
+            chunk = "lorem ipsum dolor sit amet " * 37
+            messages = [{"role": "user", "content": chunk} for _ in range(kib)]
+            request = LLMGatewayRequest(
+                request_id="r1", timestamp=datetime.now(timezone.utc), model="gpt-4o",
+                input={"messages": messages, "temperature": 0.2},
+            )
+            offloaded = offload_payloads(request, store)
+            offload = timed(lambda: offload_payloads(request, store), max(1, args.repeat // 4))
+            for label, message in (("inline", request), ("offloaded", offloaded)):
+                text = message.model_dump_json()
+                validate = timed(lambda: LLMGatewayRequest.model_validate_json(text), args.repeat)
+                dump = timed(message.model_dump_json, args.repeat)
+                key = timed(lambda: decision_cache_key(message), args.repeat)
+                print(f"{kib:>6}Ki {label:<10} {len(text):>12,} {validate * 1e3:>8.2f}ms {dump * 1e3:>8.2f}ms "
+                      f"{key * 1e3:>8.2f}ms")
+            print(f"{'':>8} one-time offload (serialize + store): {offload * 1e3:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Plan vs. take-off artifact diff: indexed diff_artifacts() against the nested
+loop it replaces (every take-off artifact searched for in the plan list).
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.integrity import diff_artifacts, sha256_hex
+from cabincrew_protocol.protocol import EngineArtifact, PlanArtifactHash
+
+
+def nested_loop_diff(planned, actual):
+    differences = []
+    for artifact in actual:
+        match = None
+        for candidate in planned:
+            if candidate.name == artifact.name:
+                match = candidate
+                break
+        if match is None:
+            differences.append(("added", artifact.name))
+        elif match.hash != artifact.hash:
+            differences.append(("modified", artifact.name))
+    for candidate in planned:
+        if not any(a.name == candidate.name for a in actual):
+            differences.append(("removed", candidate.name))
+    return differences
+
+
+def workload(count):
+    planned = [PlanArtifactHash(name=f"src/module_{i}.py", hash=sha256_hex(str(i))) for i in range(count)]
+    actual = []
+    for i, artifact in enumerate(planned):
+        if i % 100 == 1:
+            continue  # removed
+        name, digest = artifact.name, artifact.hash
+        if i % 100 == 2:
+            digest = sha256_hex(f"changed {i}")
+        elif i % 100 == 3:
+            name = f"src/renamed_{i}.py"
+        actual.append(EngineArtifact(name=name, role="source", path=name, hash=digest))
+    actual.extend(
+        EngineArtifact(name=f"src/new_{i}.py", role="source", path=f"src/new_{i}.py", hash=sha256_hex(f"new {i}"))
+        for i in range(count // 100)
+    )
+    return planned, actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 5_000, 20_000, 100_000])
+    parser.add_argument("--nested-limit", type=int, default=5_000, help="largest size to run the nested loop on")
+    args = parser.parse_args()
+
+    print(f"{'artifacts':>10} {'indexed':>12} {'nested loop':>14} {'differences':>12}")
+    for count in args.sizes:
+        planned, actual = workload(count)
+        start = time.perf_counter()
+        found = sum(len(chunk) for chunk in diff_artifacts(planned, actual))
+        indexed = time.perf_counter() - start
+        nested = "skipped"
+        if count <= args.nested_limit:
+            start = time.perf_counter()
+            nested_loop_diff(planned, actual)
+            nested = f"{(time.perf_counter() - start) * 1e3:.1f} ms"
+        print(f"{count:>10,} {indexed * 1e3:>9.1f} ms {nested:>14} {found:>12,}")
+
+
+if __name__ == "__main__":
+    main()
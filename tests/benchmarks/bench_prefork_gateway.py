@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+PreforkGateway throughput from 1 to N worker processes.
+
+Each worker validates LLMGatewayRequest JSON, evaluates gateway rules and
+calls a local stub backend that burns a fixed amount of CPU per request
+(standing in for tokenization / ONNX scoring). Requests are unique, so the
+shared decision cache is off for the scaling runs; a final run repeats one
+request set with the cache on. Scaling is only visible on a multi-core host.
+
+    python3 tests/benchmarks/bench_prefork_gateway.py --requests 20000 --max-workers 8
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.gateway import PreforkGateway, RuleGatewayHandler
+from cabincrew_protocol.protocol import LLMGatewayPolicyConfig, LLMGatewayRequest, LLMGatewayRule
+
+STUB_BACKEND_ROUNDS = 200
+
+
+class StubBackendHandler(RuleGatewayHandler):
+    """Rule evaluation plus a CPU-bound stub backend call."""
+
+    def __call__(self, request):
+        digest = request.request_id.encode()
+        for _ in range(STUB_BACKEND_ROUNDS):
+            digest = hashlib.sha256(digest).digest()
+        return super().__call__(request)
+
+
+def make_requests(count, tag):
+    now = datetime.now(timezone.utc)
+    return [
+        LLMGatewayRequest(
+            request_id=f"{tag}-{i}",
+            timestamp=now,
+            source=f"agent-{i % 16}",
+            model=("gpt-4", "claude-3", "local")[i % 3],
+            input={"prompt": f"request {i} from {tag}", "max_tokens": 256},
+        )
+        for i in range(count)
+    ]
+
+
+def config():
+    return LLMGatewayPolicyConfig(rules=[
+        LLMGatewayRule(match={"model": "local"}, action="warn", metadata={"reason": "unvetted model"}),
+        LLMGatewayRule(match={"source": ["agent-13", "agent-14"]}, action="deny", metadata={"reason": "revoked"}),
+    ])
+
+
+def run(workers, requests, cache_slots, passes=1):
+    with PreforkGateway(StubBackendHandler, config(), workers=workers, cache_slots=cache_slots) as gateway:
+        gateway.handle_many(requests[:workers * 10], raw=True)  # warm up every worker
+        start = time.perf_counter()
+        for _ in range(passes):
+            gateway.handle_many(requests, raw=True)
+        elapsed = time.perf_counter() - start
+    return len(requests) * passes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    requests = make_requests(args.requests, "bench")
+    print(f"cores: {os.cpu_count()}  requests: {args.requests}")
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8}")
+    counts = sorted({1 << i for i in range(args.max_workers.bit_length()) if 1 << i <= args.max_workers} | {args.max_workers})
+    base = None
+    for workers in counts:
+        rate = run(workers, requests, cache_slots=0)
+        base = base or rate
+        print(f"{workers:>7} {rate:>10.0f} {rate / base:>7.2f}x")
+
+    cached = run(args.max_workers, requests, cache_slots=1 << 16, passes=3)
+    print(f"{args.max_workers:>7} {cached:>10.0f} {cached / base:>7.2f}x  (shared decision cache, 3 passes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
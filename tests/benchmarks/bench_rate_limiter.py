@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+RateLimiter checks per second for LLM (source, source/model) and MCP
+(source/server_id/method) key hierarchies over many distinct keys, plus the
+cost of the limited path that builds a PolicyEvaluation and how many buckets
+remain after an idle sweep.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.gateway import RateLimit, RateLimiter, RateLimitLevel
+from cabincrew_protocol.protocol import LLMGatewayRequest, MCPGatewayRequest
+
+UNLIMITED = RateLimit(rate=1e12, burst=1e12)
+
+
+def run(label, limiter, requests, checks):
+    check = limiter.check
+    count = len(requests)
+    start = time.perf_counter()
+    for i in range(checks):
+        check(requests[i % count])
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {checks / elapsed / 1e6:>6.2f} M checks/s  {elapsed / checks * 1e9:>6.0f} ns/check  "
+          f"({limiter.limited} limited)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--checks", type=int, default=1_000_000)
+    parser.add_argument("--keys", type=int, default=10_000, help="distinct source/model combinations")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    now = datetime.now(timezone.utc)
+    llm = [
+        LLMGatewayRequest(request_id=str(i), timestamp=now, source=f"agent-{rng.randrange(args.keys // 10)}",
+                          model=f"model-{rng.randrange(10)}", input={})
+        for i in range(args.keys)
+    ]
+    mcp = [
+        MCPGatewayRequest(request_id=str(i), timestamp=now, source=f"agent-{rng.randrange(100)}",
+                          server_id=f"server-{rng.randrange(20)}", method=f"tools/call-{rng.randrange(5)}")
+        for i in range(args.keys)
+    ]
+
+    run("llm source", RateLimiter([RateLimitLevel(key=["source"], limit=UNLIMITED)]), llm, args.checks)
+    run("llm source > source/model", RateLimiter([
+        RateLimitLevel(key=["source"], limit=UNLIMITED),
+        RateLimitLevel(key=["source", "model"], limit=UNLIMITED),
+    ]), llm, args.checks)
+    run("mcp source > server > method", RateLimiter([
+        RateLimitLevel(key=["source"], limit=UNLIMITED),
+        RateLimitLevel(key=["source", "server_id"], limit=UNLIMITED),
+        RateLimitLevel(key=["source", "server_id", "method"], limit=UNLIMITED),
+    ]), mcp, args.checks)
+
+    limited = RateLimiter([RateLimitLevel(key=["source"], limit=RateLimit(rate=1, burst=1))])
+    run("llm source, mostly denied", limited, llm, args.checks // 10)
+
+    clock = [0.0]
+    idle = RateLimiter([RateLimitLevel(key=["source", "model"], limit=RateLimit(rate=10, burst=10))],
+                       clock=lambda: clock[0])
+    for request in llm:
+        idle.check(request)
+    before = len(idle)
+    clock[0] = 5.0
+    idle.sweep()
+    print(f"idle sweep: {before} buckets -> {len(idle)}")
+
+
+if __name__ == "__main__":
+    main()
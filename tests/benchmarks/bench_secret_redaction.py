@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+SecretRedactor throughput on a large diagnostics string for growing numbers of
+secrets, against a str.replace loop over every secret, plus NDJSON filtering
+where a small share of lines carry a secret. Install the [redact] extra
+(pyahocorasick) to compare the automaton with the regular-expression fallback.
+"""
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.audit import SecretRedactor
+from cabincrew_protocol.audit import redact as redact_module
+
+
+def make_secrets(rng, count):
+    alphabet = string.ascii_letters + string.digits
+    return {f"secret_{i}": "".join(rng.choices(alphabet, k=rng.randint(16, 40))) for i in range(count)}
+
+
+def make_text(rng, size, leaks):
+    words = []
+    length = 0
+    while length < size:
+        word = "".join(rng.choices(string.ascii_lowercase + string.digits + "_:/=.", k=rng.randint(2, 12)))
+        words.append(word)
+        length += len(word) + 1
+    for leak in leaks:
+        words.insert(rng.randrange(len(words)), leak)
+    return " ".join(words)
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=4 << 20, help="diagnostics size in characters")
+    parser.add_argument("--secrets", type=int, nargs="+", default=[5, 50, 500, 5000])
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    backend = "aho-corasick" if redact_module.ahocorasick is not None else "trie regex"
+    print(f"matcher: {backend}; {args.size / 1e6:.1f} MB of diagnostics with 3 leaked secrets")
+    rng = random.Random(5)
+    for count in args.secrets:
+        secrets = make_secrets(rng, count)
+        values = list(secrets.values())
+        text = make_text(rng, args.size, rng.sample(values, 3))
+
+        def replace_loop():
+            scrubbed = text
+            for value in values:
+                scrubbed = scrubbed.replace(value, "[REDACTED]")
+            return scrubbed
+
+        start = time.perf_counter()
+        redactor = SecretRedactor(secrets)
+        build = time.perf_counter() - start
+        naive, expected = timed(replace_loop, args.repeat)
+        fast, scrubbed = timed(lambda: redactor.redact(text), args.repeat)
+        assert scrubbed == expected
+        print(f"{count:>5} secrets  replace loop {len(text) / naive / 1e6:>7.1f} MB/s  "
+              f"redactor {len(text) / fast / 1e6:>7.1f} MB/s  ({naive / fast:>5.1f}x, build {build * 1e3:.0f} ms)")
+
+    secrets = make_secrets(rng, 50)
+    values = list(secrets.values())
+    lines = []
+    for i in range(args.lines):
+        event = {"event_id": f"ev-{i}", "severity": "info", "message": make_text(rng, 200, [])}
+        if i % 100 == 0:
+            event["message"] += " token=" + rng.choice(values)
+        lines.append(json.dumps(event).encode() + b"\n")
+    size = sum(map(len, lines))
+    redactor = SecretRedactor(secrets)
+    elapsed, _ = timed(lambda: sum(1 for _ in redactor.filter_lines(lines)), 1)
+    report = redactor.report()
+    print(f"NDJSON filter, 50 secrets: {args.lines / elapsed / 1e3:.0f} k lines/s  {size / elapsed / 1e6:.1f} MB/s  "
+          f"({report.lines_redacted} lines redacted)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+WAL compaction: append latency on the orchestrator thread while WALCompactor
+archives finished workflows in the background, compared with no compaction,
+plus how much of the active log each pass reclaims and how long appends were
+paused for the final swap.
+
+Appends are paced (--rate per second) like a live orchestrator; lower
+--mib-per-second to trade compaction time for less contention.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.orchestrator import WALCompactor, WALWriter
+from cabincrew_protocol.protocol import WALEntry
+from cabincrew_protocol.testing import WorkloadGenerator
+
+
+def append_latencies(writer, entries, rate):
+    latencies = []
+    interval = 1.0 / rate
+    for entry in entries:
+        start = time.perf_counter()
+        writer.append_entry(entry)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    latencies.sort()
+    return latencies
+
+
+def report(label, latencies):
+    p99 = latencies[int(len(latencies) * 0.99)]
+    print(f"{label:<22} p50 {statistics.median(latencies) * 1e6:>7.1f} us  "
+          f"p99 {p99 * 1e6:>8.1f} us  max {latencies[-1] * 1e3:>6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=40_000, help="entries in the WAL before compaction")
+    parser.add_argument("--appends", type=int, default=3_000, help="appends measured during compaction")
+    parser.add_argument("--rate", type=int, default=2_000, help="appends per second")
+    parser.add_argument("--mib-per-second", type=float, default=32.0, help="compactor I/O budget")
+    args = parser.parse_args()
+
+    entries = [WALEntry.model_validate(e) for e in WorkloadGenerator(seed=7).stream("wal_entry", args.entries + 2 * args.appends)]
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = WALWriter(Path(tmp) / "active.wal")
+        for entry in entries[: args.entries]:
+            writer.append_entry(entry)
+        print(f"{args.entries} entries, {(Path(tmp) / 'active.wal').stat().st_size / 2**20:.1f} MiB active WAL")
+
+        report("no compaction", append_latencies(writer, entries[args.entries: args.entries + args.appends], args.rate))
+
+        compactor = WALCompactor(writer, Path(tmp) / "archive", max_bytes_per_second=args.mib_per_second * 2**20)
+        results = []
+        worker = threading.Thread(target=lambda: results.append(compactor.compact()))
+        worker.start()
+        report("during compaction", append_latencies(writer, entries[args.entries + args.appends:], args.rate))
+        worker.join()
+        result = results[0]
+        writer.close()
+
+    print(f"archived {len(result.workflows)} workflows / {result.archived_entries} entries in {result.duration:.2f} s; "
+          f"active WAL {result.bytes_before / 2**20:.1f} -> {result.bytes_after / 2**20:.1f} MiB; "
+          f"appends paused {result.paused * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Compare JSON and the binary (MessagePack) wire format on a synthetic corpus.
+
+For each record kind reports total encoded size and per-record encode/decode
+time for: pydantic JSON, binary with validation, and binary without
+validation (trusted peers). Requires the msgpack extra.
+"""
+import sys
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.codec import decode, encode
+from cabincrew_protocol.testing import WorkloadConfig, WorkloadGenerator
+
+RECORDS = 2_000
+
+
+def per_record(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    config = WorkloadConfig(payload_bytes=512, artifacts_per_step=20)
+    header = (
+        f"{'kind':<14} {'json KB':>9} {'bin KB':>8} {'ratio':>6} "
+        f"{'json enc':>9} {'bin enc':>8} {'json dec':>9} {'bin dec':>8} {'bin dec*':>9}"
+    )
+    print(header)
+    print("(times in us/record; bin dec* = decode(validate=False))")
+    for kind in WorkloadGenerator.KINDS:
+        records = list(WorkloadGenerator(config, seed=1).stream(kind, RECORDS, models=True))
+        model = type(records[0])
+        json_blobs = [r.model_dump_json().encode() for r in records]
+        bin_blobs = [encode(r) for r in records]
+        json_size = sum(map(len, json_blobs))
+        bin_size = sum(map(len, bin_blobs))
+        print(
+            f"{kind:<14} {json_size / 1024:>9.0f} {bin_size / 1024:>8.0f} {bin_size / json_size:>6.2f} "
+            f"{per_record(lambda r: r.model_dump_json(), records):>9.1f} "
+            f"{per_record(encode, records):>8.1f} "
+            f"{per_record(model.model_validate_json, json_blobs):>9.1f} "
+            f"{per_record(lambda b: decode(model, b), bin_blobs):>8.1f} "
+            f"{per_record(lambda b: decode(model, b, validate=False), bin_blobs):>9.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
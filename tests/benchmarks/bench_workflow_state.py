@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-step WorkflowStateRecord update cost as the step count grows.
+
+Compares the copy-and-revalidate pattern (model_copy(deep=True) + model_validate)
+with IncrementalWorkflowState (complete_step + append_artifact + delta_since).
+"""
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+from cabincrew_protocol.orchestrator import IncrementalWorkflowState
+from cabincrew_protocol.protocol import ArtifactRecord, WorkflowStateRecord
+
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SIZES = [100, 1_000, 5_000, 20_000]
+STEPS_MEASURED = 20
+
+
+def make_artifact(i):
+    return ArtifactRecord(
+        artifact_id=f"artifact-{i}",
+        step_id=f"step-{i}",
+        artifact_hash=f"{i:064x}",
+        artifact_type="file",
+        created_at=NOW,
+    )
+
+
+def make_state(n):
+    state = IncrementalWorkflowState(workflow_id="wf-bench", plan_token_hash="0" * 64, created_at=NOW)
+    for i in range(n + STEPS_MEASURED):
+        state.add_pending_step(f"step-{i}", at=NOW)
+    for i in range(n):
+        state.complete_step(f"step-{i}", at=NOW)
+        state.append_artifact(make_artifact(i), at=NOW)
+    return state
+
+
+def bench_copy(record, n):
+    start = time.perf_counter()
+    for i in range(n, n + STEPS_MEASURED):
+        record = record.model_copy(deep=True)
+        step_id = f"step-{i}"
+        record.steps_pending.remove(step_id)
+        record.steps_completed.append(step_id)
+        record.artifacts.append(make_artifact(i))
+        record = WorkflowStateRecord.model_validate(record.model_dump())
+        record.model_dump_json()
+    return (time.perf_counter() - start) / STEPS_MEASURED
+
+
+def bench_incremental(state, n):
+    start = time.perf_counter()
+    for i in range(n, n + STEPS_MEASURED):
+        version = state.version
+        state.complete_step(f"step-{i}", at=NOW)
+        state.append_artifact(make_artifact(i), at=NOW)
+        state.delta_since(version).model_dump_json()
+    return (time.perf_counter() - start) / STEPS_MEASURED
+
+
+def main():
+    print(f"{'steps':>8} {'copy+validate (us)':>20} {'incremental (us)':>18} {'speedup':>9}")
+    for n in SIZES:
+        state = make_state(n)
+        copy_cost = bench_copy(state.to_record(), n)
+        incremental_cost = bench_incremental(state, n)
+        print(
+            f"{n:>8} {copy_cost * 1e6:>20.1f} {incremental_cost * 1e6:>18.1f} "
+            f"{copy_cost / incremental_cost:>8.1f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Python protocol models.
+
+Measures validate (dict -> model), dump (model -> JSON-mode dict) and JSON
+round-trip (model -> JSON -> model) for every model in protocol.py, plus
+realistic large payloads. Each repeat times the case and a fixed pure-Python
+calibration loop back to back; a case's `relative` is the median of those
+per-repeat ratios, so machine speed and drift during the run cancel out.
+
+Comparison with the baseline is a report by default: single-microsecond
+cases move by tens of percent between runs on a busy machine. Pass --check to
+exit 1 when a case is slower than the baseline by more than --threshold in
+its run and again when re-measured (for CI on the machine that recorded the
+baseline).
+
+Usage:
+    python3 tests/benchmarks/run_benchmarks.py                   # report against baseline.json
+    python3 tests/benchmarks/run_benchmarks.py --check           # fail on regressions
+    python3 tests/benchmarks/run_benchmarks.py --save-baseline   # record a new baseline
+    python3 tests/benchmarks/run_benchmarks.py --filter EngineOutput --output results.json
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).parent.parent.parent / "lib" / "python" / "src"
+sys.path.insert(0, str(lib_path))
+
+import pydantic
+
+from cabincrew_protocol import protocol
+from cabincrew_protocol.testing import ModelFactory, protocol_models
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+SEED = 2025
+MIN_RUN_SECONDS = 0.02
+
+
+def calibration():
+    """Fixed pure-Python workload used to normalize timings across machines."""
+    table = {}
+    for i in range(20_000):
+        table[str(i)] = i * 2
+    return sum(table.values())
+
+
+def loop_count(func):
+    """Loops needed for one timed run of `func` to last MIN_RUN_SECONDS."""
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - start >= MIN_RUN_SECONDS:
+            return loops
+        loops *= 2
+
+
+def timed(func, loops):
+    """Per-call time with the garbage collector off, as timeit does."""
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            func()
+        return (time.perf_counter() - start) / loops
+    finally:
+        gc.enable()
+
+
+def measure(func, calibration_loops, repeat):
+    """Median per-call time of `func` and median of its ratio to the adjacent calibration run."""
+    loops = loop_count(func)
+    seconds = []
+    ratios = []
+    for _ in range(repeat):
+        calibration_s = timed(calibration, calibration_loops)
+        elapsed = timed(func, loops)
+        seconds.append(elapsed)
+        ratios.append(elapsed / calibration_s)
+    return statistics.median(seconds), statistics.median(ratios)
+
+
+def model_cases(model, label, payload):
+    instance = model.model_validate(payload)
+    text = instance.model_dump_json()
+    return [
+        (f"{label}.validate", lambda: model.model_validate(payload)),
+        (f"{label}.dump", lambda: instance.model_dump(mode="json")),
+        (f"{label}.json_roundtrip", lambda: model.model_validate_json(instance.model_dump_json())),
+        (f"{label}.json_parse", lambda: model.model_validate_json(text)),
+    ]
+
+
+def build_cases():
+    factory = ModelFactory(seed=SEED)
+    cases = []
+    for model in protocol_models():
+        cases.extend(model_cases(model, model.__name__, factory.payload(model)))
+    cases.extend(model_cases(
+        protocol.EngineOutput, "EngineOutput[artifacts=5000]",
+        factory.engine_output(artifacts=5000, metrics=200),
+    ))
+    cases.extend(model_cases(
+        protocol.AuditEvent, "AuditEvent[evaluations=100,depth=6]",
+        factory.audit_event(evaluations=100, evidence_depth=6),
+    ))
+    cases.extend(model_cases(
+        protocol.WorkflowStateRecord, "WorkflowStateRecord[steps=10000]",
+        factory.workflow_state_record(steps=10_000),
+    ))
+    return cases
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, result in sorted(results["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        ratio = result["relative"] / base["relative"]
+        if ratio > 1 + threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="write results to --baseline instead of comparing")
+    parser.add_argument("--output", type=Path, help="also write results JSON here")
+    parser.add_argument("--check", action="store_true", help="exit 1 on regressions beyond --threshold")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--filter", default="", help="only run cases containing this substring")
+    args = parser.parse_args()
+
+    results = {
+        "version": 2,
+        "python": platform.python_version(),
+        "pydantic": pydantic.VERSION,
+        "seed": SEED,
+        "results": {},
+    }
+
+    calibration_loops = loop_count(calibration)
+    print(f"{'case':<58} {'time (us)':>12} {'relative':>10}")
+    cases = dict(build_cases())
+    for name, func in cases.items():
+        if args.filter not in name:
+            continue
+        seconds, relative = measure(func, calibration_loops, args.repeat)
+        results["results"][name] = {"seconds": seconds, "relative": relative}
+        print(f"{name:<58} {seconds * 1e6:>12.1f} {relative:>10.4f}")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; run with --save-baseline first")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("version") != results["version"]:
+        print(f"Baseline {args.baseline} was recorded by another version of this script; re-record it")
+        return 1 if args.check else 0
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        # A one-off stall should not fail the gate: a case only counts if it is slow again.
+        for name, _ in regressions:
+            relative = measure(cases[name], calibration_loops, args.repeat)[1]
+            results["results"][name]["relative"] = min(results["results"][name]["relative"], relative)
+        regressions = compare(results, baseline, args.threshold)
+    print("=" * 60)
+    if regressions:
+        for name, ratio in regressions:
+            print(f"{'✗' if args.check else '!'} {name}: {ratio:.2f}x baseline")
+        print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        return 1 if args.check else 0
+    print(f"✓ No regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())